@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""Local fake Ralph Dashboard for trying the client without a real server.
+
+Implements the parts of the REST API the skill uses (auth with expiring
+JWT-style tokens and refresh, projects, stats, system metrics,
+iterations, notifications, loop control) plus the /api/ws push channel,
+using only the standard library. A simulator thread advances running
+projects by one iteration every few seconds, occasionally raises a
+notification, and broadcasts each change to connected websocket clients.
+GET responses carry an ETag and answer If-None-Match with 304.
+
+Usage:
+    python scripts/fake_dashboard.py [--port 8420] [--projects 5] [--iteration-seconds 3] [--no-ws]
+
+Log in with admin / admin. From Python:
+
+    server = start(port=0, projects=3, iteration_seconds=0.5)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    ...
+    server.shutdown()
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import http.server
+import json
+import random
+import socket
+import struct
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+USERNAME = "admin"
+PASSWORD = "admin"
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def make_token(ttl: float) -> str:
+    """Unsigned JWT-shaped token whose payload carries an ``exp`` claim."""
+    def encode(obj: Dict[str, Any]) -> str:
+        return base64.urlsafe_b64encode(json.dumps(obj).encode()).decode().rstrip("=")
+    return ".".join([
+        encode({"alg": "none", "typ": "JWT"}),
+        encode({"sub": USERNAME, "exp": time.time() + ttl, "jti": random.random()}),
+        "fake",
+    ])
+
+
+class DashboardState:
+    """Projects, iterations and notifications of the fake dashboard.
+
+    ``notification_rate`` is the chance that a tick raises a notification
+    (tests set it to 0 and call notify() themselves).
+    """
+
+    def __init__(self, projects: int = 5, token_ttl: float = 900.0, log_lines: int = 200):
+        self.lock = threading.Lock()
+        self.send_lock = threading.Lock()
+        self.token_ttl = token_ttl
+        self.log_lines = log_lines
+        self.notification_rate = 0.2
+        self.tokens: Dict[str, float] = {}
+        self.refresh_tokens: set = set()
+        self.projects: Dict[str, Dict[str, Any]] = {}
+        self.iterations: Dict[str, List[Dict[str, Any]]] = {}
+        self.notifications: Dict[str, List[Dict[str, Any]]] = {}
+        self.system: Dict[str, Dict[str, Any]] = {}
+        self.sockets: List[socket.socket] = []
+        for i in range(projects):
+            project_id = f"project-{i + 1}"
+            self.projects[project_id] = {
+                "id": project_id,
+                "name": project_id,
+                "path": f"/var/ralph-projects/{project_id}",
+                "status": "running" if i % 2 == 0 else "stopped",
+                "priority": i,
+            }
+            self.iterations[project_id] = []
+            self.notifications[project_id] = []
+            self.system[project_id] = {"rss_mb": 80.0 + 20 * i, "children_rss_mb": 200.0 + 50 * i}
+            for _ in range(3 + i):
+                self._finish_iteration(project_id)
+
+    # Auth
+
+    def issue_tokens(self) -> Dict[str, Any]:
+        access = make_token(self.token_ttl)
+        refresh = make_token(30 * 86400)
+        self.tokens[access] = time.time() + self.token_ttl
+        self.refresh_tokens.add(refresh)
+        return {"access_token": access, "refresh_token": refresh, "token_type": "bearer"}
+
+    def valid(self, token: str) -> bool:
+        return self.tokens.get(token, 0) > time.time()
+
+    # Simulation
+
+    def _log_output(self, project_id: str, number: int) -> str:
+        lines = [f"[{project_id} #{number}] step {i}: working on task" for i in range(self.log_lines)]
+        if number % 4 == 0:
+            lines.append("ERROR: test_login failed (AssertionError)")
+        return "\n".join(lines) + "\n"
+
+    def _finish_iteration(self, project_id: str) -> Dict[str, Any]:
+        number = len(self.iterations[project_id]) + 1
+        failed = number % 4 == 0
+        record = {
+            "number": number,
+            "max_iterations": 0,
+            "start_timestamp": _now_iso(),
+            "end_timestamp": _now_iso(),
+            "duration_seconds": round(random.uniform(60, 240) * (3 if number % 7 == 0 else 1), 1),
+            "tokens_used": round(random.uniform(30, 90), 3),
+            "status": "error" if failed else "success",
+            "has_errors": failed,
+            "errors": ["test_login failed"] if failed else [],
+            "tasks_completed": [] if failed else [f"1.{number}"],
+            "commit": hashlib.sha1(f"{project_id}{number}".encode()).hexdigest()[:7],
+            "test_passed": not failed,
+            "log_output": self._log_output(project_id, number),
+        }
+        self.iterations[project_id].append(record)
+        return record
+
+    def tick(self) -> None:
+        """Advance every running project by one iteration."""
+        with self.lock:
+            running = [p for p in self.projects.values() if p["status"] == "running"]
+        for project in running:
+            project_id = project["id"]
+            with self.lock:
+                record = self._finish_iteration(project_id)
+                summary = {k: v for k, v in record.items() if k != "log_output"}
+                metrics = self.system[project_id]
+                metrics["children_rss_mb"] = max(50.0, metrics["children_rss_mb"] + random.uniform(-40, 60))
+            self.broadcast("iteration_completed", project_id, summary)
+            self.broadcast("iteration_started", project_id, {"number": record["number"] + 1})
+            if random.random() < self.notification_rate:
+                self.notify(project_id, random.choice(["PROGRESS", "ERROR", "DECISION"]),
+                            f"Iteration {record['number']} needs attention", record["number"])
+
+    def notify(self, project_id: str, prefix: str, message: str, iteration: Optional[int] = None) -> None:
+        notification = {
+            "timestamp": _now_iso(),
+            "prefix": prefix,
+            "message": message,
+            "status": "pending",
+            "iteration": iteration,
+            "details": None,
+            "source": "pending-notification.txt",
+        }
+        with self.lock:
+            self.notifications[project_id].insert(0, notification)
+        self.broadcast("notification", project_id, notification)
+
+    def set_status(self, project_id: str, status: str) -> None:
+        with self.lock:
+            self.projects[project_id]["status"] = status
+        self.broadcast("status_changed", project_id, {"status": status})
+
+    # Websocket push
+
+    def broadcast(self, event_type: str, project_id: str, data: Dict[str, Any]) -> None:
+        message = json.dumps({
+            "type": event_type, "project_id": project_id, "data": data, "timestamp": _now_iso()
+        }).encode()
+        header = bytes([0x81])
+        if len(message) < 126:
+            header += bytes([len(message)])
+        elif len(message) < 65536:
+            header += bytes([126]) + struct.pack(">H", len(message))
+        else:
+            header += bytes([127]) + struct.pack(">Q", len(message))
+        with self.lock:
+            sockets = list(self.sockets)
+        for sock in sockets:
+            try:
+                with self.send_lock:
+                    sock.sendall(header + message)
+            except OSError:
+                with self.lock:
+                    if sock in self.sockets:
+                        self.sockets.remove(sock)
+
+
+class DashboardHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    state: DashboardState
+    websocket = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        payload = json.dumps(body).encode()
+        etag = '"' + hashlib.sha1(payload).hexdigest() + '"'
+        if self.command == "GET" and status == 200 and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if self.command == "GET" and status == 200:
+            self.send_header("ETag", etag)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def _authorized(self, query: Dict[str, List[str]]) -> bool:
+        auth = self.headers.get("Authorization", "")
+        token = auth[7:] if auth.startswith("Bearer ") else query.get("token", [""])[0]
+        return self.state.valid(token)
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def _route(self, method: str) -> None:
+        state = self.state
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        parts = url.path.strip("/").split("/")
+        body = self._body() if method == "POST" else {}
+
+        if url.path == "/api/health":
+            return self._send(200, {"status": "ok"})
+        if url.path == "/api/auth/login" and method == "POST":
+            if body.get("username") != USERNAME or body.get("password") != PASSWORD:
+                return self._send(401, {"detail": "Invalid credentials"})
+            return self._send(200, state.issue_tokens())
+        if url.path == "/api/auth/refresh" and method == "POST":
+            if body.get("refresh_token") not in state.refresh_tokens:
+                return self._send(401, {"detail": "Invalid refresh token"})
+            tokens = state.issue_tokens()
+            return self._send(200, {"access_token": tokens["access_token"], "token_type": "bearer"})
+        if not self._authorized(query):
+            return self._send(401, {"detail": "Not authenticated"})
+
+        if url.path == "/api/ws" and self.websocket and self.headers.get("Upgrade", "").lower() == "websocket":
+            return self._websocket()
+        if url.path == "/api/projects" and method == "GET":
+            with state.lock:
+                return self._send(200, list(state.projects.values()))
+        if len(parts) < 3 or parts[:2] != ["api", "projects"] or parts[2] not in state.projects:
+            return self._send(404, {"detail": "Not found"})
+
+        project_id, rest = parts[2], parts[3:]
+        with state.lock:
+            project = dict(state.projects[project_id])
+            iterations = list(state.iterations[project_id])
+            notifications = list(state.notifications[project_id])
+            metrics = dict(state.system[project_id])
+
+        if method == "GET":
+            if not rest:
+                return self._send(200, project)
+            if rest == ["stats"]:
+                done = sum(len(i["tasks_completed"]) for i in iterations)
+                return self._send(200, {
+                    "total_iterations": len(iterations),
+                    "total_tokens": round(sum(i["tokens_used"] for i in iterations), 3),
+                    "total_duration_seconds": round(sum(i["duration_seconds"] for i in iterations), 1),
+                    "tasks_done": done,
+                    "tasks_total": done + 10,
+                    "errors_count": sum(1 for i in iterations if i["has_errors"]),
+                })
+            if rest == ["system"]:
+                running = project["status"] == "running"
+                rss, children = (metrics["rss_mb"], metrics["children_rss_mb"]) if running else (0.0, 0.0)
+                return self._send(200, {
+                    "process": {
+                        "pid": 10000 + project["priority"] if running else None,
+                        "rss_mb": rss,
+                        "children_rss_mb": children,
+                        "total_rss_mb": rss + children,
+                        "cpu_percent": random.uniform(5, 60) if running else 0.0,
+                        "child_count": 3 if running else 0,
+                    },
+                    "system": {
+                        "ram_total_mb": 16384.0,
+                        "ram_used_mb": 8192.0,
+                        "ram_available_mb": 8192.0,
+                        "ram_percent": 50.0,
+                        "cpu_load_1m": 1.2,
+                        "cpu_load_5m": 0.8,
+                        "cpu_load_15m": 0.6,
+                        "cpu_core_count": 8,
+                        "disk_total_gb": 500.0,
+                        "disk_used_gb": 120.0,
+                        "disk_free_gb": 380.0,
+                        "disk_percent": 24.0,
+                        "uptime_seconds": 864000.0,
+                    },
+                })
+            if rest == ["iterations"]:
+                status = query.get("status", ["all"])[0]
+                limit = int(query.get("limit", ["50"])[0])
+                offset = int(query.get("offset", ["0"])[0])
+                selected = [i for i in reversed(iterations) if status == "all" or i["status"] == status]
+                page = [{k: v for k, v in i.items() if k != "log_output"} for i in selected[offset:offset + limit]]
+                return self._send(200, {"iterations": page, "total": len(selected)})
+            if len(rest) == 2 and rest[0] == "iterations" and rest[1].isdigit():
+                number = int(rest[1])
+                if not 1 <= number <= len(iterations):
+                    return self._send(404, {"detail": "Iteration not found"})
+                return self._send(200, iterations[number - 1])
+            if rest == ["notifications"]:
+                return self._send(200, notifications)
+
+        if method == "POST" and len(rest) == 1:
+            action = rest[0]
+            transitions = {
+                "start": ("running", {"project_id": project_id, "pid": 10000, "command": ["./scripts/ralph.sh"]}),
+                "stop": ("stopped", {"stopped": True}),
+                "pause": ("paused", {"paused": True}),
+                "resume": ("running", {"resumed": True}),
+            }
+            if action in transitions:
+                status, response = transitions[action]
+                if project["status"] != status:
+                    state.set_status(project_id, status)
+                return self._send(200, response)
+            if action == "inject":
+                return self._send(200, {"injected": True})
+
+        return self._send(404, {"detail": "Not found"})
+
+    def _websocket(self) -> None:
+        key = self.headers.get("Sec-WebSocket-Key", "")
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.wfile.flush()
+        with self.state.lock:
+            self.state.sockets.append(self.connection)
+        try:
+            # Read (and ignore) client frames until it closes the connection
+            while True:
+                header = self.rfile.read(2)
+                if len(header) < 2 or header[0] & 0x0F == 0x8:
+                    break
+                length = header[1] & 0x7F
+                if length == 126:
+                    length = struct.unpack(">H", self.rfile.read(2))[0]
+                elif length == 127:
+                    length = struct.unpack(">Q", self.rfile.read(8))[0]
+                mask = self.rfile.read(4) if header[1] & 0x80 else b""
+                payload = self.rfile.read(length)
+                if header[0] & 0x0F == 0x9:
+                    # Answer pings so clients keep the connection open
+                    data = bytes(b ^ mask[i % 4] for i, b in enumerate(payload)) if mask else payload
+                    with self.state.send_lock:
+                        self.connection.sendall(bytes([0x8A, len(data)]) + data)
+        except OSError:
+            pass
+        finally:
+            with self.state.lock:
+                if self.connection in self.state.sockets:
+                    self.state.sockets.remove(self.connection)
+            self.close_connection = True
+
+
+class DashboardServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def start(
+    port: int = 8420,
+    projects: int = 5,
+    iteration_seconds: float = 3.0,
+    websocket: bool = True,
+    token_ttl: float = 900.0,
+    host: str = "127.0.0.1",
+) -> DashboardServer:
+    """Start the fake dashboard and its simulator on background threads.
+
+    The server's DashboardState is available as ``server.state`` for
+    adjusting metrics or triggering events directly.
+    """
+    state = DashboardState(projects=projects, token_ttl=token_ttl)
+    handler = type("Handler", (DashboardHandler,), {"state": state, "websocket": websocket})
+    server = DashboardServer((host, port), handler)
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def simulate() -> None:
+        while True:
+            time.sleep(iteration_seconds)
+            state.tick()
+
+    if iteration_seconds > 0:
+        threading.Thread(target=simulate, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8420)
+    parser.add_argument("--projects", type=int, default=5)
+    parser.add_argument("--iteration-seconds", type=float, default=3.0)
+    parser.add_argument("--token-ttl", type=float, default=900.0, help="Access token lifetime in seconds")
+    parser.add_argument("--no-ws", action="store_true", help="Disable /api/ws (clients fall back to polling)")
+    args = parser.parse_args()
+
+    server = start(args.port, args.projects, args.iteration_seconds, not args.no_ws, args.token_ttl)
+    print(f"Fake Ralph Dashboard on http://127.0.0.1:{server.server_address[1]} (login {USERNAME}/{PASSWORD})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
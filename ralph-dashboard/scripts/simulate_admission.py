@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""Record dashboard metrics and replay them through AdmissionController.
+
+``record`` polls a live dashboard and appends one AdmissionController
+snapshot per interval to a JSON-lines file. ``replay`` feeds a recording
+to a controller running against ReplayDashboard, which models what the
+controller's actions would have done: a loop paused in the simulation
+gives back the memory and CPU it used in the recording, and a loop
+started in the simulation adds its last seen usage. ``synthesize``
+writes a recording with memory spikes for trying policies without a
+dashboard.
+
+Usage:
+    python scripts/simulate_admission.py record --url http://localhost:8420 \\
+        --username admin --password admin --interval 30 --count 240 --out metrics.jsonl
+    python scripts/simulate_admission.py synthesize --out metrics.jsonl
+    python scripts/simulate_admission.py replay metrics.jsonl --target-loops 6 --max-ram-percent 80
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import skill  # noqa: E402
+
+
+class ReplayDashboard:
+    """Stands in for RalphDashboardClient, serving recorded frames.
+
+    Loop statuses start as recorded in the first frame and afterwards
+    change only through the loop-control methods. System metrics are the
+    recorded ones, adjusted for every loop whose simulated status differs
+    from the recorded one.
+    """
+
+    def __init__(self, frames: List[Dict[str, Any]], default_rss_mb: float = skill.ADMISSION_DEFAULT_RSS_MB):
+        self.frames = frames
+        self.index = 0
+        self.default_rss_mb = default_rss_mb
+        self.status: Dict[str, str] = {}
+        self.last: Dict[str, Tuple[float, float]] = {}
+        self._load_frame()
+
+    @property
+    def frame(self) -> Dict[str, Any]:
+        return self.frames[self.index]
+
+    @property
+    def now(self) -> float:
+        return self.frame["time"]
+
+    def advance(self) -> bool:
+        if self.index + 1 >= len(self.frames):
+            return False
+        self.index += 1
+        self._load_frame()
+        return True
+
+    def _load_frame(self) -> None:
+        for project_id, entry in self.frame["projects"].items():
+            self.status.setdefault(project_id, entry["status"])
+            if entry["status"] == "running" and entry.get("total_rss_mb"):
+                self.last[project_id] = (entry["total_rss_mb"], entry.get("cpu_percent") or 0.0)
+
+    def _usage(self, project_id: str) -> Tuple[float, float]:
+        entry = self.frame["projects"].get(project_id, {})
+        if entry.get("status") == "running" and entry.get("total_rss_mb"):
+            return entry["total_rss_mb"], entry.get("cpu_percent") or 0.0
+        return self.last.get(project_id, (self.default_rss_mb, 0.0))
+
+    def running(self) -> int:
+        return sum(1 for status in self.status.values() if status == "running")
+
+    def system(self) -> Dict[str, Any]:
+        recorded = self.frame["system"]
+        total = recorded.get("ram_total_mb") or 1.0
+        used = recorded.get("ram_used_mb", recorded.get("ram_percent", 0.0) * total / 100)
+        load = recorded.get("cpu_load_1m", 0.0)
+        for project_id, entry in self.frame["projects"].items():
+            was_running = entry["status"] == "running"
+            is_running = self.status.get(project_id) == "running"
+            if was_running != is_running:
+                rss, cpu = self._usage(project_id)
+                sign = 1 if is_running else -1
+                used += sign * rss
+                load += sign * cpu / 100
+        used = min(max(used, 0.0), total)
+        return dict(
+            recorded,
+            ram_used_mb=used,
+            ram_available_mb=total - used,
+            ram_percent=used / total * 100,
+            cpu_load_1m=max(load, 0.0),
+        )
+
+    # The RalphDashboardClient methods AdmissionController uses
+
+    def list_projects(self) -> List[Dict[str, Any]]:
+        return [
+            {"id": project_id, "status": self.status[project_id], "priority": entry.get("priority", 0)}
+            for project_id, entry in self.frame["projects"].items()
+        ]
+
+    def get_system(self, project_id: str) -> Dict[str, Any]:
+        process = {"pid": None, "rss_mb": 0.0, "children_rss_mb": 0.0, "total_rss_mb": 0.0, "cpu_percent": 0.0}
+        if self.status.get(project_id) == "running":
+            rss, cpu = self._usage(project_id)
+            process.update(rss_mb=rss, total_rss_mb=rss, cpu_percent=cpu)
+        return {"process": process, "system": self.system()}
+
+    def start_loop(self, project_id: str) -> Dict[str, Any]:
+        self.status[project_id] = "running"
+        return {"project_id": project_id}
+
+    def resume_loop(self, project_id: str) -> Dict[str, Any]:
+        self.status[project_id] = "running"
+        return {"resumed": True}
+
+    def pause_loop(self, project_id: str) -> Dict[str, Any]:
+        self.status[project_id] = "paused"
+        return {"paused": True}
+
+    def stop_loop(self, project_id: str) -> Dict[str, Any]:
+        self.status[project_id] = "stopped"
+        return {"stopped": True}
+
+
+def load_frames(path: str) -> List[Dict[str, Any]]:
+    with open(path) as f:
+        return [frame for frame in map(json.loads, filter(str.strip, f)) if frame.get("system")]
+
+
+def record(args: argparse.Namespace) -> None:
+    with skill.RalphDashboardClient(args.url) as client:
+        client.login(args.username, args.password)
+        controller = skill.AdmissionController(client, dry_run=True)
+        with open(args.out, "a") as f:
+            for i in range(args.count):
+                f.write(json.dumps(controller.snapshot()) + "\n")
+                f.flush()
+                print(f"\rrecorded {i + 1}/{args.count}", end="", flush=True)
+                if i + 1 < args.count:
+                    time.sleep(args.interval)
+    print()
+
+
+def synthesize(args: argparse.Namespace) -> None:
+    """Loops with a slow memory drift plus occasional build/test spikes."""
+    rng = random.Random(args.seed)
+    total, cores, base_used = 16384.0, 8, 2500.0
+    loops = {
+        f"project-{i + 1}": {"rss": rng.uniform(600, 1400), "cpu": rng.uniform(20, 80), "phase": rng.uniform(0, 6.3)}
+        for i in range(args.projects)
+    }
+    spikes: Dict[str, List[float]] = {project_id: [] for project_id in loops}
+    start = time.time()
+    with open(args.out, "w") as f:
+        for n in range(args.frames):
+            projects = {}
+            for i, (project_id, loop) in enumerate(loops.items()):
+                if not spikes[project_id] and rng.random() < 0.04:
+                    spikes[project_id] = [rng.uniform(1500, 3500)] * rng.randint(3, 8)
+                spike = spikes[project_id].pop() if spikes[project_id] else 0.0
+                rss = loop["rss"] * (1 + 0.25 * math.sin(n / 20 + loop["phase"])) + spike
+                cpu = loop["cpu"] + (100.0 if spike else 0.0)
+                projects[project_id] = {
+                    "status": "running", "priority": i, "total_rss_mb": round(rss, 1), "cpu_percent": round(cpu, 1),
+                }
+            used = min(base_used + sum(p["total_rss_mb"] for p in projects.values()), total)
+            system = {
+                "ram_total_mb": total,
+                "ram_used_mb": used,
+                "ram_available_mb": total - used,
+                "ram_percent": used / total * 100,
+                "cpu_load_1m": 0.5 + sum(p["cpu_percent"] for p in projects.values()) / 100,
+                "cpu_core_count": cores,
+                "disk_percent": 60.0 + 15.0 * n / args.frames,
+            }
+            f.write(json.dumps({"time": start + n * args.interval, "system": system, "projects": projects}) + "\n")
+    print(f"wrote {args.frames} frames for {args.projects} loops to {args.out}")
+
+
+def replay(args: argparse.Namespace) -> None:
+    frames = load_frames(args.recording)
+    if not frames:
+        sys.exit(f"{args.recording}: no frames with system metrics")
+    recorded_running = [sum(1 for p in f["projects"].values() if p["status"] == "running") for f in frames]
+    policy = skill.AdmissionPolicy(
+        target_loops=args.target_loops or max(recorded_running),
+        max_ram_percent=args.max_ram_percent,
+        max_load_per_core=args.max_load_per_core,
+        max_disk_percent=args.max_disk_percent,
+        hysteresis=args.hysteresis,
+        cooldown=args.cooldown,
+        max_starts=args.max_starts,
+    )
+    dashboard = ReplayDashboard(frames, policy.default_rss_mb)
+    controller = skill.AdmissionController(dashboard, policy, queue=args.queue, clock=lambda: dashboard.now)
+    over_before = over_after = 0
+    peak_before = peak_after = 0.0
+    running_after: List[int] = []
+    actions: Dict[str, int] = {}
+    while True:
+        before = frames[dashboard.index]["system"]["ram_percent"]
+        decisions = controller.step()
+        after = dashboard.system()["ram_percent"]
+        peak_before, peak_after = max(peak_before, before), max(peak_after, after)
+        over_before += before > policy.max_ram_percent
+        over_after += after > policy.max_ram_percent
+        running_after.append(dashboard.running())
+        for decision in decisions:
+            actions[decision.action] = actions.get(decision.action, 0) + 1
+            if args.verbose:
+                print(f"frame {dashboard.index:>4}  {decision.action:<6} {decision.project_id:<20} {decision.reason}")
+        if not dashboard.advance():
+            break
+
+    print(f"{len(frames)} frames, target {policy.target_loops} loops, RAM budget {policy.max_ram_percent:g}%")
+    print(f"{'':<24} {'recorded':>10} {'simulated':>10}")
+    print(f"{'peak RAM %':<24} {peak_before:>10.1f} {peak_after:>10.1f}")
+    print(f"{'frames over RAM budget':<24} {over_before:>10} {over_after:>10}")
+    print(f"{'mean running loops':<24} {sum(recorded_running) / len(frames):>10.2f} "
+          f"{sum(running_after) / len(frames):>10.2f}")
+    print("actions: " + (", ".join(f"{count} {action}" for action, count in sorted(actions.items())) or "none"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rec = commands.add_parser("record", help="Record snapshots from a live dashboard")
+    rec.add_argument("--url", required=True)
+    rec.add_argument("--username", required=True)
+    rec.add_argument("--password", required=True)
+    rec.add_argument("--interval", type=float, default=skill.ADMISSION_INTERVAL)
+    rec.add_argument("--count", type=int, default=120)
+    rec.add_argument("--out", required=True)
+    rec.set_defaults(func=record)
+
+    syn = commands.add_parser("synthesize", help="Write a synthetic recording")
+    syn.add_argument("--out", required=True)
+    syn.add_argument("--projects", type=int, default=8)
+    syn.add_argument("--frames", type=int, default=480)
+    syn.add_argument("--interval", type=float, default=skill.ADMISSION_INTERVAL)
+    syn.add_argument("--seed", type=int, default=1)
+    syn.set_defaults(func=synthesize)
+
+    rep = commands.add_parser("replay", help="Replay a recording through the controller")
+    rep.add_argument("recording")
+    defaults = skill.AdmissionPolicy()
+    rep.add_argument("--target-loops", type=int, default=None, help="Default: most loops running in the recording")
+    rep.add_argument("--max-ram-percent", type=float, default=defaults.max_ram_percent)
+    rep.add_argument("--max-load-per-core", type=float, default=defaults.max_load_per_core)
+    rep.add_argument("--max-disk-percent", type=float, default=defaults.max_disk_percent)
+    rep.add_argument("--hysteresis", type=float, default=defaults.hysteresis)
+    rep.add_argument("--cooldown", type=float, default=defaults.cooldown)
+    rep.add_argument("--max-starts", type=int, default=defaults.max_starts)
+    rep.add_argument("--queue", nargs="*", default=[], help="Project ids waiting to be started")
+    rep.add_argument("--verbose", action="store_true", help="Print every decision")
+    rep.set_defaults(func=replay)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,729 @@
 #!/usr/bin/env python3
 """Ralph Dashboard API client helpers."""
 
+import asyncio
+import base64
+import codecs
+import collections
+import email.utils
+import importlib.util
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import urllib.parse
 import httpx
-from typing import Optional, Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Callable, Iterable, Iterator, AsyncIterator, Tuple, Union
 
 
-class RalphDashboardClient:
-    """Simple client for Ralph Dashboard REST API."""
+DEFAULT_TIMEOUT = 10.0
+
+# Connection pool limits; the keep-alive pool is what lets a poller hit
+# dozens of projects every few seconds without reconnecting each time
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE_CONNECTIONS = 10
+KEEPALIVE_EXPIRY = 30.0
+
+# Retry policy for 429/5xx responses and connection errors. Non-GET
+# requests are only retried when the server can't have acted on them.
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+MAX_RETRY_AFTER = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+UNSENT_RETRY_STATUSES = {429, 503}
+
+# Token cache, used when token_cache=True or RALPH_TOKEN_CACHE is set;
+# access tokens are refreshed this many seconds before they expire
+TOKEN_CACHE_PATH = os.environ.get(
+    "RALPH_TOKEN_CACHE", str(Path.home() / ".cache" / "ralph-dashboard" / "tokens.json")
+)
+REFRESH_MARGIN = 60.0
+
+# Parallel requests for get_overview(); kept within the connection limit
+OVERVIEW_CONCURRENCY = MAX_CONNECTIONS
+
+# Per-project parts of an overview snapshot
+OVERVIEW_PARTS = ("stats", "latest_iteration", "system")
+
+# watch(): polling interval when there is no push channel, iterations
+# checked per poll, and websocket reconnects before falling back to polling
+WATCH_POLL_INTERVAL = 1.0
+WATCH_ITERATIONS = 20
+WS_RECONNECTS = 3
+WS_RECV_TIMEOUT = 1.0
+
+# Bulk loop control: actions in flight at once (each may start or signal
+# processes on the host), and the status each action leaves a loop in
+BULK_CONCURRENCY = 10
+BULK_ACTIONS = {"start": "running", "stop": "stopped", "pause": "paused", "resume": "running", "inject": None}
+
+# Iteration analytics (IterationAnalytics): iterations per rolling window,
+# baseline iterations a recent window is compared against, the z-score and
+# relative increase a shift needs to count as a regression, and the
+# modified z-score above which a single iteration is an outlier
+ANALYTICS_WINDOW = 50
+REGRESSION_BASELINE = 200
+REGRESSION_Z = 4.0
+REGRESSION_MIN_CHANGE = 0.25
+OUTLIER_Z = 3.5
+# Values held at once by rolling computations (bounds their memory use)
+ROLLING_CELLS = 1 << 20
+
+# Admission control (AdmissionController): seconds between control steps,
+# and the memory assumed for a loop that hasn't been seen running yet
+ADMISSION_INTERVAL = 30.0
+ADMISSION_DEFAULT_RSS_MB = 1024.0
+
+# Iteration log streaming: bytes read per network chunk, and how often a
+# live iteration's log is re-checked by follow_log()
+LOG_CHUNK_SIZE = 64 * 1024
+LOG_FOLLOW_INTERVAL = 1.0
+
+# Local iteration mirror (IterationStore); the server allows up to 500 per page
+ITERATIONS_DB = os.environ.get(
+    "RALPH_ITERATIONS_DB", str(Path.home() / ".cache" / "ralph-dashboard" / "iterations.db")
+)
+ITERATION_PAGE_SIZE = 500
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (pip install httpx[http2])."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def _client_options(
+    timeout: float,
+    http2: Optional[bool],
+    max_connections: int,
+    max_keepalive_connections: int,
+) -> Dict[str, Any]:
+    return {
+        "timeout": timeout,
+        "http2": _http2_available() if http2 is None else http2,
+        "limits": httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+    }
+
+
+def _token_expiry(token: str) -> Optional[float]:
+    """The ``exp`` claim of a JWT (not verified), or None if unreadable."""
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def _retry_delay(attempt: int, backoff: float, retry_after: Optional[str] = None) -> float:
+    """Retry-After if the server sent one, else exponential backoff with jitter."""
+    if retry_after:
+        if retry_after.strip().isdigit():
+            return min(float(retry_after), MAX_RETRY_AFTER)
+        try:
+            when = email.utils.parsedate_to_datetime(retry_after)
+            return max(0.0, min(when.timestamp() - time.time(), MAX_RETRY_AFTER))
+        except (TypeError, ValueError):
+            pass
+    return backoff * (2 ** attempt) * (0.5 + random.random())
+
+
+def _retryable(method: str, error: Optional[Exception] = None, status: Optional[int] = None) -> bool:
+    """Whether a failed request may be sent again.
+    
+    GETs are retried on any transport error and on RETRY_STATUSES. Other
+    methods only when the request can't have reached the application: a
+    failed connect, or a 429/503 response.
+    """
+    if error is not None:
+        if method == "GET":
+            return isinstance(error, httpx.TransportError)
+        return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+    return status in (RETRY_STATUSES if method == "GET" else UNSENT_RETRY_STATUSES)
+
+
+class TokenCache:
+    """Dashboard tokens stored on disk, readable only by the current user.
+    
+    Tokens are kept per dashboard URL and username in one JSON file,
+    written atomically with mode 0600 (directory 0700), so short-lived
+    scripts can reuse a login instead of authenticating every run.
+    """
+    
+    def __init__(self, path: str = TOKEN_CACHE_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+    
+    def _read(self) -> Dict[str, Any]:
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+    
+    def _write(self, entries: Dict[str, Any]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp, self.path)
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._read().get(key)
+    
+    def put(self, key: str, tokens: Dict[str, Any]) -> None:
+        with self._lock:
+            entries = self._read()
+            entries[key] = tokens
+            self._write(entries)
+    
+    def delete(self, key: str) -> None:
+        with self._lock:
+            entries = self._read()
+            if entries.pop(key, None) is not None:
+                self._write(entries)
+
+
+def _error_text(error: BaseException) -> str:
+    if isinstance(error, httpx.HTTPStatusError):
+        return f"HTTP {error.response.status_code}: {error.request.method} {error.request.url.path}"
+    return f"{type(error).__name__}: {error}"
+
+
+def _overview_entry(project: Dict[str, Any]) -> Dict[str, Any]:
+    entry = {"project": project, "errors": {}}
+    entry.update((part, None) for part in OVERVIEW_PARTS)
+    return entry
+
+
+def _set_overview_part(entry: Dict[str, Any], part: str, result: Any) -> None:
+    """Store one fetched part in an overview entry, or record its error."""
+    if isinstance(result, BaseException):
+        entry["errors"][part] = _error_text(result)
+        return
+    if part == "latest_iteration":
+        iterations = result.get("iterations", []) if isinstance(result, dict) else result
+        result = iterations[0] if iterations else None
+    entry[part] = result
+
+
+@dataclass
+class WatchEvent:
+    """Base class of the events yielded by watch()."""
+    project_id: str
+    source: str = "poll"  # "push" (websocket) or "poll"
+    received: float = field(default_factory=time.time)
+
+
+@dataclass
+class IterationStarted(WatchEvent):
+    """A new iteration began. When polling, inferred from the previous one finishing."""
+    number: Optional[int] = None
+
+
+@dataclass
+class IterationFinished(WatchEvent):
+    """An iteration completed; ``iteration`` is its record (without log output)."""
+    number: Optional[int] = None
+    iteration: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class NotificationRaised(WatchEvent):
+    """The loop wrote a notification (pending-notification.txt)."""
+    notification: Dict[str, Any] = field(default_factory=dict)
+    
+    @property
+    def prefix(self) -> Optional[str]:
+        return self.notification.get("prefix")
+    
+    @property
+    def message(self) -> Optional[str]:
+        return self.notification.get("message")
+
+
+@dataclass
+class LoopStateChanged(WatchEvent):
+    """The project's loop status changed (running, paused, stopped, complete)."""
+    old_status: Optional[str] = None
+    new_status: Optional[str] = None
+
+
+class _WatchState:
+    """Turns pushed messages and polled snapshots of one project into events.
+    
+    The first snapshot of each kind only records the current state, so a
+    watch reports what changes after it starts. Pushed messages update the
+    same state, so a catch-up poll after a reconnect reports only what was
+    missed.
+    """
+    
+    ITERATION_STARTED = {"iteration_started", "iteration_start"}
+    ITERATION_FINISHED = {"iteration_completed", "iteration_complete", "iteration_finished"}
+    NOTIFICATION = {"notification", "notification_raised", "new_notification"}
+    STATUS = {"status_changed", "status", "loop_status", "loop_state"}
+    
+    def __init__(self, project_id: str):
+        self.project_id = project_id
+        self.status: Optional[str] = None
+        self.last_number: Optional[int] = None
+        self.notifications: Optional[set] = None
+        self.etags: Dict[str, str] = {}
+        self.bodies: Dict[str, Any] = {}
+    
+    @staticmethod
+    def _notification_key(notification: Dict[str, Any]) -> tuple:
+        return (notification.get("timestamp"), notification.get("prefix"), notification.get("message"))
+    
+    def changed(self, path: str, response: httpx.Response) -> Optional[Any]:
+        """Decoded body of a conditional GET, or None if it didn't change."""
+        if response.status_code == 304:
+            return None
+        etag = response.headers.get("ETag")
+        data = response.json()
+        if etag:
+            self.etags[path] = etag
+        elif self.bodies.get(path) == data:
+            # No ETag support: compare with the previous body instead
+            return None
+        else:
+            self.bodies[path] = data
+        return data
+    
+    def on_project(self, project: Dict[str, Any], source: str = "poll") -> List[WatchEvent]:
+        status = project.get("status")
+        old, self.status = self.status, status
+        if old is None or status == old:
+            return []
+        return [LoopStateChanged(self.project_id, source, old_status=old, new_status=status)]
+    
+    def on_iterations(self, records: List[Dict[str, Any]], source: str = "poll") -> List[WatchEvent]:
+        numbered = [r for r in records if isinstance(r.get("number"), int)]
+        if self.last_number is None:
+            self.last_number = max((r["number"] for r in numbered), default=0)
+            return []
+        events: List[WatchEvent] = []
+        for record in sorted((r for r in numbered if r["number"] > self.last_number), key=lambda r: r["number"]):
+            events.append(IterationFinished(self.project_id, source, number=record["number"], iteration=record))
+            self.last_number = record["number"]
+        if events and source == "poll" and self.status == "running":
+            events.append(IterationStarted(self.project_id, source, number=self.last_number + 1))
+        return events
+    
+    def on_notifications(self, notifications: List[Dict[str, Any]], source: str = "poll") -> List[WatchEvent]:
+        keys = [self._notification_key(n) for n in notifications]
+        if self.notifications is None:
+            self.notifications = set(keys)
+            return []
+        events: List[WatchEvent] = []
+        # The history is newest first; report new ones in the order they were raised
+        for key, notification in reversed(list(zip(keys, notifications))):
+            if key not in self.notifications:
+                self.notifications.add(key)
+                events.append(NotificationRaised(self.project_id, source, notification=notification))
+        return events
+    
+    def on_message(self, message: Dict[str, Any]) -> List[WatchEvent]:
+        """Events for one websocket message (other projects' messages are ignored)."""
+        project_id = message.get("project_id") or message.get("project")
+        if project_id != self.project_id:
+            return []
+        kind = message.get("type") or message.get("event")
+        data = message.get("data") or {}
+        if kind in self.ITERATION_STARTED:
+            return [IterationStarted(self.project_id, "push", number=data.get("number") or data.get("iteration"))]
+        if kind in self.ITERATION_FINISHED:
+            number = data.get("number")
+            if isinstance(number, int):
+                self.last_number = max(self.last_number or 0, number)
+            return [IterationFinished(self.project_id, "push", number=number, iteration=data)]
+        if kind in self.NOTIFICATION:
+            if self.notifications is not None:
+                self.notifications.add(self._notification_key(data))
+            return [NotificationRaised(self.project_id, "push", notification=data)]
+        if kind in self.STATUS and data.get("status"):
+            return self.on_project({"status": data["status"]}, "push")
+        return []
+
+
+@dataclass
+class LogChunk:
+    """A piece of an iteration log; offsets are UTF-8 byte positions in the log."""
+    offset: int
+    end: int
+    text: str
+
+
+@dataclass
+class LogMatch:
+    """A log line matching a search_log() pattern."""
+    line_number: int
+    offset: int
+    line: str
+    match: Any  # re.Match
+
+
+_JSON_ESCAPES = {ord('"'): '"', ord("\\"): "\\", ord("/"): "/", ord("b"): "\b",
+                 ord("f"): "\f", ord("n"): "\n", ord("r"): "\r", ord("t"): "\t"}
+_STRING_SPECIAL = re.compile(rb'["\\]')
+
+
+class _JSONFieldStream:
+    """Decodes one top-level string field of a JSON object as bytes arrive.
+    
+    Only the field's value is decoded and handed out, piece by piece;
+    everything else is skipped without being kept, so memory use doesn't
+    depend on the size of the document.
+    """
+    
+    MAX_KEY = 64
+    
+    def __init__(self, name: str):
+        self.name = name.encode()
+        self.depth = 0
+        self.in_string = False
+        self.escape: Optional[str] = None  # "" after a backslash, or \u hex digits so far
+        self.expect_key = False
+        self.key: Optional[bytearray] = None
+        self.key_done = False
+        self.value_next = False
+        self.capture = False
+        self.high_surrogate: Optional[int] = None
+        self.decoder = codecs.getincrementaldecoder("utf-8")("replace")
+    
+    def _escaped(self, char: str) -> str:
+        """Text for a completed escape, joining UTF-16 surrogate pairs."""
+        code = ord(char)
+        if 0xD800 <= code < 0xDC00:
+            self.high_surrogate = code
+            return ""
+        if 0xDC00 <= code < 0xE000 and self.high_surrogate is not None:
+            char = chr(0x10000 + ((self.high_surrogate - 0xD800) << 10) + (code - 0xDC00))
+        self.high_surrogate = None
+        return char
+    
+    def feed(self, data: bytes) -> str:
+        """Decoded text of the field contained in ``data``."""
+        out: List[str] = []
+        i, n = 0, len(data)
+        while i < n:
+            if self.in_string:
+                if self.escape is not None:
+                    if self.escape == "" and data[i] != ord("u"):
+                        if self.capture:
+                            out.append(self._escaped(_JSON_ESCAPES.get(data[i], chr(data[i]))))
+                        self.escape = None
+                    elif self.escape == "":
+                        self.escape = "u"
+                    else:
+                        self.escape += chr(data[i])
+                        if len(self.escape) == 5:
+                            if self.capture:
+                                out.append(self._escaped(chr(int(self.escape[1:], 16))))
+                            self.escape = None
+                    i += 1
+                    continue
+                match = _STRING_SPECIAL.search(data, i)
+                end = match.start() if match else n
+                if self.capture:
+                    out.append(self.decoder.decode(data[i:end]))
+                elif self.key is not None:
+                    self.key += data[i:end]
+                    if len(self.key) > self.MAX_KEY:
+                        self.key = None
+                if not match:
+                    break
+                i = end + 1
+                if data[end] == ord("\\"):
+                    self.escape = ""
+                    continue
+                # Closing quote
+                self.in_string = False
+                if self.capture:
+                    out.append(self.decoder.decode(b"", final=True))
+                    self.capture = False
+                elif self.key is not None:
+                    self.key_done = True
+                continue
+            
+            char = data[i]
+            i += 1
+            if char in b" \t\r\n":
+                continue
+            if char == ord('"'):
+                self.in_string = True
+                if self.depth == 1 and self.expect_key:
+                    self.key = bytearray()
+                    self.expect_key = False
+                elif self.depth == 1 and self.value_next:
+                    self.capture = True
+                    self.value_next = False
+                continue
+            if char == ord(":"):
+                if self.depth == 1:
+                    self.value_next = bool(self.key_done and self.key == self.name)
+                self.key = None
+                self.key_done = False
+                continue
+            self.value_next = False
+            if char in b"{[":
+                self.depth += 1
+                self.expect_key = self.depth == 1 and char == ord("{")
+            elif char in b"}]":
+                self.depth -= 1
+            elif char == ord(",") and self.depth == 1:
+                self.expect_key = True
+        return "".join(out)
+
+
+class _LineSplitter:
+    """Splits streamed text into (line number, byte offset, line) tuples."""
+    
+    def __init__(self, offset: int = 0):
+        self.offset = offset
+        self.line_number = 0
+        self.partial = ""
+    
+    def feed(self, text: str) -> List[Tuple[int, int, str]]:
+        lines = (self.partial + text).split("\n")
+        self.partial = lines.pop()
+        result = []
+        for line in lines:
+            self.line_number += 1
+            result.append((self.line_number, self.offset, line))
+            self.offset += len(line.encode("utf-8", "surrogatepass")) + 1
+        return result
+    
+    def flush(self) -> List[Tuple[int, int, str]]:
+        if not self.partial:
+            return []
+        self.line_number += 1
+        line, self.partial = self.partial, ""
+        return [(self.line_number, self.offset, line)]
+
+
+def _log_chunks(pieces: Iterable[str], offset: int, start: int) -> Iterator[LogChunk]:
+    """Attach byte offsets to decoded log pieces, skipping everything before ``start``."""
+    for text in pieces:
+        if not text:
+            continue
+        data = text.encode("utf-8", "surrogatepass")
+        end = offset + len(data)
+        if end > start:
+            if offset < start:
+                text = data[start - offset:].decode("utf-8", "replace")
+                offset = start
+            yield LogChunk(offset, end, text)
+        offset = end
+
+
+class _LogReader:
+    """Turns a streamed iteration body into LogChunks, starting at byte ``start`` of the log."""
+    
+    def __init__(self, start: int = 0):
+        self.parser = _JSONFieldStream("log_output")
+        self.start = start
+        self.position = 0
+    
+    def feed(self, data: bytes) -> List[LogChunk]:
+        text = self.parser.feed(data)
+        chunks = list(_log_chunks([text], self.position, self.start))
+        self.position += len(text.encode("utf-8", "surrogatepass"))
+        return chunks
+
+
+class _LogSearch:
+    """Regex search over (line number, byte offset, line) tuples, up to ``max_matches`` hits."""
+    
+    def __init__(self, pattern: Union[str, "re.Pattern"], max_matches: Optional[int] = None):
+        self.regex = re.compile(pattern)
+        self.remaining = max_matches
+    
+    @property
+    def done(self) -> bool:
+        return self.remaining is not None and self.remaining <= 0
+    
+    def match(self, line_number: int, offset: int, line: str) -> Optional[LogMatch]:
+        match = self.regex.search(line)
+        if not match:
+            return None
+        if self.remaining is not None:
+            self.remaining -= 1
+        return LogMatch(line_number, offset, line, match)
+
+
+def _websockets(required: bool) -> Any:
+    """The websockets package, or None if it's missing and push isn't required."""
+    try:
+        import websockets
+        import websockets.exceptions
+        import websockets.sync.client
+    except ImportError as e:
+        if required:
+            raise ImportError("Push mode requires the websockets package: pip install websockets") from e
+        return None
+    return websockets
+
+
+def _overview_snapshot(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "fetched_at": time.time(),
+        "projects": entries,
+        "failed": [entry["project"]["id"] for entry in entries if entry["errors"]],
+    }
+
+
+def _match_status(project: Dict[str, Any], status: Union[None, str, Iterable[str]]) -> bool:
+    if status is None:
+        return True
+    return project.get("status") in ({status} if isinstance(status, str) else set(status))
+
+
+def _total_rss(system: Dict[str, Any]) -> float:
+    process = system.get("process") or {}
+    total = process.get("total_rss_mb")
+    if total is None:
+        total = (process.get("rss_mb") or 0.0) + (process.get("children_rss_mb") or 0.0)
+    return float(total)
+
+
+def _bulk_row(action: str, project: Dict[str, Any]) -> Dict[str, Any]:
+    row = {
+        "project_id": project["id"],
+        "action": action,
+        "outcome": None,
+        "status_before": project.get("status"),
+        "response": None,
+        "error": None,
+    }
+    if "total_rss_mb" in project:
+        row["total_rss_mb"] = project["total_rss_mb"]
+    return row
+
+
+def _bulk_result(
+    action: str, rows: List[Dict[str, Any]], project_ids: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """Result dict of a bulk action; named projects that weren't selected get a 'skipped' row."""
+    selected = {row["project_id"] for row in rows}
+    for project_id in project_ids or []:
+        if project_id not in selected:
+            row = _bulk_row(action, {"id": project_id})
+            row["outcome"] = "skipped"
+            row["error"] = "unknown project or not matching the selector"
+            rows.append(row)
+            selected.add(project_id)
+    return {
+        "action": action,
+        "finished_at": time.time(),
+        "results": rows,
+        "failed": [row["project_id"] for row in rows if row["outcome"] == "failed"],
+    }
+
+
+def format_bulk_result(result: Dict[str, Any]) -> str:
+    """Render a bulk_action() result as a plain-text table, one row per project."""
+    lines = [f"{'PROJECT':<24} {'BEFORE':<9} {'OUTCOME':<10} DETAIL"]
+    for row in result["results"]:
+        detail = row["error"] or ""
+        if not detail and "total_rss_mb" in row:
+            detail = f"rss {row['total_rss_mb']:.0f} MB"
+        lines.append(
+            f"{row['project_id']:<24} {str(row['status_before']):<9} {row['outcome']:<10} {detail}".rstrip()
+        )
+    done = sum(1 for row in result["results"] if row["outcome"] == "done")
+    unchanged = sum(1 for row in result["results"] if row["outcome"] == "unchanged")
+    lines.append(
+        f"{result['action']}: {done} done, {unchanged} unchanged, {len(result['failed'])} failed, "
+        f"{len(result['results'])} total"
+    )
+    return "\n".join(lines)
+
+
+class _ClientBase:
+    """Token and retry state, request building and result shaping shared by the clients."""
     
-    def __init__(self, base_url: str = "http://localhost:8420"):
+    def __init__(
+        self,
+        base_url: str,
+        retries: int,
+        backoff: float,
+        token_cache: Union[bool, str, TokenCache, None],
+    ):
         self.base_url = base_url.rstrip("/")
         self.token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+        self.token_expires: Optional[float] = None
+        self.username: Optional[str] = None
+        self.retries = retries
+        self.backoff = backoff
         
-    def login(self, username: str, password: str) -> Dict[str, Any]:
-        """Authenticate and store access token."""
-        response = httpx.post(
-            f"{self.base_url}/api/auth/login",
-            json={"username": username, "password": password},
-            timeout=10.0
-        )
-        response.raise_for_status()
-        data = response.json()
+        if token_cache is None and os.environ.get("RALPH_TOKEN_CACHE"):
+            token_cache = True
+        if token_cache is True:
+            token_cache = TokenCache()
+        elif isinstance(token_cache, str):
+            token_cache = TokenCache(token_cache)
+        self.token_cache: Optional[TokenCache] = token_cache or None
+    
+    def _cache_key(self) -> str:
+        return f"{self.base_url} {self.username}"
+    
+    def _set_tokens(self, data: Dict[str, Any]) -> None:
+        """Adopt a login/refresh response and write it to the token cache."""
         self.token = data["access_token"]
-        return data
+        self.refresh_token = data.get("refresh_token") or self.refresh_token
+        self.token_expires = _token_expiry(self.token)
+        if self.token_cache and self.username:
+            self.token_cache.put(self._cache_key(), {
+                "access_token": self.token,
+                "refresh_token": self.refresh_token,
+                "expires": self.token_expires,
+            })
+    
+    def _load_cached_tokens(self, username: str) -> bool:
+        """Adopt cached tokens for this user if usable; returns True if so."""
+        self.username = username
+        cached = self.token_cache.get(self._cache_key()) if self.token_cache else None
+        if not cached:
+            return False
+        expires = cached.get("expires")
+        fresh = expires is None or expires - REFRESH_MARGIN > time.time()
+        if not fresh and not cached.get("refresh_token"):
+            return False
+        self.token = cached["access_token"]
+        self.refresh_token = cached.get("refresh_token")
+        self.token_expires = expires
+        return True
+    
+    def _forget_tokens(self) -> None:
+        if self.token_cache and self.username:
+            self.token_cache.delete(self._cache_key())
+        self.token = self.refresh_token = self.token_expires = None
+    
+    def _token_expiring(self) -> bool:
+        return bool(
+            self.refresh_token and self.token_expires is not None
+            and self.token_expires - REFRESH_MARGIN <= time.time()
+        )
+    
+    def _ws_url(self) -> str:
+        """URL of the /api/ws push channel, authenticated with the access token."""
+        parts = urllib.parse.urlsplit(self.base_url)
+        scheme = "wss" if parts.scheme == "https" else "ws"
+        query = urllib.parse.urlencode({"token": self.token or ""})
+        return urllib.parse.urlunsplit((scheme, parts.netloc, parts.path + "/api/ws", query, ""))
     
     def _headers(self) -> Dict[str, str]:
         """Get auth headers."""
@@ -30,127 +731,2188 @@ class RalphDashboardClient:
             raise ValueError("Not authenticated. Call login() first.")
         return {"Authorization": f"Bearer {self.token}"}
     
+    def _tokens(self) -> Dict[str, Any]:
+        return {"access_token": self.token, "refresh_token": self.refresh_token, "token_type": "bearer"}
+    
+    # Request building and response shaping. RalphDashboardClient and
+    # AsyncRalphDashboardClient only add the I/O around these: sending,
+    # sleeping, reading streams and running requests concurrently.
+    
+    @staticmethod
+    def _deadline(timeout: Optional[float]) -> Optional[float]:
+        return None if timeout is None else time.monotonic() + timeout
+    
+    @staticmethod
+    def _expired(deadline: Optional[float]) -> bool:
+        return deadline is not None and time.monotonic() >= deadline
+    
+    @staticmethod
+    def _wait(deadline: Optional[float], interval: float) -> float:
+        """Seconds to wait before the next round, cut short by ``deadline``."""
+        return interval if deadline is None else max(0.0, min(interval, deadline - time.monotonic()))
+    
+    def _build_request(
+        self, method: str, path: str, auth: bool, headers: Optional[Dict[str, str]], kwargs: Dict[str, Any]
+    ) -> httpx.Request:
+        headers = dict(headers or {})
+        if auth:
+            headers.update(self._headers())
+        return self._client.build_request(method, f"{self.base_url}{path}", headers=headers, **kwargs)
+    
+    def _retry_step(
+        self,
+        retry_method: str,
+        attempt: int,
+        refreshed: bool,
+        auth: bool,
+        response: Optional[httpx.Response] = None,
+        error: Optional[Exception] = None
+    ) -> Optional[Tuple[str, float]]:
+        """What _request() does after an attempt that got ``response`` or raised ``error``.
+        
+        Returns:
+            ("refresh", 0.0) to refresh the token and resend, ("retry",
+            delay) to resend after ``delay`` seconds, or None if the
+            response (or error) is final
+        """
+        if error is not None:
+            if attempt >= self.retries or not _retryable(retry_method, error=error):
+                return None
+            return "retry", _retry_delay(attempt, self.backoff)
+        if response.status_code == 401 and auth and self.refresh_token and not refreshed:
+            return "refresh", 0.0
+        if attempt < self.retries and _retryable(retry_method, status=response.status_code):
+            return "retry", _retry_delay(attempt, self.backoff, response.headers.get("Retry-After"))
+        return None
+    
+    @staticmethod
+    def _response_result(response: httpx.Response, raw: bool, stream: bool) -> Any:
+        """What _request() returns for a final response; raises for error statuses."""
+        if (raw or stream) and response.status_code == 304:
+            return response
+        response.raise_for_status()
+        return response if raw or stream else response.json()
+    
+    def _login_request(self, username: str, password: str) -> Dict[str, Any]:
+        self.username = username
+        return {
+            "method": "POST", "path": "/api/auth/login", "auth": False,
+            "json": {"username": username, "password": password},
+        }
+    
+    def _refresh_request(self, expired_token: Optional[str]) -> Optional[Dict[str, Any]]:
+        """The refresh request to send, or None if no refresh is needed.
+        
+        Nothing is sent if another caller already replaced ``expired_token``,
+        or (without one) if the token isn't expiring yet.
+        
+        Raises:
+            ValueError: If there is no refresh token
+        """
+        if not self.refresh_token:
+            raise ValueError("No refresh token. Call login() first.")
+        if expired_token is not None and self.token != expired_token:
+            return None
+        if expired_token is None and not self._token_expiring():
+            return None
+        return {
+            "method": "POST", "path": "/api/auth/refresh", "auth": False,
+            "json": {"refresh_token": self.refresh_token},
+        }
+    
+    @staticmethod
+    def _iterations_request(project_id: str, limit: int = 50, offset: int = 0, status: str = "all") -> Dict[str, Any]:
+        return {
+            "method": "GET", "path": f"/api/projects/{project_id}/iterations",
+            "params": {"limit": limit, "offset": offset, "status": status},
+        }
+    
+    @staticmethod
+    def _log_request(project_id: str, number: int, etag: Optional[str] = None) -> Dict[str, Any]:
+        """Streamed GET of an iteration, conditional on ``etag`` if given."""
+        return {
+            "method": "GET", "path": f"/api/projects/{project_id}/iterations/{number}", "stream": True,
+            "headers": {"If-None-Match": etag} if etag else None,
+        }
+    
+    @staticmethod
+    def _iteration_finished(page: Dict[str, Any], number: int) -> bool:
+        """Whether an iteration list (newest first) shows iteration ``number`` as finished."""
+        latest = page.get("iterations", [])
+        return bool(latest) and latest[0].get("number", 0) >= number
+    
+    @staticmethod
+    def _watch_requests(state: _WatchState) -> List[Tuple[Dict[str, Any], Callable[[Any], List[WatchEvent]]]]:
+        """The conditional GETs of one watch poll, each with the handler for a changed body."""
+        base = f"/api/projects/{state.project_id}"
+        requests = []
+        for path, params, handler in (
+            (base, None, state.on_project),
+            (f"{base}/iterations", {"limit": WATCH_ITERATIONS}, lambda page: state.on_iterations(page.get("iterations", []))),
+            (f"{base}/notifications", None, state.on_notifications),
+        ):
+            headers = {"If-None-Match": state.etags[path]} if path in state.etags else None
+            requests.append(({"method": "GET", "path": path, "raw": True, "params": params, "headers": headers}, handler))
+        return requests
+    
+    @staticmethod
+    def _watch_events(
+        state: _WatchState, request: Dict[str, Any], handler: Callable[[Any], List[WatchEvent]], response: httpx.Response
+    ) -> List[WatchEvent]:
+        data = state.changed(request["path"], response)
+        return [] if data is None else handler(data)
+    
+    @staticmethod
+    def _push_events(state: _WatchState, message: Union[str, bytes]) -> List[WatchEvent]:
+        """Events for one raw websocket message; undecodable messages are skipped."""
+        try:
+            message = json.loads(message)
+        except ValueError:
+            return []
+        return state.on_message(message) if isinstance(message, dict) else []
+    
+    @staticmethod
+    def _overview_jobs(projects: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[tuple]]:
+        """Overview entries for ``projects`` and the (entry, part, request) jobs that fill them in."""
+        entries = [_overview_entry(project) for project in projects]
+        jobs = []
+        for entry in entries:
+            project_id = entry["project"]["id"]
+            requests = {
+                "stats": {"method": "GET", "path": f"/api/projects/{project_id}/stats"},
+                "latest_iteration": _ClientBase._iterations_request(project_id, limit=1),
+                "system": {"method": "GET", "path": f"/api/projects/{project_id}/system"},
+            }
+            jobs.extend((entry, part, requests[part]) for part in OVERVIEW_PARTS)
+        return entries, jobs
+    
+    @staticmethod
+    def _overview_result(entries: List[Dict[str, Any]], jobs: List[tuple], results: List[Any]) -> Dict[str, Any]:
+        for (entry, part, _), result in zip(jobs, results):
+            _set_overview_part(entry, part, result)
+        return _overview_snapshot(entries)
+    
+    @staticmethod
+    def _selected(
+        projects: List[Dict[str, Any]], project_ids: Optional[Iterable[str]], status: Union[None, str, Iterable[str]]
+    ) -> List[Dict[str, Any]]:
+        wanted = None if project_ids is None else set(project_ids)
+        return [
+            project for project in projects
+            if (wanted is None or project["id"] in wanted) and _match_status(project, status)
+        ]
+    
+    @staticmethod
+    def _system_request(project: Dict[str, Any]) -> Dict[str, Any]:
+        return {"method": "GET", "path": f"/api/projects/{project['id']}/system"}
+    
+    @staticmethod
+    def _with_rss(projects: List[Dict[str, Any]], systems: List[Any], min_rss_mb: float) -> List[Dict[str, Any]]:
+        """Projects using at least ``min_rss_mb``, with 'total_rss_mb' added; failed fetches are left out."""
+        selected = []
+        for project, system in zip(projects, systems):
+            if isinstance(system, BaseException):
+                continue
+            try:
+                total = _total_rss(system)
+            except ValueError:
+                continue
+            if total >= min_rss_mb:
+                selected.append(dict(project, total_rss_mb=total))
+        return selected
+    
+    @staticmethod
+    def _bulk_check(action: str, instruction: Optional[str]) -> None:
+        if action not in BULK_ACTIONS:
+            raise ValueError(f"Unknown action {action!r}; expected one of {', '.join(BULK_ACTIONS)}")
+        if action == "inject" and not instruction:
+            raise ValueError("inject needs an instruction")
+    
+    @staticmethod
+    def _bulk_request(row: Dict[str, Any], instruction: Optional[str]) -> Optional[Dict[str, Any]]:
+        """The action request for a bulk row, or None (marking it 'unchanged') if there's nothing to do."""
+        action = row["action"]
+        target = BULK_ACTIONS[action]
+        if target is not None and row["status_before"] == target:
+            row["outcome"] = "unchanged"
+            return None
+        path = f"/api/projects/{row['project_id']}/{action}"
+        if action == "inject":
+            return {"method": "POST", "path": path, "json": {"instruction": instruction}}
+        return {"method": "POST", "path": path, "idempotent": True}
+    
+    @staticmethod
+    def _bulk_outcome(row: Dict[str, Any], result: Any) -> Optional[Dict[str, Any]]:
+        """Record an action's response or error; returns the status check to make after a failure."""
+        if not isinstance(result, BaseException):
+            row["response"], row["outcome"] = result, "done"
+            return None
+        row["outcome"], row["error"] = "failed", _error_text(result)
+        if BULK_ACTIONS[row["action"]] is None:
+            return None
+        # A lost response or a 4xx for "already paused" can hide a
+        # transition that did happen; the project status is the truth.
+        return {"method": "GET", "path": f"/api/projects/{row['project_id']}"}
+    
+    @staticmethod
+    def _bulk_confirm(row: Dict[str, Any], project: Any) -> None:
+        if isinstance(project, dict) and project.get("status") == BULK_ACTIONS[row["action"]]:
+            row["outcome"], row["error"] = "done", None
+
+
+class RalphDashboardClient(_ClientBase):
+    """Simple client for Ralph Dashboard REST API.
+    
+    Requests go through one persistent httpx.Client, so connections (and
+    TLS sessions) are reused across calls. HTTP/2 is used when the h2
+    package is installed and the server supports it. Use the client as a
+    context manager, or call close() when done.
+    
+    The access token is refreshed through /api/auth/refresh shortly before
+    it expires (or after a 401), and with a token cache login() reuses the
+    tokens of an earlier run instead of sending the password again. 429/5xx
+    responses and connection errors are retried with jittered backoff.
+    
+    Args:
+        base_url: Dashboard URL
+        timeout: Request timeout in seconds
+        http2: Enable HTTP/2 (default: if h2 is installed)
+        max_connections: Max open connections
+        max_keepalive_connections: Max idle connections kept for reuse
+        client: Existing httpx.Client to use instead of creating one
+            (its timeout and limits are used as they are)
+        retries: Max retries per request
+        backoff: Base delay in seconds for retries
+        token_cache: True for a TokenCache at TOKEN_CACHE_PATH, a path, a
+            TokenCache, or False (default: on if RALPH_TOKEN_CACHE is set)
+    
+    Example:
+        with RalphDashboardClient("https://ralph.example.com") as client:
+            client.login("admin", "password")
+            print(client.list_projects())
+    """
+    
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8420",
+        timeout: float = DEFAULT_TIMEOUT,
+        http2: Optional[bool] = None,
+        max_connections: int = MAX_CONNECTIONS,
+        max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS,
+        client: Optional[httpx.Client] = None,
+        retries: int = MAX_RETRIES,
+        backoff: float = BACKOFF_BASE,
+        token_cache: Union[bool, str, TokenCache, None] = None,
+    ):
+        super().__init__(base_url, retries, backoff, token_cache)
+        self.timeout = timeout
+        self._auth_lock = threading.Lock()
+        self._owns_client = client is None
+        self._client = client or httpx.Client(**_client_options(
+            timeout, http2, max_connections, max_keepalive_connections
+        ))
+    
+    def close(self) -> None:
+        """Close pooled connections (unless the httpx.Client was passed in)."""
+        if self._owns_client:
+            self._client.close()
+    
+    def __enter__(self) -> "RalphDashboardClient":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    def _request(
+        self,
+        method: str,
+        path: str,
+        auth: bool = True,
+        raw: bool = False,
+        stream: bool = False,
+        idempotent: bool = False,
+        **kwargs
+    ) -> Any:
+        """Send a request with retries and token refresh; return the decoded JSON body.
+        
+        With ``raw``, the httpx.Response is returned instead (e.g. for 304s).
+        With ``stream``, it is returned before the body is read; the caller
+        must close it. An ``idempotent`` request is retried like a GET even
+        if its method isn't one.
+        """
+        retry_method = "GET" if idempotent else method
+        headers = kwargs.pop("headers", None)
+        attempt = 0
+        refreshed = False
+        while True:
+            if auth and self._token_expiring():
+                self.refresh()
+            request = self._build_request(method, path, auth, headers, kwargs)
+            try:
+                response = self._client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                step = self._retry_step(retry_method, attempt, refreshed, auth, error=e)
+                if step is None:
+                    raise
+                time.sleep(step[1])
+                attempt += 1
+                continue
+            
+            step = self._retry_step(retry_method, attempt, refreshed, auth, response=response)
+            if step is not None:
+                if stream:
+                    response.close()
+                if step[0] == "refresh":
+                    refreshed = True
+                    self.refresh(expired_token=request.headers["Authorization"][7:])
+                else:
+                    time.sleep(step[1])
+                    attempt += 1
+                continue
+            if stream and response.is_error:
+                response.close()
+            return self._response_result(response, raw, stream)
+    
+    def login(self, username: str, password: str, force: bool = False) -> Dict[str, Any]:
+        """Authenticate and store access token.
+        
+        With a token cache, cached tokens for this user are reused (and
+        refreshed if needed) unless ``force`` is set.
+        """
+        if not force and self._load_cached_tokens(username):
+            try:
+                if self._token_expiring():
+                    self.refresh()
+                return self._tokens()
+            except httpx.HTTPStatusError:
+                self._forget_tokens()
+        
+        data = self._request(**self._login_request(username, password))
+        self._set_tokens(data)
+        return data
+    
+    def refresh(self, expired_token: Optional[str] = None) -> Dict[str, Any]:
+        """Get a new access token with the refresh token.
+        
+        Concurrent callers share one refresh: if another thread already
+        replaced ``expired_token`` (or the token is no longer expiring),
+        nothing is sent.
+        
+        Raises:
+            ValueError: If there is no refresh token
+            httpx.HTTPStatusError: If the server rejects the refresh token
+        """
+        with self._auth_lock:
+            request = self._refresh_request(expired_token)
+            if request is None:
+                return self._tokens()
+            data = self._request(**request)
+            self._set_tokens(data)
+            return data
+    
     def list_projects(self) -> List[Dict[str, Any]]:
         """List all Ralph projects."""
-        response = httpx.get(
-            f"{self.base_url}/api/projects",
-            headers=self._headers(),
-            timeout=10.0
-        )
-        response.raise_for_status()
-        return response.json()
+        return self._request("GET", "/api/projects")
     
     def get_project(self, project_id: str) -> Dict[str, Any]:
         """Get detailed project info."""
-        response = httpx.get(
-            f"{self.base_url}/api/projects/{project_id}",
-            headers=self._headers(),
-            timeout=10.0
-        )
-        response.raise_for_status()
-        return response.json()
+        return self._request("GET", f"/api/projects/{project_id}")
     
     def get_stats(self, project_id: str) -> Dict[str, Any]:
         """Get project statistics."""
-        response = httpx.get(
-            f"{self.base_url}/api/projects/{project_id}/stats",
-            headers=self._headers(),
-            timeout=10.0
-        )
-        response.raise_for_status()
-        return response.json()
+        return self._request("GET", f"/api/projects/{project_id}/stats")
     
     def start_loop(self, project_id: str) -> Dict[str, Any]:
         """Start a Ralph loop."""
-        response = httpx.post(
-            f"{self.base_url}/api/projects/{project_id}/start",
-            headers=self._headers(),
-            timeout=10.0
-        )
-        response.raise_for_status()
-        return response.json()
+        return self._request("POST", f"/api/projects/{project_id}/start")
     
     def stop_loop(self, project_id: str) -> Dict[str, Any]:
         """Stop a Ralph loop."""
-        response = httpx.post(
-            f"{self.base_url}/api/projects/{project_id}/stop",
-            headers=self._headers(),
-            timeout=10.0
-        )
-        response.raise_for_status()
-        return response.json()
+        return self._request("POST", f"/api/projects/{project_id}/stop")
     
     def pause_loop(self, project_id: str) -> Dict[str, Any]:
         """Pause a Ralph loop."""
-        response = httpx.post(
-            f"{self.base_url}/api/projects/{project_id}/pause",
-            headers=self._headers(),
-            timeout=10.0
-        )
-        response.raise_for_status()
-        return response.json()
+        return self._request("POST", f"/api/projects/{project_id}/pause")
     
     def resume_loop(self, project_id: str) -> Dict[str, Any]:
         """Resume a paused Ralph loop."""
-        response = httpx.post(
-            f"{self.base_url}/api/projects/{project_id}/resume",
-            headers=self._headers(),
-            timeout=10.0
-        )
-        response.raise_for_status()
-        return response.json()
+        return self._request("POST", f"/api/projects/{project_id}/resume")
     
     def inject_instruction(self, project_id: str, instruction: str) -> Dict[str, Any]:
         """Inject an instruction for the next loop iteration."""
-        response = httpx.post(
-            f"{self.base_url}/api/projects/{project_id}/inject",
-            headers=self._headers(),
-            json={"instruction": instruction},
-            timeout=10.0
-        )
-        response.raise_for_status()
-        return response.json()
-    
-    def get_iterations(self, project_id: str, limit: int = 50) -> List[Dict[str, Any]]:
-        """Get recent iterations."""
-        response = httpx.get(
-            f"{self.base_url}/api/projects/{project_id}/iterations",
-            headers=self._headers(),
-            params={"limit": limit},
-            timeout=10.0
+        return self._request(
+            "POST", f"/api/projects/{project_id}/inject", json={"instruction": instruction}
         )
-        response.raise_for_status()
-        return response.json()
+    
+    def get_iterations(
+        self, project_id: str, limit: int = 50, offset: int = 0, status: str = "all"
+    ) -> Dict[str, Any]:
+        """Get recent iterations, newest first.
+        
+        Returns:
+            Dict with 'iterations' (without log output) and 'total'
+        """
+        return self._request(**self._iterations_request(project_id, limit, offset, status))
+    
+    def get_iteration(self, project_id: str, number: int) -> Dict[str, Any]:
+        """Get one iteration including its full log_output."""
+        return self._request("GET", f"/api/projects/{project_id}/iterations/{number}")
+    
+    def iter_log(
+        self, project_id: str, number: int, start: int = 0, chunk_size: int = LOG_CHUNK_SIZE
+    ) -> Iterator[LogChunk]:
+        """Stream an iteration's log_output in chunks, without loading it whole.
+        
+        The iteration detail is read from the network in ``chunk_size``
+        pieces and only the log field is decoded, so memory use stays the
+        same however long the log is.
+        
+        Args:
+            project_id: Project id
+            number: Iteration number
+            start: Byte offset to start from (e.g. the ``end`` of an earlier chunk)
+            chunk_size: Bytes read per network chunk
+        
+        Yields:
+            LogChunk objects with byte offsets into the log
+        """
+        response = self._request(**self._log_request(project_id, number))
+        try:
+            reader = _LogReader(start)
+            for data in response.iter_bytes(chunk_size):
+                yield from reader.feed(data)
+        finally:
+            response.close()
+    
+    def iter_log_lines(self, project_id: str, number: int, start: int = 0) -> Iterator[Tuple[int, int, str]]:
+        """Stream an iteration's log as (line number, byte offset, line) tuples."""
+        splitter = _LineSplitter(start)
+        for chunk in self.iter_log(project_id, number, start=start):
+            yield from splitter.feed(chunk.text)
+        yield from splitter.flush()
+    
+    def tail_log(self, project_id: str, number: int, lines: int = 50) -> List[str]:
+        """Last ``lines`` lines of an iteration's log (only those are kept in memory)."""
+        return [line for _, _, line in collections.deque(self.iter_log_lines(project_id, number), maxlen=lines)]
+    
+    def search_log(
+        self, project_id: str, number: int, pattern: Union[str, "re.Pattern"], max_matches: Optional[int] = None
+    ) -> Iterator[LogMatch]:
+        """Yield log lines matching a regex, scanning the log as it streams.
+        
+        Example:
+            for hit in client.search_log("my-project", 12, r"ERROR|Traceback"):
+                print(hit.line_number, hit.line)
+        """
+        search = _LogSearch(pattern, max_matches)
+        for line in self.iter_log_lines(project_id, number):
+            hit = search.match(*line)
+            if hit:
+                yield hit
+                if search.done:
+                    return
+    
+    def follow_log(
+        self,
+        project_id: str,
+        number: int,
+        start: int = 0,
+        poll_interval: float = LOG_FOLLOW_INTERVAL,
+        timeout: Optional[float] = None
+    ) -> Iterator[LogChunk]:
+        """Yield new log output of a (possibly still running) iteration as it grows.
+        
+        The iteration is re-requested every ``poll_interval`` seconds with
+        If-None-Match, and only the bytes past the last offset are
+        yielded. Following ends once the iteration shows up as finished in
+        the iteration list (after yielding its remaining output), or when
+        ``timeout`` expires. An iteration that doesn't exist yet is waited for.
+        """
+        deadline = self._deadline(timeout)
+        offset = start
+        etag = None
+        while True:
+            finished = self._iteration_finished(self.get_iterations(project_id, limit=1), number)
+            try:
+                response = self._request(**self._log_request(project_id, number, etag))
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code != 404 or finished:
+                    raise
+                response = None
+            if response is not None:
+                try:
+                    if response.status_code != 304:
+                        etag = response.headers.get("ETag")
+                        reader = _LogReader(offset)
+                        for data in response.iter_bytes(LOG_CHUNK_SIZE):
+                            for chunk in reader.feed(data):
+                                offset = chunk.end
+                                yield chunk
+                finally:
+                    response.close()
+            if finished or self._expired(deadline):
+                return
+            time.sleep(self._wait(deadline, poll_interval))
     
     def get_plan(self, project_id: str) -> Dict[str, Any]:
         """Get implementation plan."""
-        response = httpx.get(
-            f"{self.base_url}/api/projects/{project_id}/plan",
-            headers=self._headers(),
-            timeout=10.0
+        return self._request("GET", f"/api/projects/{project_id}/plan")
+    
+    def get_system(self, project_id: str) -> Dict[str, Any]:
+        """Get process and system metrics for a project's loop."""
+        return self._request("GET", f"/api/projects/{project_id}/system")
+    
+    def get_notifications(self, project_id: str) -> List[Dict[str, Any]]:
+        """Get notification history, newest first."""
+        return self._request("GET", f"/api/projects/{project_id}/notifications")
+    
+    def watch(
+        self,
+        project_id: str,
+        poll_interval: float = WATCH_POLL_INTERVAL,
+        push: Optional[bool] = None,
+        timeout: Optional[float] = None
+    ) -> Iterator[WatchEvent]:
+        """Yield live events for a project as they happen.
+        
+        Events arrive over the dashboard's /api/ws websocket when the
+        websockets package is installed and the server accepts the
+        connection; a dropped connection is re-opened (with a catch-up poll
+        for anything missed). Otherwise the project, its latest iterations
+        and its notifications are polled every ``poll_interval`` seconds
+        with If-None-Match, so an unchanged poll costs three 304s.
+        
+        Args:
+            project_id: Project to watch
+            poll_interval: Seconds between polls when polling
+            push: True to require the websocket, False to always poll,
+                None to use the websocket if possible
+            timeout: Stop after this many seconds (default: run until the
+                caller stops iterating)
+        
+        Yields:
+            IterationStarted, IterationFinished, NotificationRaised and
+            LoopStateChanged events
+        
+        Example:
+            for event in client.watch("my-project"):
+                if isinstance(event, NotificationRaised) and event.prefix == "ERROR":
+                    handle_error(event.notification)
+        """
+        state = _WatchState(project_id)
+        deadline = self._deadline(timeout)
+        self._watch_poll(state)
+        
+        websockets = _websockets(required=push is True) if push is not False else None
+        if websockets is not None:
+            yield from self._watch_push(state, websockets, deadline, required=push is True)
+        
+        while not self._expired(deadline):
+            yield from self._watch_poll(state)
+            time.sleep(self._wait(deadline, poll_interval))
+    
+    def _watch_poll(self, state: _WatchState) -> List[WatchEvent]:
+        """One round of conditional GETs; returns the events it implies."""
+        events: List[WatchEvent] = []
+        for request, handler in self._watch_requests(state):
+            events.extend(self._watch_events(state, request, handler, self._request(**request)))
+        return events
+    
+    def _watch_push(
+        self, state: _WatchState, websockets: Any, deadline: Optional[float], required: bool
+    ) -> Iterator[WatchEvent]:
+        """Yield pushed events until the deadline; returns early if push is unavailable."""
+        failures = 0
+        while not self._expired(deadline):
+            if self._token_expiring():
+                self.refresh()
+            try:
+                with websockets.sync.client.connect(self._ws_url(), open_timeout=self.timeout) as ws:
+                    if failures:
+                        yield from self._watch_poll(state)
+                    failures = 0
+                    while not self._expired(deadline):
+                        try:
+                            message = ws.recv(timeout=self._wait(deadline, WS_RECV_TIMEOUT))
+                        except TimeoutError:
+                            continue
+                        yield from self._push_events(state, message)
+            except websockets.exceptions.InvalidHandshake:
+                # The server has no push channel
+                if required:
+                    raise
+                return
+            except (OSError, websockets.exceptions.WebSocketException):
+                failures += 1
+                if failures > WS_RECONNECTS:
+                    if required:
+                        raise
+                    return
+                time.sleep(_retry_delay(failures - 1, self.backoff))
+    
+    def get_overview(self, max_concurrency: int = OVERVIEW_CONCURRENCY) -> Dict[str, Any]:
+        """Snapshot of every project with its stats, latest iteration and metrics.
+        
+        Lists the projects, then fetches the per-project parts concurrently
+        over the shared connection pool, so a refresh costs about two round
+        trips instead of one or more per project. A failed part is recorded
+        in that project's ``errors`` and left as None; the other parts and
+        projects are still returned.
+        
+        Args:
+            max_concurrency: Max requests in flight at once
+        
+        Returns:
+            Dict with 'fetched_at' (epoch seconds), 'projects' (one dict per
+            project with 'project', 'stats', 'latest_iteration', 'system' and
+            'errors' keys) and 'failed' (ids of projects with any error)
+        """
+        entries, jobs = self._overview_jobs(self.list_projects())
+        results = self._map(self._try_request, [request for _, _, request in jobs], max_concurrency)
+        return self._overview_result(entries, jobs, results)
+    
+    def select_projects(
+        self,
+        project_ids: Optional[Iterable[str]] = None,
+        status: Union[None, str, Iterable[str]] = None,
+        min_rss_mb: Optional[float] = None,
+        max_concurrency: int = OVERVIEW_CONCURRENCY
+    ) -> List[Dict[str, Any]]:
+        """Projects matching all of the given criteria (all projects if none given).
+        
+        Args:
+            project_ids: Only these projects
+            status: Loop status, or several (e.g. "running")
+            min_rss_mb: Only loops using at least this much memory, counting
+                child processes, per /system. Metrics of the candidates are
+                fetched concurrently and added as 'total_rss_mb'.
+            max_concurrency: Max /system requests in flight at once
+        
+        Returns:
+            Project dicts, in list_projects() order
+        """
+        projects = self._selected(self.list_projects(), project_ids, status)
+        if min_rss_mb is None or not projects:
+            return projects
+        systems = self._map(self._try_request, [self._system_request(project) for project in projects], max_concurrency)
+        return self._with_rss(projects, systems, min_rss_mb)
+    
+    def _map(self, function: Callable[[Any], Any], items: List[Any], max_concurrency: int) -> List[Any]:
+        """``function`` applied to each item on up to ``max_concurrency`` threads, in order."""
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(items)))) as pool:
+            return list(pool.map(function, items))
+    
+    def _try_request(self, request: Dict[str, Any]) -> Any:
+        """Send a request; the decoded body, or the error if it failed."""
+        try:
+            return self._request(**request)
+        except (httpx.HTTPError, ValueError) as e:
+            return e
+    
+    def _bulk_one(self, action: str, project: Dict[str, Any], instruction: Optional[str]) -> Dict[str, Any]:
+        row = _bulk_row(action, project)
+        request = self._bulk_request(row, instruction)
+        if request is not None:
+            check = self._bulk_outcome(row, self._try_request(request))
+            if check is not None:
+                self._bulk_confirm(row, self._try_request(check))
+        return row
+    
+    def bulk_action(
+        self,
+        action: str,
+        project_ids: Optional[Iterable[str]] = None,
+        status: Union[None, str, Iterable[str]] = None,
+        min_rss_mb: Optional[float] = None,
+        instruction: Optional[str] = None,
+        max_concurrency: int = BULK_CONCURRENCY
+    ) -> Dict[str, Any]:
+        """Apply a loop-control action to many projects concurrently.
+        
+        Projects are chosen as in select_projects(). Loops already in the
+        action's resulting state are left alone ('unchanged'), and because
+        the transitions are idempotent they are retried on timeouts and 5xx
+        responses as well as on connection errors; after a failure the
+        project status is checked once more before reporting it. Injected
+        instructions are only retried when the request wasn't delivered.
+        One project's failure doesn't stop the others.
+        
+        Args:
+            action: "start", "stop", "pause", "resume" or "inject"
+            project_ids: Only these projects
+            status: Only loops in this status (or several)
+            min_rss_mb: Only loops using at least this much memory
+            instruction: Instruction text for "inject"
+            max_concurrency: Max actions in flight at once
+        
+        Returns:
+            Dict with 'action', 'finished_at', 'results' (one row per
+            project with 'project_id', 'outcome' ("done", "unchanged",
+            "skipped" or "failed"), 'status_before', 'response' and 'error')
+            and 'failed' (ids of projects whose action failed)
+        
+        Example:
+            result = client.bulk_action("pause", status="running", min_rss_mb=1500)
+            print(format_bulk_result(result))
+        """
+        self._bulk_check(action, instruction)
+        project_ids = None if project_ids is None else list(project_ids)
+        projects = self.select_projects(project_ids, status, min_rss_mb)
+        rows = self._map(lambda project: self._bulk_one(action, project, instruction), projects, max_concurrency)
+        return _bulk_result(action, rows, project_ids)
+    
+    def start_loops(self, project_ids: Optional[Iterable[str]] = None, **selector) -> Dict[str, Any]:
+        """Start several loops; see bulk_action() for selectors and the result."""
+        return self.bulk_action("start", project_ids, **selector)
+    
+    def stop_loops(self, project_ids: Optional[Iterable[str]] = None, **selector) -> Dict[str, Any]:
+        """Stop several loops; see bulk_action() for selectors and the result."""
+        return self.bulk_action("stop", project_ids, **selector)
+    
+    def pause_loops(self, project_ids: Optional[Iterable[str]] = None, **selector) -> Dict[str, Any]:
+        """Pause several loops; see bulk_action() for selectors and the result."""
+        return self.bulk_action("pause", project_ids, **selector)
+    
+    def resume_loops(self, project_ids: Optional[Iterable[str]] = None, **selector) -> Dict[str, Any]:
+        """Resume several paused loops; see bulk_action() for selectors and the result."""
+        return self.bulk_action("resume", project_ids, **selector)
+    
+    def inject_instructions(
+        self, instruction: str, project_ids: Optional[Iterable[str]] = None, **selector
+    ) -> Dict[str, Any]:
+        """Inject one instruction into several loops; see bulk_action()."""
+        return self.bulk_action("inject", project_ids, instruction=instruction, **selector)
+
+
+class AsyncRalphDashboardClient(_ClientBase):
+    """Async client for Ralph Dashboard REST API.
+    
+    Same methods and options as RalphDashboardClient, as coroutines over
+    a persistent httpx.AsyncClient, so many projects can be polled
+    concurrently from one event loop.
+    
+    Example:
+        async with AsyncRalphDashboardClient("https://ralph.example.com") as client:
+            await client.login("admin", "password")
+            projects = await client.list_projects()
+            stats = await asyncio.gather(*(client.get_stats(p["id"]) for p in projects))
+    """
+    
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8420",
+        timeout: float = DEFAULT_TIMEOUT,
+        http2: Optional[bool] = None,
+        max_connections: int = MAX_CONNECTIONS,
+        max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS,
+        client: Optional[httpx.AsyncClient] = None,
+        retries: int = MAX_RETRIES,
+        backoff: float = BACKOFF_BASE,
+        token_cache: Union[bool, str, TokenCache, None] = None,
+    ):
+        super().__init__(base_url, retries, backoff, token_cache)
+        self.timeout = timeout
+        self._auth_lock: Optional[asyncio.Lock] = None
+        self._owns_client = client is None
+        self._client = client or httpx.AsyncClient(**_client_options(
+            timeout, http2, max_connections, max_keepalive_connections
+        ))
+    
+    async def aclose(self) -> None:
+        """Close pooled connections (unless the httpx.AsyncClient was passed in)."""
+        if self._owns_client:
+            await self._client.aclose()
+    
+    async def __aenter__(self) -> "AsyncRalphDashboardClient":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+    
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        auth: bool = True,
+        raw: bool = False,
+        stream: bool = False,
+        idempotent: bool = False,
+        **kwargs
+    ) -> Any:
+        """Send a request with retries and token refresh (see RalphDashboardClient._request)."""
+        retry_method = "GET" if idempotent else method
+        headers = kwargs.pop("headers", None)
+        attempt = 0
+        refreshed = False
+        while True:
+            if auth and self._token_expiring():
+                await self.refresh()
+            request = self._build_request(method, path, auth, headers, kwargs)
+            try:
+                response = await self._client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                step = self._retry_step(retry_method, attempt, refreshed, auth, error=e)
+                if step is None:
+                    raise
+                await asyncio.sleep(step[1])
+                attempt += 1
+                continue
+            
+            step = self._retry_step(retry_method, attempt, refreshed, auth, response=response)
+            if step is not None:
+                if stream:
+                    await response.aclose()
+                if step[0] == "refresh":
+                    refreshed = True
+                    await self.refresh(expired_token=request.headers["Authorization"][7:])
+                else:
+                    await asyncio.sleep(step[1])
+                    attempt += 1
+                continue
+            if stream and response.is_error:
+                await response.aclose()
+            return self._response_result(response, raw, stream)
+    
+    async def login(self, username: str, password: str, force: bool = False) -> Dict[str, Any]:
+        """Authenticate and store access token (see RalphDashboardClient.login)."""
+        if not force and self._load_cached_tokens(username):
+            try:
+                if self._token_expiring():
+                    await self.refresh()
+                return self._tokens()
+            except httpx.HTTPStatusError:
+                self._forget_tokens()
+        
+        data = await self._request(**self._login_request(username, password))
+        self._set_tokens(data)
+        return data
+    
+    async def refresh(self, expired_token: Optional[str] = None) -> Dict[str, Any]:
+        """Get a new access token (see RalphDashboardClient.refresh)."""
+        if self._auth_lock is None:
+            self._auth_lock = asyncio.Lock()
+        async with self._auth_lock:
+            request = self._refresh_request(expired_token)
+            if request is None:
+                return self._tokens()
+            data = await self._request(**request)
+            self._set_tokens(data)
+            return data
+    
+    async def list_projects(self) -> List[Dict[str, Any]]:
+        """List all Ralph projects."""
+        return await self._request("GET", "/api/projects")
+    
+    async def get_project(self, project_id: str) -> Dict[str, Any]:
+        """Get detailed project info."""
+        return await self._request("GET", f"/api/projects/{project_id}")
+    
+    async def get_stats(self, project_id: str) -> Dict[str, Any]:
+        """Get project statistics."""
+        return await self._request("GET", f"/api/projects/{project_id}/stats")
+    
+    async def start_loop(self, project_id: str) -> Dict[str, Any]:
+        """Start a Ralph loop."""
+        return await self._request("POST", f"/api/projects/{project_id}/start")
+    
+    async def stop_loop(self, project_id: str) -> Dict[str, Any]:
+        """Stop a Ralph loop."""
+        return await self._request("POST", f"/api/projects/{project_id}/stop")
+    
+    async def pause_loop(self, project_id: str) -> Dict[str, Any]:
+        """Pause a Ralph loop."""
+        return await self._request("POST", f"/api/projects/{project_id}/pause")
+    
+    async def resume_loop(self, project_id: str) -> Dict[str, Any]:
+        """Resume a paused Ralph loop."""
+        return await self._request("POST", f"/api/projects/{project_id}/resume")
+    
+    async def inject_instruction(self, project_id: str, instruction: str) -> Dict[str, Any]:
+        """Inject an instruction for the next loop iteration."""
+        return await self._request(
+            "POST", f"/api/projects/{project_id}/inject", json={"instruction": instruction}
         )
-        response.raise_for_status()
-        return response.json()
+    
+    async def get_iterations(
+        self, project_id: str, limit: int = 50, offset: int = 0, status: str = "all"
+    ) -> Dict[str, Any]:
+        """Get recent iterations, newest first.
+        
+        Returns:
+            Dict with 'iterations' (without log output) and 'total'
+        """
+        return await self._request(**self._iterations_request(project_id, limit, offset, status))
+    
+    async def get_iteration(self, project_id: str, number: int) -> Dict[str, Any]:
+        """Get one iteration including its full log_output."""
+        return await self._request("GET", f"/api/projects/{project_id}/iterations/{number}")
+    
+    async def iter_log(
+        self, project_id: str, number: int, start: int = 0, chunk_size: int = LOG_CHUNK_SIZE
+    ) -> AsyncIterator[LogChunk]:
+        """Stream an iteration's log_output in chunks (see RalphDashboardClient.iter_log)."""
+        response = await self._request(**self._log_request(project_id, number))
+        try:
+            reader = _LogReader(start)
+            async for data in response.aiter_bytes(chunk_size):
+                for chunk in reader.feed(data):
+                    yield chunk
+        finally:
+            await response.aclose()
+    
+    async def iter_log_lines(self, project_id: str, number: int, start: int = 0) -> AsyncIterator[Tuple[int, int, str]]:
+        """Stream an iteration's log as (line number, byte offset, line) tuples."""
+        splitter = _LineSplitter(start)
+        async for chunk in self.iter_log(project_id, number, start=start):
+            for line in splitter.feed(chunk.text):
+                yield line
+        for line in splitter.flush():
+            yield line
+    
+    async def tail_log(self, project_id: str, number: int, lines: int = 50) -> List[str]:
+        """Last ``lines`` lines of an iteration's log (only those are kept in memory)."""
+        tail: collections.deque = collections.deque(maxlen=lines)
+        async for _, _, line in self.iter_log_lines(project_id, number):
+            tail.append(line)
+        return list(tail)
+    
+    async def search_log(
+        self, project_id: str, number: int, pattern: Union[str, "re.Pattern"], max_matches: Optional[int] = None
+    ) -> AsyncIterator[LogMatch]:
+        """Yield log lines matching a regex (see RalphDashboardClient.search_log)."""
+        search = _LogSearch(pattern, max_matches)
+        async for line in self.iter_log_lines(project_id, number):
+            hit = search.match(*line)
+            if hit:
+                yield hit
+                if search.done:
+                    return
+    
+    async def follow_log(
+        self,
+        project_id: str,
+        number: int,
+        start: int = 0,
+        poll_interval: float = LOG_FOLLOW_INTERVAL,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[LogChunk]:
+        """Yield new log output as it grows (see RalphDashboardClient.follow_log)."""
+        deadline = self._deadline(timeout)
+        offset = start
+        etag = None
+        while True:
+            finished = self._iteration_finished(await self.get_iterations(project_id, limit=1), number)
+            try:
+                response = await self._request(**self._log_request(project_id, number, etag))
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code != 404 or finished:
+                    raise
+                response = None
+            if response is not None:
+                try:
+                    if response.status_code != 304:
+                        etag = response.headers.get("ETag")
+                        reader = _LogReader(offset)
+                        async for data in response.aiter_bytes(LOG_CHUNK_SIZE):
+                            for chunk in reader.feed(data):
+                                offset = chunk.end
+                                yield chunk
+                finally:
+                    await response.aclose()
+            if finished or self._expired(deadline):
+                return
+            await asyncio.sleep(self._wait(deadline, poll_interval))
+    
+    async def get_plan(self, project_id: str) -> Dict[str, Any]:
+        """Get implementation plan."""
+        return await self._request("GET", f"/api/projects/{project_id}/plan")
+    
+    async def get_system(self, project_id: str) -> Dict[str, Any]:
+        """Get process and system metrics for a project's loop."""
+        return await self._request("GET", f"/api/projects/{project_id}/system")
+    
+    async def get_notifications(self, project_id: str) -> List[Dict[str, Any]]:
+        """Get notification history, newest first."""
+        return await self._request("GET", f"/api/projects/{project_id}/notifications")
+    
+    async def watch(
+        self,
+        project_id: str,
+        poll_interval: float = WATCH_POLL_INTERVAL,
+        push: Optional[bool] = None,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[WatchEvent]:
+        """Yield live events for a project (see RalphDashboardClient.watch).
+        
+        Example:
+            async for event in client.watch("my-project"):
+                print(event)
+        """
+        state = _WatchState(project_id)
+        deadline = self._deadline(timeout)
+        await self._watch_poll(state)
+        
+        websockets = _websockets(required=push is True) if push is not False else None
+        if websockets is not None:
+            async for event in self._watch_push(state, websockets, deadline, required=push is True):
+                yield event
+        
+        while not self._expired(deadline):
+            for event in await self._watch_poll(state):
+                yield event
+            await asyncio.sleep(self._wait(deadline, poll_interval))
+    
+    async def _watch_poll(self, state: _WatchState) -> List[WatchEvent]:
+        """One round of conditional GETs; returns the events it implies."""
+        events: List[WatchEvent] = []
+        for request, handler in self._watch_requests(state):
+            events.extend(self._watch_events(state, request, handler, await self._request(**request)))
+        return events
+    
+    async def _watch_push(
+        self, state: _WatchState, websockets: Any, deadline: Optional[float], required: bool
+    ) -> AsyncIterator[WatchEvent]:
+        """Yield pushed events until the deadline; returns early if push is unavailable."""
+        failures = 0
+        while not self._expired(deadline):
+            if self._token_expiring():
+                await self.refresh()
+            try:
+                async with websockets.connect(self._ws_url(), open_timeout=self.timeout) as ws:
+                    if failures:
+                        for event in await self._watch_poll(state):
+                            yield event
+                    failures = 0
+                    while not self._expired(deadline):
+                        try:
+                            message = await asyncio.wait_for(ws.recv(), timeout=self._wait(deadline, WS_RECV_TIMEOUT))
+                        except asyncio.TimeoutError:
+                            continue
+                        for event in self._push_events(state, message):
+                            yield event
+            except websockets.exceptions.InvalidHandshake:
+                # The server has no push channel
+                if required:
+                    raise
+                return
+            except (OSError, websockets.exceptions.WebSocketException):
+                failures += 1
+                if failures > WS_RECONNECTS:
+                    if required:
+                        raise
+                    return
+                await asyncio.sleep(_retry_delay(failures - 1, self.backoff))
+    
+    async def get_overview(self, max_concurrency: int = OVERVIEW_CONCURRENCY) -> Dict[str, Any]:
+        """Snapshot of every project; see RalphDashboardClient.get_overview."""
+        entries, jobs = self._overview_jobs(await self.list_projects())
+        results = await self._map(self._try_request, [request for _, _, request in jobs], max_concurrency)
+        return self._overview_result(entries, jobs, results)
+    
+    async def select_projects(
+        self,
+        project_ids: Optional[Iterable[str]] = None,
+        status: Union[None, str, Iterable[str]] = None,
+        min_rss_mb: Optional[float] = None,
+        max_concurrency: int = OVERVIEW_CONCURRENCY
+    ) -> List[Dict[str, Any]]:
+        """Projects matching the given criteria; see RalphDashboardClient.select_projects."""
+        projects = self._selected(await self.list_projects(), project_ids, status)
+        if min_rss_mb is None or not projects:
+            return projects
+        systems = await self._map(self._try_request, [self._system_request(project) for project in projects], max_concurrency)
+        return self._with_rss(projects, systems, min_rss_mb)
+    
+    async def _map(self, function: Callable[[Any], Any], items: List[Any], max_concurrency: int) -> List[Any]:
+        """``function`` awaited for each item, up to ``max_concurrency`` at a time, in order."""
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        
+        async def run(item: Any) -> Any:
+            async with semaphore:
+                return await function(item)
+        
+        return list(await asyncio.gather(*(run(item) for item in items)))
+    
+    async def _try_request(self, request: Dict[str, Any]) -> Any:
+        """Send a request; the decoded body, or the error if it failed."""
+        try:
+            return await self._request(**request)
+        except (httpx.HTTPError, ValueError) as e:
+            return e
+    
+    async def _bulk_one(self, action: str, project: Dict[str, Any], instruction: Optional[str]) -> Dict[str, Any]:
+        row = _bulk_row(action, project)
+        request = self._bulk_request(row, instruction)
+        if request is not None:
+            check = self._bulk_outcome(row, await self._try_request(request))
+            if check is not None:
+                self._bulk_confirm(row, await self._try_request(check))
+        return row
+    
+    async def bulk_action(
+        self,
+        action: str,
+        project_ids: Optional[Iterable[str]] = None,
+        status: Union[None, str, Iterable[str]] = None,
+        min_rss_mb: Optional[float] = None,
+        instruction: Optional[str] = None,
+        max_concurrency: int = BULK_CONCURRENCY
+    ) -> Dict[str, Any]:
+        """Apply a loop-control action to many projects; see RalphDashboardClient.bulk_action."""
+        self._bulk_check(action, instruction)
+        project_ids = None if project_ids is None else list(project_ids)
+        projects = await self.select_projects(project_ids, status, min_rss_mb)
+        rows = await self._map(lambda project: self._bulk_one(action, project, instruction), projects, max_concurrency)
+        return _bulk_result(action, rows, project_ids)
+    
+    async def start_loops(self, project_ids: Optional[Iterable[str]] = None, **selector) -> Dict[str, Any]:
+        """Start several loops; see bulk_action()."""
+        return await self.bulk_action("start", project_ids, **selector)
+    
+    async def stop_loops(self, project_ids: Optional[Iterable[str]] = None, **selector) -> Dict[str, Any]:
+        """Stop several loops; see bulk_action()."""
+        return await self.bulk_action("stop", project_ids, **selector)
+    
+    async def pause_loops(self, project_ids: Optional[Iterable[str]] = None, **selector) -> Dict[str, Any]:
+        """Pause several loops; see bulk_action()."""
+        return await self.bulk_action("pause", project_ids, **selector)
+    
+    async def resume_loops(self, project_ids: Optional[Iterable[str]] = None, **selector) -> Dict[str, Any]:
+        """Resume several paused loops; see bulk_action()."""
+        return await self.bulk_action("resume", project_ids, **selector)
+    
+    async def inject_instructions(
+        self, instruction: str, project_ids: Optional[Iterable[str]] = None, **selector
+    ) -> Dict[str, Any]:
+        """Inject one instruction into several loops; see bulk_action()."""
+        return await self.bulk_action("inject", project_ids, instruction=instruction, **selector)
+
+
+class IterationStore:
+    """Local SQLite mirror of iteration history, synced incrementally.
+    
+    sync() asks the server only for iterations numbered above the highest
+    one already stored, paging back through history with ``offset`` until
+    it reaches known records, so a poll with nothing new costs a single
+    small request. Log output is left out of the mirror and fetched per
+    iteration on first access by log(), then kept. Reports and dashboards
+    can query the store without going back to the server.
+    
+    Args:
+        client: Authenticated RalphDashboardClient used for syncing
+        path: SQLite database file (default ITERATIONS_DB)
+        
+    Example:
+        store = IterationStore(client)
+        store.sync("my-project")
+        slow = store.iterations("my-project", min_duration=600)
+        print(store.log("my-project", slow[0]["number"]))
+    """
+    
+    COLUMNS = ("status", "start_timestamp", "end_timestamp", "duration_seconds", "tokens_used", "has_errors")
+    
+    def __init__(self, client: RalphDashboardClient, path: str = ITERATIONS_DB):
+        self.client = client
+        self.path = path
+        self._lock = threading.Lock()
+        
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS iterations (
+                project_id TEXT NOT NULL,
+                number INTEGER NOT NULL,
+                status TEXT,
+                start_timestamp TEXT,
+                end_timestamp TEXT,
+                duration_seconds REAL,
+                tokens_used REAL,
+                has_errors INTEGER,
+                data TEXT NOT NULL,
+                start_epoch REAL,
+                tasks INTEGER,
+                phase INTEGER,
+                PRIMARY KEY (project_id, number)
+            )"""
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(iterations)")}
+        if "start_epoch" not in columns:
+            # Stores from before the metric columns: derive them once from the JSON
+            for column in ("start_epoch REAL", "tasks INTEGER", "phase INTEGER"):
+                self._db.execute(f"ALTER TABLE iterations ADD COLUMN {column}")
+            self._db.execute(
+                """UPDATE iterations SET
+                   start_epoch = ROUND((julianday(start_timestamp) - 2440587.5) * 86400.0, 3),
+                   tasks = COALESCE(json_array_length(data, '$.tasks_completed'), 0),
+                   phase = CASE WHEN json_extract(data, '$.tasks_completed[0]') GLOB '[0-9]*'
+                                THEN CAST(json_extract(data, '$.tasks_completed[0]') AS INTEGER) ELSE -1 END"""
+            )
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS logs (
+                project_id TEXT NOT NULL,
+                number INTEGER NOT NULL,
+                log_output TEXT NOT NULL,
+                fetched REAL NOT NULL,
+                PRIMARY KEY (project_id, number)
+            )"""
+        )
+        self._db.commit()
+    
+    def latest_number(self, project_id: str) -> int:
+        """Highest stored iteration number for a project (0 if none)."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MAX(number) FROM iterations WHERE project_id = ?", (project_id,)
+            ).fetchone()
+        return row[0] or 0
+    
+    def _save(self, project_id: str, records: List[Dict[str, Any]]) -> None:
+        rows = []
+        for record in records:
+            record = {k: v for k, v in record.items() if k != "log_output"}
+            values = [record.get(column) for column in self.COLUMNS]
+            tasks = record.get("tasks_completed")
+            metrics = (_epoch(record.get("start_timestamp")), len(tasks or ()), _task_phase(tasks))
+            rows.append((project_id, record["number"], *values, json.dumps(record), *metrics))
+        with self._lock:
+            self._db.executemany(
+                """INSERT OR REPLACE INTO iterations
+                (project_id, number, status, start_timestamp, end_timestamp, duration_seconds,
+                 tokens_used, has_errors, data, start_epoch, tasks, phase)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                rows
+            )
+            self._db.commit()
+    
+    def sync(self, project_id: str, full: bool = False, page_size: int = ITERATION_PAGE_SIZE) -> int:
+        """Fetch iterations newer than the stored ones.
+        
+        Args:
+            project_id: Project to sync
+            full: Re-download the whole history (e.g. after records changed)
+            page_size: Iterations per request (max 500)
+            
+        Returns:
+            Number of iterations added or updated
+        """
+        since = 0 if full else self.latest_number(project_id)
+        offset = 0
+        fetched = []
+        while True:
+            page = self.client.get_iterations(project_id, limit=page_size, offset=offset)
+            records = page.get("iterations", [])
+            new = [record for record in records if record["number"] > since]
+            fetched.extend(new)
+            offset += len(records)
+            # Pages are newest first, so stop at the first known record
+            if len(new) < len(records) or not records or offset >= page.get("total", 0):
+                break
+        self._save(project_id, fetched)
+        return len(fetched)
+    
+    def sync_all(
+        self, project_ids: Optional[Iterable[str]] = None, max_concurrency: int = OVERVIEW_CONCURRENCY
+    ) -> Dict[str, Any]:
+        """Sync several projects (default: all) concurrently.
+        
+        Returns:
+            Dict of project id to the number of new iterations, or the
+            error text if that project's sync failed
+        """
+        if project_ids is None:
+            project_ids = [project["id"] for project in self.client.list_projects()]
+        project_ids = list(project_ids)
+        
+        def sync_one(project_id: str) -> Any:
+            try:
+                return self.sync(project_id)
+            except (httpx.HTTPError, ValueError) as e:
+                return _error_text(e)
+        
+        if not project_ids:
+            return {}
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(project_ids)))) as pool:
+            return dict(zip(project_ids, pool.map(sync_one, project_ids)))
+    
+    def iterations(
+        self,
+        project_id: str,
+        status: Optional[str] = None,
+        since_number: int = 0,
+        min_duration: Optional[float] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Stored iterations of a project, newest first.
+        
+        Args:
+            project_id: Project to query
+            status: Only this status (e.g. "success" or "error")
+            since_number: Only iterations numbered above this
+            min_duration: Only iterations that took at least this many seconds
+            limit: Max records
+        """
+        sql = "SELECT data FROM iterations WHERE project_id = ? AND number > ?"
+        params: List[Any] = [project_id, since_number]
+        if status:
+            sql += " AND status = ?"
+            params.append(status)
+        if min_duration is not None:
+            sql += " AND duration_seconds >= ?"
+            params.append(min_duration)
+        sql += " ORDER BY number DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+    
+    def metric_rows(self) -> Tuple[List[Tuple[str, int]], List[tuple]]:
+        """Numeric fields of every stored iteration, for IterationAnalytics.
+        
+        Returns (project_id, iteration count) pairs and the iterations in
+        the same project order, each as (number, start epoch seconds,
+        duration_seconds, tokens_used, tasks completed, phase of the first
+        task or -1, has_errors). All values are read from columns filled in
+        on save, so the JSON records are not parsed.
+        """
+        with self._lock:
+            counts = self._db.execute(
+                "SELECT project_id, COUNT(*) FROM iterations GROUP BY project_id ORDER BY project_id"
+            ).fetchall()
+            rows = self._db.execute(
+                """SELECT number, start_epoch, duration_seconds, tokens_used, tasks, phase,
+                          COALESCE(has_errors, 0)
+                   FROM iterations ORDER BY project_id, number"""
+            ).fetchall()
+        return counts, rows
+    
+    def totals(self, project_id: str) -> Dict[str, Any]:
+        """Iteration count, tokens, duration and error count from the store."""
+        with self._lock:
+            count, tokens, duration, errors = self._db.execute(
+                """SELECT COUNT(*), COALESCE(SUM(tokens_used), 0), COALESCE(SUM(duration_seconds), 0),
+                          COALESCE(SUM(has_errors), 0)
+                   FROM iterations WHERE project_id = ?""",
+                (project_id,)
+            ).fetchone()
+        return {"iterations": count, "tokens_used": tokens, "duration_seconds": duration, "errors": errors}
+    
+    def log(self, project_id: str, number: int) -> str:
+        """Log output of an iteration, fetched from the server on first access."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT log_output FROM logs WHERE project_id = ? AND number = ?", (project_id, number)
+            ).fetchone()
+        if row:
+            return row[0]
+        
+        detail = self.client.get_iteration(project_id, number)
+        log_output = detail.get("log_output") or ""
+        self._save(project_id, [detail])
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO logs (project_id, number, log_output, fetched) VALUES (?, ?, ?, ?)",
+                (project_id, number, log_output, time.time())
+            )
+            self._db.commit()
+        return log_output
+    
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def _numpy() -> Any:
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError("IterationAnalytics requires numpy: pip install numpy") from e
+    return numpy
+
+
+def _pyarrow() -> Any:
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet files require pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def _epoch(timestamp: Optional[str]) -> float:
+    """Epoch seconds of an ISO timestamp (UTC if it has no offset), NaN if missing."""
+    if not timestamp:
+        return float("nan")
+    try:
+        when = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return float("nan")
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.timestamp()
+
+
+def _task_phase(tasks: Optional[List[Any]]) -> int:
+    """Phase of the first completed task ("2.3" -> 2), or -1."""
+    match = re.match(r"\d+", str(tasks[0])) if tasks else None
+    return int(match.group()) if match else -1
+
+
+def _rolling_percentiles(np: Any, values: Any, window: int, q: List[float], stride: int = 1) -> Any:
+    """Percentiles ``q`` of every full window; shape (len(q), len(values) - window + 1).
+    
+    With a ``stride``, only every stride-th window is computed and its
+    result repeated for the windows up to the next one.
+    """
+    if len(values) < window:
+        return np.empty((len(q), 0))
+    windows = np.lib.stride_tricks.sliding_window_view(values, window)
+    count = len(windows)
+    windows = windows[::stride]
+    percentile = np.nanpercentile if np.isnan(values).any() else np.percentile
+    out = np.empty((len(q), len(windows)))
+    step = max(1, ROLLING_CELLS // window)
+    for begin in range(0, len(windows), step):
+        block = windows[begin:begin + step]
+        out[:, begin:begin + len(block)] = percentile(block, q, axis=1)
+    return np.repeat(out, stride, axis=1)[:, :count] if stride > 1 else out
+
+
+class IterationAnalytics:
+    """Columnar copy of iteration history for analysis across projects and time.
+    
+    Iterations are held as NumPy arrays sorted by project and iteration
+    number, so every query is a handful of vectorized operations over
+    contiguous slices. Loading from an IterationStore costs about 2
+    seconds per million iterations (300,000 in roughly 0.6s), mostly
+    SQLite handing back rows; queries then take milliseconds.
+    Tables can be saved as .npz, or as Parquet when pyarrow is installed.
+    Requires numpy.
+    
+    Columns (see column()): number, start (epoch seconds),
+    duration_seconds, tokens_used, tasks (completed in the iteration),
+    phase (of the first completed task, -1 if none) and has_errors.
+    
+    Example:
+        store = IterationStore(client)
+        store.sync_all()
+        analytics = IterationAnalytics.from_store(store)
+        for regression in analytics.regressions():
+            if regression["ongoing"]:
+                print(regression["project_id"], regression["column"], regression["change"])
+    """
+    
+    FIELDS = {
+        "number": "int64",
+        "start": "float64",
+        "duration_seconds": "float64",
+        "tokens_used": "float64",
+        "tasks": "int32",
+        "phase": "int32",
+        "has_errors": "bool",
+    }
+    METRICS = ("duration_seconds", "tokens_used")
+    
+    def __init__(self):
+        np = _numpy()
+        self.projects: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self._project = np.empty(0, "int32")
+        self._columns = {name: np.empty(0, dtype) for name, dtype in self.FIELDS.items()}
+        self._pending: List[Tuple[Any, Dict[str, Any]]] = []
+        self._bounds = np.zeros(1, "int64")
+    
+    def _code(self, project_id: str) -> int:
+        if project_id not in self._codes:
+            self._codes[project_id] = len(self.projects)
+            self.projects.append(project_id)
+        return self._codes[project_id]
+    
+    def _append(self, project: Any, columns: Dict[str, Any]) -> None:
+        np = _numpy()
+        self._pending.append((
+            np.asarray(project, "int32"),
+            {name: np.asarray(columns[name], dtype) for name, dtype in self.FIELDS.items()},
+        ))
+    
+    def _compact(self) -> None:
+        """Merge pending rows, sort by project and number, drop duplicate iterations (last wins)."""
+        if not self._pending:
+            return
+        np = _numpy()
+        project = np.concatenate([self._project] + [chunk[0] for chunk in self._pending])
+        columns = {
+            name: np.concatenate([self._columns[name]] + [chunk[1][name] for chunk in self._pending])
+            for name in self.FIELDS
+        }
+        self._pending = []
+        order = np.lexsort((columns["number"], project))
+        project = project[order]
+        number = columns["number"][order]
+        keep = np.ones(len(order), bool)
+        keep[:-1] = (project[1:] != project[:-1]) | (number[1:] != number[:-1])
+        order = order[keep]
+        self._project = project[keep]
+        self._columns = {name: values[order] for name, values in columns.items()}
+        self._bounds = np.searchsorted(self._project, np.arange(len(self.projects) + 1))
+    
+    def add_records(self, project_id: str, records: Iterable[Dict[str, Any]]) -> int:
+        """Add iteration records (as returned by get_iterations); returns how many."""
+        np = _numpy()
+        records = list(records)
+        columns = {
+            "number": [r["number"] for r in records],
+            "start": [_epoch(r.get("start_timestamp")) for r in records],
+            "duration_seconds": [r.get("duration_seconds") for r in records],
+            "tokens_used": [r.get("tokens_used") for r in records],
+            "tasks": [len(r.get("tasks_completed") or ()) for r in records],
+            "phase": [_task_phase(r.get("tasks_completed")) for r in records],
+            "has_errors": [bool(r.get("has_errors")) for r in records],
+        }
+        columns["duration_seconds"] = np.array(columns["duration_seconds"], dtype="float64")
+        columns["tokens_used"] = np.array(columns["tokens_used"], dtype="float64")
+        self._append(np.full(len(records), self._code(project_id)), columns)
+        return len(records)
+    
+    def add_store(self, store: "IterationStore") -> int:
+        """Add every iteration of an IterationStore; returns how many."""
+        np = _numpy()
+        counts, rows = store.metric_rows()
+        if not rows:
+            return 0
+        # One float64 conversion in C; missing values become NaN
+        table = np.array(rows, dtype="float64")
+        project = np.repeat([self._code(name) for name, _ in counts], [n for _, n in counts])
+        self._append(project, {name: table[:, i] for i, name in enumerate(self.FIELDS)})
+        return len(rows)
+    
+    @classmethod
+    def from_store(cls, store: "IterationStore") -> "IterationAnalytics":
+        """Analytics over everything in an IterationStore."""
+        analytics = cls()
+        analytics.add_store(store)
+        return analytics
+    
+    def __len__(self) -> int:
+        self._compact()
+        return len(self._project)
+    
+    def _slice(self, project_id: Optional[str]) -> slice:
+        self._compact()
+        if project_id is None:
+            return slice(0, len(self._project))
+        code = self._codes.get(project_id)
+        if code is None:
+            return slice(0, 0)
+        return slice(int(self._bounds[code]), int(self._bounds[code + 1]))
+    
+    def column(self, name: str, project_id: Optional[str] = None) -> Any:
+        """One column as a NumPy array (a read-only view), optionally for one project."""
+        rows = self._slice(project_id)
+        values = self._project[rows] if name == "project" else self._columns[name][rows]
+        values = values.view()
+        values.flags.writeable = False
+        return values
+    
+    # Storage
+    
+    def save(self, path: str) -> None:
+        """Write the table as Parquet (``.parquet``, needs pyarrow) or NumPy ``.npz``."""
+        np = _numpy()
+        self._compact()
+        if str(path).endswith(".parquet"):
+            pa = _pyarrow()
+            project = pa.DictionaryArray.from_arrays(pa.array(self._project), pa.array(self.projects, pa.string()))
+            table = pa.table({"project": project, **self._columns})
+            pa.parquet.write_table(table, path)
+            return
+        np.savez(path, project=self._project, projects=np.array(self.projects, dtype=str), **self._columns)
+    
+    @classmethod
+    def load(cls, path: str) -> "IterationAnalytics":
+        """Read a table written by save()."""
+        np = _numpy()
+        analytics = cls()
+        if str(path).endswith(".parquet"):
+            pa = _pyarrow()
+            table = pa.parquet.read_table(path)
+            project = table.column("project").combine_chunks()
+            if not pa.types.is_dictionary(project.type):
+                project = project.dictionary_encode()
+            names = project.dictionary.to_pylist()
+            codes = project.indices.to_numpy(zero_copy_only=False)
+            columns = {name: table.column(name).to_numpy() for name in cls.FIELDS}
+        else:
+            with np.load(path, allow_pickle=False) as data:
+                names = data["projects"].tolist()
+                codes = data["project"]
+                columns = {name: data[name] for name in cls.FIELDS}
+        mapping = np.array([analytics._code(name) for name in names], "int32")
+        analytics._append(mapping[codes] if len(mapping) else codes, columns)
+        return analytics
+    
+    # Queries
+    
+    def summary(self) -> List[Dict[str, Any]]:
+        """Per-project totals, tokens per task, error rate and duration percentiles."""
+        np = _numpy()
+        self._compact()
+        count = len(self.projects)
+        totals = {
+            name: np.bincount(self._project, weights=np.nan_to_num(self._columns[name]), minlength=count)
+            for name in ("duration_seconds", "tokens_used", "tasks", "has_errors")
+        }
+        iterations = np.diff(self._bounds)
+        rows = []
+        for code, project_id in enumerate(self.projects):
+            if not iterations[code]:
+                continue
+            durations = self._columns["duration_seconds"][self._bounds[code]:self._bounds[code + 1]]
+            p50, p90 = np.nanpercentile(durations, [50, 90]) if not np.isnan(durations).all() else (None, None)
+            tasks = totals["tasks"][code]
+            rows.append({
+                "project_id": project_id,
+                "iterations": int(iterations[code]),
+                "tokens_used": float(totals["tokens_used"][code]),
+                "duration_seconds": float(totals["duration_seconds"][code]),
+                "tasks": int(tasks),
+                "tokens_per_task": float(totals["tokens_used"][code] / tasks) if tasks else None,
+                "error_rate": float(totals["has_errors"][code] / iterations[code]),
+                "duration_p50": None if p50 is None else float(p50),
+                "duration_p90": None if p90 is None else float(p90),
+            })
+        return rows
+    
+    def rolling(
+        self, column: str, project_id: str, window: int = ANALYTICS_WINDOW, percentiles: Iterable[float] = (50, 90, 99)
+    ) -> Dict[str, Any]:
+        """Rolling percentiles of a column over a project's iterations.
+        
+        Returns:
+            Dict with 'number' and 'start' of the last iteration of each
+            full window, and one array per percentile ('p50', 'p90', ...)
+        """
+        percentiles = list(percentiles)
+        span = self._slice(project_id)
+        values = self._columns[column][span]
+        result = {
+            "number": self._columns["number"][span][window - 1:],
+            "start": self._columns["start"][span][window - 1:],
+        }
+        for q, series in zip(percentiles, _rolling_percentiles(_numpy(), values, window, percentiles)):
+            result[f"p{q:g}"] = series
+        return result
+    
+    def outliers(
+        self,
+        column: str = "duration_seconds",
+        project_id: Optional[str] = None,
+        threshold: float = OUTLIER_Z,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Iterations far above their project's typical value, worst first.
+        
+        Uses the modified z-score 0.6745 * (value - median) / MAD within
+        each project, which a few extreme iterations can't skew.
+        """
+        np = _numpy()
+        span = self._slice(project_id)
+        values = self._columns[column][span]
+        project = self._project[span]
+        codes = np.unique(project)
+        median = np.full(len(self.projects), np.nan)
+        mad = np.full(len(self.projects), np.nan)
+        for code in codes:
+            group = values[self._bounds[code] - span.start:self._bounds[code + 1] - span.start]
+            if not np.isnan(group).all():
+                median[code] = np.nanmedian(group)
+                mad[code] = np.nanmedian(np.abs(group - median[code]))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            score = 0.6745 * (values - median[project]) / mad[project]
+        hits = np.flatnonzero(score > threshold)
+        hits = hits[np.argsort(-score[hits], kind="stable")][:limit]
+        numbers = self._columns["number"][span]
+        return [
+            {
+                "project_id": self.projects[project[i]],
+                "number": int(numbers[i]),
+                "column": column,
+                "value": float(values[i]),
+                "median": float(median[project[i]]),
+                "z": float(score[i]),
+            }
+            for i in hits
+        ]
+    
+    def regressions(
+        self,
+        columns: Iterable[str] = METRICS,
+        project_id: Optional[str] = None,
+        recent: int = ANALYTICS_WINDOW,
+        baseline: int = REGRESSION_BASELINE,
+        threshold: float = REGRESSION_Z,
+        min_change: float = REGRESSION_MIN_CHANGE
+    ) -> List[Dict[str, Any]]:
+        """Sustained increases in duration or token use, over each project's history.
+        
+        At every iteration, the median of the last ``recent`` iterations is
+        compared with the median of the ``baseline`` iterations before them.
+        A shift counts when it is both significant (z-score of the median
+        shift, using the baseline's IQR as spread, at least ``threshold``)
+        and large (at least ``min_change`` relative increase). Once a shift
+        is found, the baseline is held at its value before the shift, and
+        the episode lasts until the recent median comes back down.
+        
+        Returns:
+            One dict per episode with 'project_id', 'column',
+            'since_number' (first iteration of the recent window when first
+            flagged), 'detected_number', 'last_number', 'baseline_median',
+            'recent_median', 'change' (relative, at detection), 'z' and
+            'ongoing' (still regressed at the latest iteration)
+        """
+        np = _numpy()
+        self._compact()
+        codes = range(len(self.projects)) if project_id is None else [self._codes.get(project_id)]
+        episodes = []
+        for code in codes:
+            if code is None:
+                continue
+            span = slice(int(self._bounds[code]), int(self._bounds[code + 1]))
+            numbers = self._columns["number"][span]
+            for column in columns:
+                values = self._columns[column][span]
+                windows = len(values) - recent - baseline + 1
+                if windows <= 0:
+                    continue
+                # Window t: recent iterations t+baseline .. t+baseline+recent-1,
+                # baseline the `baseline` iterations before them
+                current = _rolling_percentiles(np, values, recent, [50])[0][baseline:baseline + windows]
+                q25, q50, q75 = _rolling_percentiles(
+                    np, values[:-recent], baseline, [25, 50, 75], stride=max(1, recent // 5)
+                )
+                # Standard error of the difference of two medians, sigma from the IQR
+                error = 1.2533 * (q75 - q25) / 1.349 * np.sqrt(1 / recent + 1 / baseline)
+                
+                def shifted(reference: Any, spread: Any, series: Any) -> Tuple[Any, Any, Any]:
+                    with np.errstate(divide="ignore", invalid="ignore"):
+                        z = np.where(spread > 0, (series - reference) / spread, np.inf * np.sign(series - reference))
+                        change = (series - reference) / np.abs(reference)
+                    return (z >= threshold) & (change >= min_change), z, change
+                
+                flagged, z, change = shifted(q50, error, current)
+                t = 0
+                while True:
+                    hits = np.flatnonzero(flagged[t:])
+                    if not hits.size:
+                        break
+                    start = t + int(hits[0])
+                    held, _, _ = shifted(q50[start], error[start], current[start:])
+                    recovered = np.flatnonzero(~held)
+                    end = start + (int(recovered[0]) - 1 if recovered.size else len(held) - 1)
+                    episodes.append({
+                        "project_id": self.projects[code],
+                        "column": column,
+                        "since_number": int(numbers[start + baseline]),
+                        "detected_number": int(numbers[start + baseline + recent - 1]),
+                        "last_number": int(numbers[end + baseline + recent - 1]),
+                        "baseline_median": float(q50[start]),
+                        "recent_median": float(current[start]),
+                        "change": float(change[start]),
+                        "z": float(z[start]),
+                        "ongoing": end == windows - 1,
+                    })
+                    t = end + 1
+        return episodes
+    
+    def trend(
+        self,
+        column: str = "tokens_used",
+        per: str = "task",
+        bucket: float = 86400.0,
+        project_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """A column summed per time bucket, and divided per task or per iteration.
+        
+        Args:
+            column: Column to sum (e.g. "tokens_used" or "duration_seconds")
+            per: "task", "iteration" or "total"
+            bucket: Bucket width in seconds (default one day)
+            project_id: One project, or all together
+            
+        Returns:
+            Dict of arrays: 'bucket_start', 'iterations', 'tasks', 'total'
+            and 'value' (NaN where a bucket has no tasks)
+        """
+        np = _numpy()
+        span = self._slice(project_id)
+        start = self._columns["start"][span]
+        values = self._columns[column][span]
+        valid = ~np.isnan(start) & ~np.isnan(values)
+        keys, inverse = np.unique(np.floor(start[valid] / bucket), return_inverse=True)
+        iterations = np.bincount(inverse, minlength=len(keys))
+        tasks = np.bincount(inverse, weights=self._columns["tasks"][span][valid], minlength=len(keys))
+        total = np.bincount(inverse, weights=values[valid], minlength=len(keys))
+        divisor = {"task": tasks, "iteration": iterations, "total": np.ones(len(keys))}[per]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            value = np.where(divisor > 0, total / divisor, np.nan)
+        return {"bucket_start": keys * bucket, "iterations": iterations, "tasks": tasks, "total": total, "value": value}
+    
+    def by_phase(self, column: str = "tokens_used") -> List[Dict[str, Any]]:
+        """A column per project and plan phase: iterations, tasks, total and per-task cost."""
+        np = _numpy()
+        self._compact()
+        phase = self._columns["phase"]
+        if not len(phase):
+            return []
+        width = int(phase.max()) + 2
+        keys, inverse = np.unique(self._project.astype("int64") * width + phase + 1, return_inverse=True)
+        iterations = np.bincount(inverse, minlength=len(keys))
+        tasks = np.bincount(inverse, weights=self._columns["tasks"], minlength=len(keys))
+        total = np.bincount(inverse, weights=np.nan_to_num(self._columns[column]), minlength=len(keys))
+        return [
+            {
+                "project_id": self.projects[key // width],
+                "phase": int(key % width) - 1,
+                "iterations": int(iterations[i]),
+                "tasks": int(tasks[i]),
+                column: float(total[i]),
+                "per_task": float(total[i] / tasks[i]) if tasks[i] else None,
+                "per_iteration": float(total[i] / iterations[i]),
+            }
+            for i, key in enumerate(keys.tolist())
+        ]
+    
+    def projection(
+        self,
+        project_id: str,
+        tasks_remaining: int,
+        window: int = 2 * ANALYTICS_WINDOW,
+        samples: int = 2000,
+        seed: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Iterations, tokens and time to finish the remaining tasks, from recent velocity.
+        
+        The last ``window`` iterations are resampled (bootstrap) to give a
+        range rather than a single guess.
+        
+        Args:
+            project_id: Project to project
+            tasks_remaining: Tasks left (e.g. tasks_total - tasks_done from get_stats)
+            window: Recent iterations to base the projection on
+            samples: Bootstrap resamples
+            seed: Random seed, for repeatable results
+            
+        Returns:
+            Dict with 'iterations', 'tokens_used' and 'duration_seconds',
+            each {'p10', 'p50', 'p90'} (inf if no recent iteration completed
+            a task), 'eta' (epoch seconds at the p50 duration) and 'based_on'
+            (iterations used)
+        """
+        np = _numpy()
+        span = self._slice(project_id)
+        recent = slice(max(span.start, span.stop - window), span.stop)
+        tasks = self._columns["tasks"][recent].astype("float64")
+        tokens = np.nan_to_num(self._columns["tokens_used"][recent])
+        durations = np.nan_to_num(self._columns["duration_seconds"][recent])
+        if not len(tasks):
+            raise ValueError(f"No iterations for {project_id}")
+        picks = np.random.default_rng(seed).integers(0, len(tasks), size=(samples, len(tasks)))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            iterations = np.where(
+                tasks[picks].sum(axis=1) > 0, tasks_remaining * len(tasks) / tasks[picks].sum(axis=1), np.inf
+            )
+        estimates = {
+            "iterations": iterations,
+            "tokens_used": iterations * tokens[picks].mean(axis=1),
+            "duration_seconds": iterations * durations[picks].mean(axis=1),
+        }
+        result: Dict[str, Any] = {
+            name: dict(zip(("p10", "p50", "p90"), map(float, np.percentile(values, [10, 50, 90]))))
+            for name, values in estimates.items()
+        }
+        result["eta"] = time.time() + result["duration_seconds"]["p50"]
+        result["based_on"] = len(tasks)
+        return result
+
+
+@dataclass
+class AdmissionPolicy:
+    """Budgets and pacing for AdmissionController.
+    
+    A budget is exceeded when usage goes above its maximum; new loops are
+    only admitted while every usage is below ``1 - hysteresis`` of its
+    maximum, so a loop paused at 86% RAM isn't resumed at 84%.
+    
+    Attributes:
+        target_loops: Loops to keep running when resources allow
+        max_ram_percent: System RAM use, percent
+        max_load_per_core: 1-minute load average divided by core count
+        max_disk_percent: Disk use, percent
+        hysteresis: Fraction of each budget kept free before admitting
+        cooldown: Seconds to wait after acting, so metrics can settle
+        max_starts: Loops admitted per step
+        default_rss_mb: Memory assumed for a loop not yet seen running
+    """
+    target_loops: int = 4
+    max_ram_percent: float = 85.0
+    max_load_per_core: float = 1.0
+    max_disk_percent: float = 90.0
+    hysteresis: float = 0.15
+    cooldown: float = 60.0
+    max_starts: int = 1
+    default_rss_mb: float = ADMISSION_DEFAULT_RSS_MB
+    
+    def budgets(self) -> Dict[str, float]:
+        return {"ram": self.max_ram_percent, "cpu": self.max_load_per_core, "disk": self.max_disk_percent}
+
+
+@dataclass
+class AdmissionDecision:
+    """An action chosen by AdmissionController ("pause", "start" or "resume")."""
+    action: str
+    project_id: str
+    reason: str
+    applied: bool = False
+    error: Optional[str] = None
+
+
+def _resource_levels(system: Dict[str, Any]) -> Dict[str, float]:
+    cores = system.get("cpu_core_count") or 1
+    return {
+        "ram": float(system.get("ram_percent") or 0.0),
+        "cpu": float(system.get("cpu_load_1m") or 0.0) / cores,
+        "disk": float(system.get("disk_percent") or 0.0),
+    }
+
+
+class AdmissionController:
+    """Keeps a target number of loops running within RAM, CPU and disk budgets.
+    
+    Each step() reads /system for the running loops, then either pauses
+    the lowest-priority loops until the projected usage fits the budgets
+    again (and the running count is back at target), or, when every
+    resource has headroom below the hysteresis band, admits the
+    highest-priority waiting project. Projections use each loop's last
+    seen RSS and CPU, so one step can shed several loops after a spike.
+    After acting, the controller holds for ``policy.cooldown`` seconds.
+    
+    Waiting projects are the ones passed in ``queue`` (started if stopped,
+    resumed if paused) plus the loops the controller paused itself.
+    Priority comes from ``priorities`` or the project's 'priority' field;
+    higher runs first and is paused last.
+    
+    Args:
+        client: Authenticated RalphDashboardClient (or any object with
+            list_projects, get_system and the loop-control methods, such
+            as the replay dashboard in scripts/simulate_admission.py)
+        policy: Budgets (default AdmissionPolicy())
+        queue: Project ids waiting to run, in order
+        priorities: Project id to priority, overriding the project field
+        protect: Project ids that are never paused
+        dry_run: Decide but don't act; step() returns what would be done
+        clock: Time source for the cooldown
+        
+    Example:
+        controller = AdmissionController(client, AdmissionPolicy(target_loops=6), queue=["docs", "api"])
+        for decisions in controller.run():
+            for decision in decisions:
+                print(decision.action, decision.project_id, decision.reason)
+    """
+    
+    def __init__(
+        self,
+        client: Any,
+        policy: Optional[AdmissionPolicy] = None,
+        queue: Iterable[str] = (),
+        priorities: Optional[Dict[str, float]] = None,
+        protect: Iterable[str] = (),
+        dry_run: bool = False,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.client = client
+        self.policy = policy or AdmissionPolicy()
+        self.queue: List[str] = list(queue)
+        self.priorities = dict(priorities or {})
+        self.protect = set(protect)
+        self.dry_run = dry_run
+        self.clock = clock
+        self.paused: set = set()
+        self.last_snapshot: Optional[Dict[str, Any]] = None
+        self._last_action: Optional[float] = None
+        self._seen: Dict[str, Dict[str, float]] = {}
+    
+    def enqueue(self, project_id: str) -> None:
+        """Add a project to the waiting queue."""
+        if project_id not in self.queue:
+            self.queue.append(project_id)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Current system metrics and per-loop usage, fetched concurrently.
+        
+        Returns:
+            Dict with 'time', 'system' (the /system 'system' block) and
+            'projects' (id to 'status', 'priority', 'total_rss_mb' and
+            'cpu_percent'); the format recorded and replayed by
+            scripts/simulate_admission.py
+        """
+        projects = self.client.list_projects()
+        probe = [p for p in projects if p.get("status") == "running"] or projects[:1]
+        
+        def fetch(project: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            try:
+                return self.client.get_system(project["id"])
+            except (httpx.HTTPError, ValueError):
+                return None
+        
+        systems: List[Optional[Dict[str, Any]]] = []
+        if probe:
+            with ThreadPoolExecutor(max_workers=max(1, min(OVERVIEW_CONCURRENCY, len(probe)))) as pool:
+                systems = list(pool.map(fetch, probe))
+        metrics = {project["id"]: system for project, system in zip(probe, systems) if system}
+        entries = {}
+        for project in projects:
+            system = metrics.get(project["id"])
+            process = (system or {}).get("process") or {}
+            entries[project["id"]] = {
+                "status": project.get("status"),
+                "priority": self.priorities.get(project["id"], project.get("priority", 0)),
+                "total_rss_mb": _total_rss(system) if process else None,
+                "cpu_percent": process.get("cpu_percent"),
+            }
+        system = next((m["system"] for m in metrics.values() if m.get("system")), None)
+        return {"time": time.time(), "system": system, "projects": entries}
+    
+    def _delta(self, project_id: str, system: Dict[str, Any]) -> Dict[str, float]:
+        """Resources one loop is expected to use, in the units of _resource_levels()."""
+        seen = self._seen.get(project_id, {})
+        rss = seen.get("total_rss_mb", self.policy.default_rss_mb)
+        cpu = seen.get("cpu_percent", 0.0)
+        ram_total = system.get("ram_total_mb") or 0.0
+        return {
+            "ram": rss / ram_total * 100 if ram_total else 0.0,
+            "cpu": cpu / 100 / (system.get("cpu_core_count") or 1),
+            "disk": 0.0,
+        }
+    
+    def decide(self, snapshot: Dict[str, Any]) -> List[AdmissionDecision]:
+        """Actions for a snapshot, without performing them."""
+        projects = snapshot["projects"]
+        for project_id, entry in projects.items():
+            if entry["status"] == "running" and entry.get("total_rss_mb"):
+                self._seen[project_id] = {
+                    "total_rss_mb": entry["total_rss_mb"],
+                    "cpu_percent": entry.get("cpu_percent") or 0.0,
+                }
+        system = snapshot.get("system")
+        if not system:
+            return []  # no metrics, no action
+        if self._last_action is not None and self.clock() - self._last_action < self.policy.cooldown:
+            return []
+        
+        budgets = self.policy.budgets()
+        levels = _resource_levels(system)
+        running = [project_id for project_id, entry in projects.items() if entry["status"] == "running"]
+        
+        def priority(project_id: str) -> float:
+            return projects[project_id].get("priority") or 0
+        
+        def over(levels: Dict[str, float]) -> List[str]:
+            return [name for name, limit in budgets.items() if levels[name] > limit]
+        
+        decisions = []
+        if over(levels) or len(running) > self.policy.target_loops:
+            count = len(running)
+            for project_id in sorted((p for p in running if p not in self.protect), key=priority):
+                exceeded = over(levels)
+                if not exceeded and count <= self.policy.target_loops:
+                    break
+                delta = self._delta(project_id, system)
+                relieved = [name for name in exceeded if delta[name] > 0]
+                if exceeded and not relieved and count <= self.policy.target_loops and decisions:
+                    break  # pausing doesn't free disk; shed one loop per step for it
+                reason = ", ".join(
+                    f"{name} {levels[name]:.1f} > {budgets[name]:g}" for name in exceeded
+                ) or f"{count} loops running > target {self.policy.target_loops}"
+                decisions.append(AdmissionDecision("pause", project_id, reason))
+                levels = {name: levels[name] - delta[name] for name in levels}
+                count -= 1
+            return decisions
+        
+        low = {name: limit * (1 - self.policy.hysteresis) for name, limit in budgets.items()}
+        if any(levels[name] > low[name] for name in levels):
+            return []
+        waiting = [p for p in self.queue if p in projects and projects[p]["status"] != "running"]
+        waiting += [p for p in self.paused if p in projects and projects[p]["status"] == "paused" and p not in waiting]
+        count = len(running)
+        for project_id in sorted(waiting, key=priority, reverse=True):
+            if len(decisions) >= self.policy.max_starts or count >= self.policy.target_loops:
+                break
+            delta = self._delta(project_id, system)
+            projected = {name: levels[name] + delta[name] for name in levels}
+            if any(projected[name] > low[name] for name in levels):
+                break  # keep strict priority order rather than squeezing in a smaller loop
+            action = "resume" if projects[project_id]["status"] == "paused" else "start"
+            reason = f"headroom: ram {levels['ram']:.1f}%, {count} of {self.policy.target_loops} loops running"
+            decisions.append(AdmissionDecision(action, project_id, reason))
+            levels = projected
+            count += 1
+        return decisions
+    
+    def apply(self, decisions: List[AdmissionDecision]) -> List[AdmissionDecision]:
+        """Perform decisions; failures are recorded on the decision, not raised."""
+        actions = {"pause": self.client.pause_loop, "start": self.client.start_loop, "resume": self.client.resume_loop}
+        for decision in decisions:
+            try:
+                actions[decision.action](decision.project_id)
+            except (httpx.HTTPError, ValueError) as e:
+                decision.error = _error_text(e)
+                continue
+            decision.applied = True
+            if decision.action == "pause":
+                self.paused.add(decision.project_id)
+            else:
+                self.paused.discard(decision.project_id)
+                if decision.project_id in self.queue:
+                    self.queue.remove(decision.project_id)
+        if any(decision.applied for decision in decisions):
+            self._last_action = self.clock()
+        return decisions
+    
+    def step(self) -> List[AdmissionDecision]:
+        """Take a snapshot, decide, and act (unless dry_run)."""
+        self.last_snapshot = self.snapshot()
+        decisions = self.decide(self.last_snapshot)
+        return decisions if self.dry_run else self.apply(decisions)
+    
+    def run(self, interval: float = ADMISSION_INTERVAL, steps: Optional[int] = None) -> Iterator[List[AdmissionDecision]]:
+        """Call step() every ``interval`` seconds, yielding each step's decisions."""
+        done = 0
+        while steps is None or done < steps:
+            yield self.step()
+            done += 1
+            if steps is None or done < steps:
+                time.sleep(interval)
 
 
 # Convenience functions for quick one-off calls
 
 def login(base_url: str, username: str, password: str) -> str:
     """Login and return access token."""
-    client = RalphDashboardClient(base_url)
-    data = client.login(username, password)
+    with RalphDashboardClient(base_url) as client:
+        data = client.login(username, password)
     return data["access_token"]
 
 
 def list_projects(base_url: str, token: str) -> List[Dict[str, Any]]:
     """List all projects (pre-authenticated)."""
-    response = httpx.get(
-        f"{base_url.rstrip('/')}/api/projects",
-        headers={"Authorization": f"Bearer {token}"},
-        timeout=10.0
-    )
-    response.raise_for_status()
-    return response.json()
+    with RalphDashboardClient(base_url) as client:
+        client.token = token
+        return client.list_projects()
 
 
 if __name__ == "__main__":
@@ -164,16 +2926,18 @@ if __name__ == "__main__":
     username = sys.argv[2]
     password = sys.argv[3]
     
-    client = RalphDashboardClient(base_url)
-    
-    print("Logging in...")
-    client.login(username, password)
-    
-    print("\nProjects:")
-    projects = client.list_projects()
-    for p in projects:
-        print(f"  - {p['id']}: {p['status']}")
+    with RalphDashboardClient(base_url) as client:
+        print("Logging in...")
+        client.login(username, password)
         
-        stats = client.get_stats(p['id'])
-        print(f"    Iterations: {stats.get('iteration_count', 0)}")
-        print(f"    Tasks done: {stats.get('tasks_done', 0)}")
+        print("\nProjects:")
+        overview = client.get_overview()
+        for entry in overview["projects"]:
+            p = entry["project"]
+            print(f"  - {p['id']}: {p['status']}")
+            
+            stats = entry["stats"] or {}
+            print(f"    Iterations: {stats.get('iteration_count', 0)}")
+            print(f"    Tasks done: {stats.get('tasks_done', 0)}")
+            for part, error in entry["errors"].items():
+                print(f"    {part} unavailable ({error})")
@@ -0,0 +1,365 @@
+"""watch() against the local fake dashboard (scripts/fake_dashboard.py).
+
+Covers the typed event sequence over the websocket and over conditional
+polling, 304s for unchanged polls, the fallback from push to polling, and
+the catch-up poll after a dropped websocket, for both clients.
+"""
+
+import asyncio
+import queue
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+import fake_dashboard  # noqa: E402
+import skill  # noqa: E402
+from skill import IterationFinished, IterationStarted, LoopStateChanged, NotificationRaised  # noqa: E402
+
+PROJECT = "project-1"  # running in the fake dashboard
+POLL = 0.05
+TIMEOUT = 10.0
+WATCH_PATHS = {f"/api/projects/{PROJECT}", f"/api/projects/{PROJECT}/iterations", f"/api/projects/{PROJECT}/notifications"}
+
+
+def start_server(websocket=True):
+    server = fake_dashboard.start(port=0, projects=2, iteration_seconds=0, websocket=websocket)
+    server.state.notification_rate = 0.0
+    return server
+
+
+@pytest.fixture
+def server():
+    server = start_server()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def poll_server():
+    server = start_server(websocket=False)
+    yield server
+    server.shutdown()
+
+
+def url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class Responses:
+    """Records (path, status) of every response through an httpx event hook."""
+
+    def __init__(self):
+        self.seen = []
+        self.lock = threading.Lock()
+
+    def __call__(self, response):
+        with self.lock:
+            self.seen.append((response.request.url.path, response.status_code))
+
+    async def async_hook(self, response):
+        self(response)
+
+    def watch_statuses(self, start=0):
+        with self.lock:
+            return [status for path, status in self.seen[start:] if path in WATCH_PATHS]
+
+
+def sync_client(server, responses=None, backoff=0.3):
+    hooks = {"response": [responses]} if responses else {}
+    client = skill.RalphDashboardClient(
+        url(server), client=httpx.Client(timeout=5, event_hooks=hooks), backoff=backoff, token_cache=False
+    )
+    client.login(fake_dashboard.USERNAME, fake_dashboard.PASSWORD)
+    return client
+
+
+def wait_for(condition, timeout=TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def sockets(server):
+    with server.state.lock:
+        return len(server.state.sockets)
+
+
+def drop_sockets(server):
+    with server.state.lock:
+        open_sockets = list(server.state.sockets)
+    for sock in open_sockets:
+        sock.shutdown(socket.SHUT_RDWR)
+    wait_for(lambda: sockets(server) == 0)
+
+
+class Watcher:
+    """Iterates a sync watch() on a thread, handing events to the test."""
+
+    def __init__(self, events):
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, args=(events,), daemon=True)
+        self.thread.start()
+
+    def _run(self, events):
+        try:
+            for event in events:
+                self.queue.put(event)
+        except Exception as e:
+            self.queue.put(e)
+
+    def next(self, count=1):
+        events = []
+        for _ in range(count):
+            event = self.queue.get(timeout=TIMEOUT)
+            if isinstance(event, Exception):
+                raise event
+            events.append(event)
+        return events
+
+
+def summary(events):
+    """Event type, source and the detail each test checks."""
+    out = []
+    for event in events:
+        if isinstance(event, (IterationStarted, IterationFinished)):
+            detail = event.number
+        elif isinstance(event, LoopStateChanged):
+            detail = (event.old_status, event.new_status)
+        else:
+            detail = event.prefix
+        out.append((type(event).__name__, event.source, detail))
+    return out
+
+
+def expected(source, number):
+    return [
+        ("IterationFinished", source, number),
+        ("IterationStarted", source, number + 1),
+        ("LoopStateChanged", source, ("running", "paused")),
+        ("NotificationRaised", source, "ERROR"),
+    ]
+
+
+def drive(server, next_events):
+    """Finish an iteration, pause the loop and raise a notification, one at a time."""
+    state = server.state
+    events = []
+    state.tick()
+    events += next_events(2)
+    state.set_status(PROJECT, "paused")
+    events += next_events(1)
+    state.notify(PROJECT, "ERROR", "tests failed")
+    events += next_events(1)
+    return events
+
+
+def next_number(server):
+    with server.state.lock:
+        return len(server.state.iterations[PROJECT]) + 1
+
+
+# Sync client
+
+
+def test_push_event_sequence(server):
+    responses = Responses()
+    with sync_client(server, responses) as client:
+        watcher = Watcher(client.watch(PROJECT, push=True, timeout=TIMEOUT))
+        wait_for(lambda: sockets(server) == 1)
+        number = next_number(server)
+        events = drive(server, watcher.next)
+    assert summary(events) == expected("push", number)
+    # Only the initial snapshot was polled
+    assert responses.watch_statuses() == [200, 200, 200]
+
+
+def test_poll_event_sequence(server):
+    responses = Responses()
+    with sync_client(server, responses) as client:
+        watcher = Watcher(client.watch(PROJECT, push=False, poll_interval=POLL, timeout=TIMEOUT))
+        wait_for(lambda: len(responses.watch_statuses()) >= 3)
+        number = next_number(server)
+        events = drive(server, watcher.next)
+    assert summary(events) == expected("poll", number)
+    assert sockets(server) == 0
+
+
+def test_unchanged_polls_are_304(server):
+    responses = Responses()
+    with sync_client(server, responses) as client:
+        watcher = Watcher(client.watch(PROJECT, push=False, poll_interval=POLL, timeout=TIMEOUT))
+        wait_for(lambda: len(responses.watch_statuses()) >= 12)
+        statuses = responses.watch_statuses()
+        assert statuses[:3] == [200, 200, 200]
+        assert set(statuses[3:]) == {304}
+
+        start = len(responses.seen)
+        server.state.tick()
+        watcher.next(2)
+        changed = [(path, status) for path, status in responses.seen[start:] if status == 200]
+    assert changed == [(f"/api/projects/{PROJECT}/iterations", 200)]
+
+
+def test_falls_back_to_polling_without_push_channel(poll_server):
+    with sync_client(poll_server) as client:
+        watcher = Watcher(client.watch(PROJECT, poll_interval=POLL, timeout=TIMEOUT))
+        time.sleep(0.3)
+        number = next_number(poll_server)
+        events = drive(poll_server, watcher.next)
+    assert summary(events) == expected("poll", number)
+
+
+def test_required_push_raises_without_push_channel(poll_server):
+    websockets = skill._websockets(required=True)
+    with sync_client(poll_server) as client:
+        with pytest.raises(websockets.exceptions.InvalidHandshake):
+            next(client.watch(PROJECT, push=True, timeout=TIMEOUT))
+
+
+def test_reconnect_catches_up_by_polling(server):
+    with sync_client(server) as client:
+        watcher = Watcher(client.watch(PROJECT, push=True, timeout=TIMEOUT))
+        wait_for(lambda: sockets(server) == 1)
+        number = next_number(server)
+        drop_sockets(server)
+        server.state.tick()  # missed while disconnected
+        missed = watcher.next(2)
+        wait_for(lambda: sockets(server) == 1)
+        server.state.tick()
+        pushed = watcher.next(2)
+    assert summary(missed) == [("IterationFinished", "poll", number), ("IterationStarted", "poll", number + 1)]
+    assert summary(pushed) == [("IterationFinished", "push", number + 1), ("IterationStarted", "push", number + 2)]
+
+
+# Async client
+
+
+async def async_client(server, responses=None, backoff=0.3):
+    hooks = {"response": [responses.async_hook]} if responses else {}
+    client = skill.AsyncRalphDashboardClient(
+        url(server), client=httpx.AsyncClient(timeout=5, event_hooks=hooks), backoff=backoff, token_cache=False
+    )
+    await client.login(fake_dashboard.USERNAME, fake_dashboard.PASSWORD)
+    return client
+
+
+async def async_wait_for(condition, timeout=TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+class AsyncWatcher:
+    """Iterates an async watch() in a task, handing events to the test."""
+
+    def __init__(self, events):
+        self.queue = asyncio.Queue()
+        self.task = asyncio.ensure_future(self._run(events))
+
+    async def _run(self, events):
+        try:
+            async for event in events:
+                await self.queue.put(event)
+        except Exception as e:
+            await self.queue.put(e)
+
+    async def next(self, count=1):
+        events = []
+        for _ in range(count):
+            event = await asyncio.wait_for(self.queue.get(), TIMEOUT)
+            if isinstance(event, Exception):
+                raise event
+            events.append(event)
+        return events
+
+    async def close(self):
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+
+
+async def async_drive(server, watcher):
+    state = server.state
+    events = []
+    state.tick()
+    events += await watcher.next(2)
+    state.set_status(PROJECT, "paused")
+    events += await watcher.next()
+    state.notify(PROJECT, "ERROR", "tests failed")
+    events += await watcher.next()
+    return events
+
+
+def test_async_push_event_sequence(server):
+    async def main():
+        responses = Responses()
+        async with await async_client(server, responses) as client:
+            watcher = AsyncWatcher(client.watch(PROJECT, push=True, timeout=TIMEOUT))
+            await async_wait_for(lambda: sockets(server) == 1)
+            number = next_number(server)
+            events = await async_drive(server, watcher)
+            await watcher.close()
+        assert summary(events) == expected("push", number)
+        assert responses.watch_statuses() == [200, 200, 200]
+
+    asyncio.run(main())
+
+
+def test_async_poll_event_sequence_and_304s(server):
+    async def main():
+        responses = Responses()
+        async with await async_client(server, responses) as client:
+            watcher = AsyncWatcher(client.watch(PROJECT, push=False, poll_interval=POLL, timeout=TIMEOUT))
+            await async_wait_for(lambda: len(responses.watch_statuses()) >= 12)
+            statuses = responses.watch_statuses()
+            assert statuses[:3] == [200, 200, 200]
+            assert set(statuses[3:]) == {304}
+            number = next_number(server)
+            events = await async_drive(server, watcher)
+            await watcher.close()
+        assert summary(events) == expected("poll", number)
+        assert sockets(server) == 0
+
+    asyncio.run(main())
+
+
+def test_async_falls_back_to_polling_without_push_channel(poll_server):
+    async def main():
+        async with await async_client(poll_server) as client:
+            watcher = AsyncWatcher(client.watch(PROJECT, poll_interval=POLL, timeout=TIMEOUT))
+            await asyncio.sleep(0.3)
+            number = next_number(poll_server)
+            events = await async_drive(poll_server, watcher)
+            await watcher.close()
+        assert summary(events) == expected("poll", number)
+
+    asyncio.run(main())
+
+
+def test_async_reconnect_catches_up_by_polling(server):
+    async def main():
+        async with await async_client(server) as client:
+            watcher = AsyncWatcher(client.watch(PROJECT, push=True, timeout=TIMEOUT))
+            await async_wait_for(lambda: sockets(server) == 1)
+            number = next_number(server)
+            await asyncio.to_thread(drop_sockets, server)
+            server.state.tick()
+            missed = await watcher.next(2)
+            await async_wait_for(lambda: sockets(server) == 1)
+            server.state.tick()
+            pushed = await watcher.next(2)
+            await watcher.close()
+        assert summary(missed) == [("IterationFinished", "poll", number), ("IterationStarted", "poll", number + 1)]
+        assert summary(pushed) == [("IterationFinished", "push", number + 1), ("IterationStarted", "push", number + 2)]
+
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Memory/parse-time benchmark for search result projections.
+
+Builds a synthetic Open Library search response (authors, publishers and
+subjects drawn from shared pools, as in real result sets) and measures
+parsing it and holding every doc as:
+
+- full dicts (SEARCH_FIELDS, the default)
+- dicts with the MINIMAL_FIELDS projection
+- compact BookRecord objects
+
+No network access is needed; the server-side projection is simulated by
+dropping fields before the response is serialized.
+
+Usage:
+    python scripts/bench_compact.py [--docs 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import skill  # noqa: E402
+
+
+def make_docs(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    authors = [f"Author {i}" for i in range(count // 5 + 1)]
+    publishers = [f"Publisher {i}" for i in range(500)]
+    subjects = [f"Subject {i}" for i in range(3000)]
+    docs = []
+    for i in range(count):
+        docs.append({
+            "key": f"/works/OL{i}W",
+            "title": f"Title {i}",
+            "author_name": rng.sample(authors, rng.randint(1, 3)),
+            "first_publish_year": rng.randint(1800, 2024),
+            "isbn": [f"978{rng.randrange(10**9):010d}" for _ in range(rng.randint(0, 8))],
+            "edition_count": rng.randint(1, 40),
+            "has_fulltext": rng.random() < 0.3,
+            "ia": [f"item{i}_{j}" for j in range(rng.randint(0, 2))],
+            "cover_i": rng.randrange(10**7),
+            "publisher": rng.sample(publishers, rng.randint(1, 30)),
+            "subject": rng.sample(subjects, rng.randint(0, 200)),
+        })
+    return docs
+
+
+def load(body: bytes, convert=None) -> list:
+    docs = json.loads(body)["docs"]
+    if convert:
+        docs = [convert(doc) for doc in docs]
+    return docs
+
+
+def measure(label: str, body: bytes, convert=None) -> None:
+    # Time without tracemalloc, which slows allocation down a lot
+    gc.collect()
+    start = time.perf_counter()
+    docs = load(body, convert)
+    elapsed = time.perf_counter() - start
+    del docs
+
+    gc.collect()
+    tracemalloc.start()
+    docs = load(body, convert)
+    gc.collect()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<22} {len(body) / 1e6:8.1f} MB {elapsed * 1000:9.0f} ms "
+          f"{held / 1e6:9.1f} MB {peak / 1e6:9.1f} MB")
+    del docs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=20000, help="Search docs to generate")
+    args = parser.parse_args()
+
+    docs = make_docs(args.docs)
+    full = json.dumps({"numFound": len(docs), "docs": docs}).encode()
+    minimal = json.dumps({
+        "numFound": len(docs),
+        "docs": [{k: doc[k] for k in skill.MINIMAL_FIELDS} for doc in docs],
+    }).encode()
+    del docs
+
+    print(f"{'':<22} {'response':>11} {'parse':>12} {'held':>12} {'peak':>12}")
+    measure("full dicts", full)
+    measure("minimal dicts", minimal)
+    measure("compact records", full, skill.BookRecord.from_doc)
+    measure("minimal + compact", minimal, skill.BookRecord.from_doc)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,650 @@
 #!/usr/bin/env python3
 """Research skill helper functions for archive.org and Open Library APIs."""
 
+import asyncio
+import email.utils
+import gzip
+import hashlib
+import http.client
 import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+import urllib.error
 import urllib.request
 import urllib.parse
-from typing import Optional, List, Dict, Any
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Tuple, Iterable, Iterator, Union, Callable
 
 
 USER_AGENT = "OpenClaw-Research/1.0 (+https://github.com/fantasticsquirrel/OpenClaw)"
 
+# Concurrent connections per host; keep these polite (archive.org asks for
+# a reasonable request rate)
+DEFAULT_HOST_LIMIT = 4
+HOST_LIMITS = {"openlibrary.org": 4, "archive.org": 4}
+
+# Retry policy for 429/5xx responses and connection errors
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+MAX_RETRY_AFTER = 60.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_REDIRECTS = 5
+
+# Read size for streamed downloads
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Response cache: per-endpoint TTLs in seconds, matched by longest
+# "host/path" prefix of the request URL
+CACHE_PATH = os.environ.get(
+    "RESEARCH_CACHE", str(Path.home() / ".cache" / "openclaw-research" / "responses.db")
+)
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+CACHE_TTLS = {
+    "openlibrary.org/search.json": 3600,
+    "openlibrary.org/api/books": 7 * 86400,
+    "archive.org/metadata/": 86400,
+}
+CACHE_DEFAULT_TTL = 3600
+# Least recently used entries read per query while evicting
+CACHE_EVICT_BATCH = 64
+
+# Largest page Open Library search returns
+SEARCH_PAGE_SIZE = 100
+
+# Fields requested from Open Library search by default, and a small
+# projection for listing/dedup where only identity and authorship matter
+SEARCH_FIELDS = (
+    "key", "title", "author_name", "first_publish_year", "isbn", "edition_count",
+    "has_fulltext", "ia", "cover_i", "publisher", "subject",
+)
+MINIMAL_FIELDS = ("key", "title", "author_name", "first_publish_year")
+
+# Bulk /api/books lookups: bibkeys per request and URL length budget
+BIBKEYS_PER_REQUEST = 100
+MAX_URL_LENGTH = 4000
+
+# Parallel Archive.org metadata fetches when formatting many results
+FORMAT_WORKERS = 8
+
+# Ranged downloads: parallel segments per file, smallest segment worth
+# splitting off, and how often (in bytes per segment) resume state is saved
+DOWNLOAD_SEGMENTS = 4
+MIN_SEGMENT_BYTES = 8 * 1024 * 1024
+RESUME_SAVE_BYTES = 1024 * 1024
+
+# Local full-text index: downloaded texts and the SQLite FTS5 database
+FULLTEXT_DIR = os.environ.get(
+    "RESEARCH_FULLTEXT", str(Path.home() / ".cache" / "openclaw-research" / "fulltext")
+)
+# Indexed passage size in bytes; passages end at a line or word break
+PASSAGE_BYTES = 2048
+
+
+def normalize_url(url: str) -> str:
+    """Cache key for a URL: lowercase scheme/host, sorted query, no fragment."""
+    parsed = urllib.parse.urlsplit(url)
+    query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)))
+    return urllib.parse.urlunsplit((parsed.scheme.lower(), parsed.netloc.lower(), parsed.path or "/", query, ""))
+
+
+class ResponseCache:
+    """On-disk HTTP response cache with conditional revalidation.
+    
+    Bodies are stored in SQLite by normalized URL together with their
+    ETag and Last-Modified validators. Within its TTL an entry is served
+    without touching the network; after that it is revalidated with
+    If-None-Match / If-Modified-Since, so an unchanged document costs a
+    304 instead of a full body. Total body size is capped at ``max_bytes``
+    by evicting least recently used entries; a single body larger than
+    that is not cached. With ``stale_on_error``, an expired entry is
+    returned when the network request fails.
+    """
+    
+    def __init__(
+        self,
+        path: str = CACHE_PATH,
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = CACHE_DEFAULT_TTL,
+        max_bytes: int = CACHE_MAX_BYTES,
+        stale_on_error: bool = True
+    ):
+        self.path = path
+        self.ttls = dict(CACHE_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.stale_on_error = stale_on_error
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+        
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                expires REAL NOT NULL,
+                accessed REAL NOT NULL,
+                size INTEGER NOT NULL
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        # Running total of body sizes, so stores don't sum the whole table
+        self._db.execute("CREATE TABLE IF NOT EXISTS totals (bytes INTEGER NOT NULL)")
+        if self._db.execute("SELECT COUNT(*) FROM totals").fetchone()[0] == 0:
+            self._db.execute("INSERT INTO totals SELECT COALESCE(SUM(size), 0) FROM responses")
+        self._db.commit()
+    
+    def ttl_for(self, url: str) -> float:
+        """TTL of the longest matching endpoint prefix."""
+        parsed = urllib.parse.urlsplit(url)
+        target = parsed.netloc.lower() + parsed.path
+        if target.startswith("www."):
+            target = target[4:]
+        matches = [prefix for prefix in self.ttls if target.startswith(prefix)]
+        return self.ttls[max(matches, key=len)] if matches else self.default_ttl
+    
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the entry for a URL (fresh or not), or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body, etag, last_modified, expires FROM responses WHERE key = ?", (normalize_url(url),)
+            ).fetchone()
+        if row is None:
+            return None
+        body, etag, last_modified, expires = row
+        return {"body": body, "etag": etag, "last_modified": last_modified, "fresh": expires > time.time()}
+    
+    def touch(self, url: str, refresh: bool = False) -> None:
+        """Mark an entry used; with ``refresh``, restart its TTL (after a 304)."""
+        now = time.time()
+        with self._lock:
+            if refresh:
+                self._db.execute(
+                    "UPDATE responses SET accessed = ?, expires = ? WHERE key = ?",
+                    (now, now + self.ttl_for(url), normalize_url(url))
+                )
+            else:
+                self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, normalize_url(url)))
+            self._db.commit()
+    
+    def store(self, url: str, body: bytes, headers: Any) -> None:
+        """Save a 200 response and evict LRU entries beyond ``max_bytes``.
+        
+        A body larger than ``max_bytes`` is not cached, and any older entry
+        for the URL is dropped.
+        """
+        key = normalize_url(url)
+        now = time.time()
+        with self._lock:
+            old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if old:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.execute("UPDATE totals SET bytes = bytes - ?", (old[0],))
+            if len(body) <= self.max_bytes:
+                self._db.execute(
+                    """INSERT INTO responses
+                    (key, body, etag, last_modified, expires, accessed, size) VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                    (key, body, headers.get("ETag"), headers.get("Last-Modified"),
+                     now + self.ttl_for(url), now, len(body))
+                )
+                self._db.execute("UPDATE totals SET bytes = bytes + ?", (len(body),))
+            total = self._db.execute("SELECT bytes FROM totals").fetchone()[0]
+            while total > self.max_bytes:
+                rows = self._db.execute(
+                    "SELECT key, size FROM responses ORDER BY accessed LIMIT ?", (CACHE_EVICT_BATCH,)
+                ).fetchall()
+                if not rows:
+                    break
+                for evicted, size in rows:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (evicted,))
+                    total -= size
+                    if total <= self.max_bytes:
+                        break
+                self._db.execute("UPDATE totals SET bytes = ?", (total,))
+            self._db.commit()
+    
+    def count(self, outcome: str) -> None:
+        """Add one to the "hits", "misses" or "revalidated" counter."""
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.execute("UPDATE totals SET bytes = 0")
+            self._db.commit()
+            self.hits = self.misses = self.revalidated = 0
+    
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/304 counters plus entry count and stored bytes."""
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            size = self._db.execute("SELECT bytes FROM totals").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+                "entries": entries,
+                "bytes": size,
+            }
+
+
+class _HostPool:
+    """Idle keep-alive connections and a concurrency limit for one host."""
+
+    def __init__(self, scheme: str, host: str, limit: int, timeout: float):
+        self.scheme = scheme
+        self.host = host
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(limit)
+        self.idle: List[http.client.HTTPConnection] = []
+        self.lock = threading.Lock()
+
+    def connect(self, fresh: bool = False) -> Tuple[http.client.HTTPConnection, bool]:
+        """Return (connection, reused)."""
+        if not fresh:
+            with self.lock:
+                if self.idle:
+                    return self.idle.pop(), True
+        if self.scheme != "https":
+            return http.client.HTTPConnection(self.host, timeout=self.timeout), False
+        
+        # Honour HTTPS_PROXY like urlopen does, tunnelling with CONNECT
+        proxy = urllib.request.getproxies().get("https")
+        if proxy and not urllib.request.proxy_bypass(self.host.split(":")[0]):
+            proxy_url = urllib.parse.urlsplit(proxy)
+            conn = http.client.HTTPSConnection(proxy_url.hostname, proxy_url.port, timeout=self.timeout)
+            conn.set_tunnel(self.host)
+            return conn, False
+        return http.client.HTTPSConnection(self.host, timeout=self.timeout), False
+
+    def release(self, conn: http.client.HTTPConnection) -> None:
+        with self.lock:
+            self.idle.append(conn)
+
+    def close(self) -> None:
+        with self.lock:
+            for conn in self.idle:
+                conn.close()
+            self.idle = []
+
+
+class StreamingResponse:
+    """An HTTP response whose body is read incrementally.
+    
+    Returned by HTTPSession.stream(). Closing it hands the connection back
+    to the pool if the body was read to the end (otherwise the connection
+    is dropped) and frees the host slot.
+    """
+    
+    def __init__(self, url: str, pool: _HostPool, conn: http.client.HTTPConnection,
+                 response: http.client.HTTPResponse):
+        self.url = url
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+        self._pool = pool
+        self._conn = conn
+        self._response = response
+        self._closed = False
+    
+    def read(self, amt: Optional[int] = None) -> bytes:
+        return self._response.read(amt)
+    
+    def iter_chunks(self, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        """Yield the body in chunks of at most ``chunk_size`` bytes."""
+        while True:
+            chunk = self._response.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._response.isclosed() and not self._response.will_close:
+            self._pool.release(self._conn)
+        else:
+            self._conn.close()
+        self._pool.slots.release()
+    
+    def __enter__(self) -> "StreamingResponse":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class HTTPSession:
+    """Keep-alive HTTP session with per-host pools, limits and retries.
+
+    Connections are reused across calls, so repeated requests to
+    openlibrary.org or archive.org skip the TCP and TLS handshakes. Each
+    host allows at most ``host_limits.get(host, max_per_host)`` requests at
+    once; extra callers wait for a slot. Responses with status 429 or 5xx
+    and connection errors are retried with exponential backoff and
+    jitter, honouring Retry-After when the server sends it. With a
+    ResponseCache attached, GETs are served from and revalidated against
+    the cache.
+
+    Error responses raise urllib.error.HTTPError, as before.
+    """
+
+    def __init__(
+        self,
+        max_per_host: int = DEFAULT_HOST_LIMIT,
+        host_limits: Optional[Dict[str, int]] = None,
+        timeout: float = 10.0,
+        retries: int = MAX_RETRIES,
+        backoff: float = BACKOFF_BASE,
+        cache: Optional[ResponseCache] = None
+    ):
+        self.cache = cache
+        self.max_per_host = max_per_host
+        self.host_limits = dict(HOST_LIMITS if host_limits is None else host_limits)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._pools: Dict[Tuple[str, str], _HostPool] = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, scheme: str, host: str) -> _HostPool:
+        with self._lock:
+            key = (scheme, host)
+            if key not in self._pools:
+                limit = self.host_limits.get(host, self.max_per_host)
+                self._pools[key] = _HostPool(scheme, host, limit, self.timeout)
+            return self._pools[key]
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            if retry_after.strip().isdigit():
+                return min(float(retry_after), MAX_RETRY_AFTER)
+            try:
+                when = email.utils.parsedate_to_datetime(retry_after)
+                return max(0.0, min(when.timestamp() - time.time(), MAX_RETRY_AFTER))
+            except (TypeError, ValueError):
+                pass
+        return self.backoff * (2 ** attempt) * (0.5 + random.random())
+
+    def _open(self, url: str, headers: Dict[str, str]) -> "StreamingResponse":
+        """Send one GET over a pooled connection and return the unread response."""
+        parsed = urllib.parse.urlsplit(url)
+        path = parsed.path or "/"
+        if parsed.query:
+            path += "?" + parsed.query
+        pool = self._pool(parsed.scheme, parsed.netloc)
+
+        pool.slots.acquire()
+        conn = None
+        try:
+            conn, reused = pool.connect()
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                if not reused:
+                    raise
+                # The server dropped an idle keep-alive connection; retry on a fresh one
+                conn.close()
+                conn, _ = pool.connect(fresh=True)
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+        except BaseException:
+            if conn is not None:
+                conn.close()
+            pool.slots.release()
+            raise
+        return StreamingResponse(url, pool, conn, response)
+
+    def _send(
+        self, url: str, headers: Dict[str, str]
+    ) -> Tuple[int, str, http.client.HTTPMessage, bytes]:
+        """Send one GET over a pooled connection; returns (status, reason, headers, body)."""
+        with self._open(url, headers) as response:
+            body = response.read()
+        if response.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        return response.status, response.reason, response.headers, body
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> bytes:
+        """GET a URL and return the response body.
+
+        Raises:
+            urllib.error.HTTPError: For non-2xx responses after retries
+            OSError: For connection errors after retries
+        """
+        request_headers = {"User-Agent": USER_AGENT, "Accept-Encoding": "gzip"}
+        request_headers.update(headers or {})
+        cache = self.cache
+        if cache is None:
+            return self._fetch(url, request_headers)[2]
+
+        entry = cache.lookup(url)
+        if entry and entry["fresh"]:
+            cache.count("hits")
+            cache.touch(url)
+            return entry["body"]
+
+        if entry:
+            if entry["etag"]:
+                request_headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                request_headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            status, response_headers, body = self._fetch(url, request_headers)
+        except (OSError, http.client.HTTPException) as e:
+            server_error = isinstance(e, urllib.error.HTTPError) and e.code >= 500
+            network_error = not isinstance(e, urllib.error.HTTPError)
+            if entry and cache.stale_on_error and (server_error or network_error):
+                cache.count("hits")
+                return entry["body"]
+            raise
+
+        if status == 304 and entry:
+            cache.count("revalidated")
+            cache.touch(url, refresh=True)
+            return entry["body"]
+        cache.count("misses")
+        cache.store(url, body, response_headers)
+        return body
+
+    def _fetch(
+        self, url: str, request_headers: Dict[str, str]
+    ) -> Tuple[int, http.client.HTTPMessage, bytes]:
+        """GET with redirects and retries; returns (status, headers, body) for 2xx/304."""
+
+        redirects = 0
+        attempt = 0
+        while True:
+            try:
+                status, reason, response_headers, body = self._send(url, request_headers)
+            except (OSError, http.client.HTTPException):
+                if attempt >= self.retries:
+                    raise
+                time.sleep(self._retry_delay(attempt, None))
+                attempt += 1
+                continue
+
+            if status in (301, 302, 303, 307, 308) and response_headers.get("Location"):
+                redirects += 1
+                if redirects > MAX_REDIRECTS:
+                    raise urllib.error.HTTPError(url, status, "Too many redirects", response_headers, None)
+                url = urllib.parse.urljoin(url, response_headers["Location"])
+                continue
+
+            if status in RETRY_STATUSES and attempt < self.retries:
+                time.sleep(self._retry_delay(attempt, response_headers.get("Retry-After")))
+                attempt += 1
+                continue
+
+            if status >= 400:
+                raise urllib.error.HTTPError(url, status, reason, response_headers, None)
+            return status, response_headers, body
+
+    def stream(self, url: str, headers: Optional[Dict[str, str]] = None) -> "StreamingResponse":
+        """GET a URL without reading the body, for large downloads.
+        
+        Redirects and retries are handled as for get(); the body is not
+        cached or decompressed. The returned response holds a connection
+        slot for its host until closed, so use it as a context manager.
+        
+        Raises:
+            urllib.error.HTTPError: For non-2xx responses after retries
+            OSError: For connection errors after retries
+        
+        Example:
+            with SESSION.stream(url) as response, open(path, "wb") as f:
+                for chunk in response.iter_chunks():
+                    f.write(chunk)
+        """
+        request_headers = {"User-Agent": USER_AGENT}
+        request_headers.update(headers or {})
+        redirects = 0
+        attempt = 0
+        while True:
+            try:
+                response = self._open(url, request_headers)
+            except (OSError, http.client.HTTPException):
+                if attempt >= self.retries:
+                    raise
+                time.sleep(self._retry_delay(attempt, None))
+                attempt += 1
+                continue
+
+            status, response_headers = response.status, response.headers
+            if status in (301, 302, 303, 307, 308) and response_headers.get("Location"):
+                response.close()
+                redirects += 1
+                if redirects > MAX_REDIRECTS:
+                    raise urllib.error.HTTPError(url, status, "Too many redirects", response_headers, None)
+                url = urllib.parse.urljoin(url, response_headers["Location"])
+                continue
+
+            if status in RETRY_STATUSES and attempt < self.retries:
+                response.close()
+                time.sleep(self._retry_delay(attempt, response_headers.get("Retry-After")))
+                attempt += 1
+                continue
+
+            if status >= 400:
+                response.close()
+                raise urllib.error.HTTPError(url, status, response.reason, response_headers, None)
+            return response
+
+    def get_json(self, url: str) -> Any:
+        """GET a URL and decode its JSON body."""
+        return json.loads(self.get(url))
+
+    def close(self) -> None:
+        """Close all idle pooled connections."""
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.close()
+
+
+# Shared session used by the module-level API functions. Responses are
+# cached only if RESEARCH_CACHE is set or enable_response_cache() is called.
+SESSION = HTTPSession(cache=ResponseCache(CACHE_PATH) if os.environ.get("RESEARCH_CACHE") else None)
+
+
+def configure_session(**options) -> HTTPSession:
+    """Replace the shared session, e.g. ``configure_session(host_limits={"archive.org": 2})``.
+
+    Accepts the HTTPSession constructor options.
+    """
+    global SESSION
+    options.setdefault("cache", SESSION.cache)
+    SESSION.close()
+    SESSION = HTTPSession(**options)
+    return SESSION
+
+
+def enable_response_cache(path: str = CACHE_PATH, **options) -> ResponseCache:
+    """Attach an on-disk ResponseCache to the shared session and return it.
+
+    Accepts the ResponseCache constructor options (ttls, max_bytes, ...).
+    """
+    SESSION.cache = ResponseCache(path, **options)
+    return SESSION.cache
+
+
+class BookRecord:
+    """Compact, slotted form of an Open Library search doc.
+    
+    Keeps only the SEARCH_FIELDS (None when absent or empty), stores
+    lists as tuples and interns the strings that repeat across many books
+    (author names, publishers, subjects), so tens of thousands of records
+    take a fraction of the memory of the raw dicts. ``get()`` mirrors dict access, so records
+    can be passed to format_book_result and other code written for docs.
+    """
+    
+    __slots__ = SEARCH_FIELDS
+    _INTERNED = ("author_name", "publisher", "subject")
+    
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+    
+    @classmethod
+    def from_doc(cls, doc: Dict[str, Any]) -> "BookRecord":
+        """Build a record from a search doc, dropping fields it doesn't keep."""
+        record = cls.__new__(cls)
+        for name in cls.__slots__:
+            value = doc.get(name)
+            if isinstance(value, list):
+                if name in cls._INTERNED:
+                    value = tuple(map(sys.intern, value)) or None
+                else:
+                    value = tuple(value) or None
+            setattr(record, name, value)
+        return record
+    
+    def get(self, name: str, default: Any = None) -> Any:
+        """Field value, or ``default`` if the doc didn't have it (like dict.get on a doc)."""
+        value = getattr(self, name, None)
+        return default if value is None else value
+    
+    def __getitem__(self, name: str) -> Any:
+        value = self.get(name)
+        if value is None:
+            raise KeyError(name)
+        return value
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """The fields present as a search doc dict (tuples back to lists)."""
+        doc = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if value is None:
+                continue
+            doc[name] = list(value) if isinstance(value, tuple) else value
+        return doc
+    
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, BookRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+    
+    def __hash__(self) -> int:
+        return hash(self.key)
+    
+    def __repr__(self) -> str:
+        return f"BookRecord(key={self.key!r}, title={self.title!r})"
+
 
 def search_books(
     query: Optional[str] = None,
@@ -18,6 +654,8 @@ def search_books(
     subject: Optional[str] = None,
     limit: int = 10,
     offset: int = 0,
+    fields: Union[str, Iterable[str], None] = None,
+    compact: bool = False,
 ) -> Dict[str, Any]:
     """Search Open Library for books.
     
@@ -29,6 +667,9 @@ def search_books(
         subject: Search by subject
         limit: Max results (default 10, max 100)
         offset: Pagination offset
+        fields: Fields to request (default SEARCH_FIELDS); a smaller
+            projection such as MINIMAL_FIELDS means less to download and parse
+        compact: Return docs as BookRecord objects instead of dicts
         
     Returns:
         Dict with 'numFound' and 'docs' (list of book objects)
@@ -48,13 +689,79 @@ def search_books(
         
     params["limit"] = min(limit, 100)
     params["offset"] = offset
-    params["fields"] = "key,title,author_name,first_publish_year,isbn,edition_count,has_fulltext,ia,cover_i,publisher,subject"
+    if fields is None:
+        fields = SEARCH_FIELDS
+    params["fields"] = fields if isinstance(fields, str) else ",".join(fields)
     
     url = f"https://openlibrary.org/search.json?{urllib.parse.urlencode(params)}"
+    results = SESSION.get_json(url)
+    if compact:
+        results["docs"] = [BookRecord.from_doc(doc) for doc in results.get("docs", [])]
+    return results
+
+
+def iter_books(
+    page_size: int = SEARCH_PAGE_SIZE,
+    max_results: Optional[int] = None,
+    stop_when: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    offset: int = 0,
+    **search_args
+) -> Iterator[Dict[str, Any]]:
+    """Lazily iterate over all Open Library search results.
+    
+    Pages are fetched with search_books as the iterator advances. While
+    one page is being consumed, the next is already being fetched in the
+    background, so at most two pages are held in memory.
+    
+    Args:
+        page_size: Results per request (max 100)
+        max_results: Stop after this many results
+        stop_when: Stop before the first doc for which this returns True
+        offset: Index of the first result
+        **search_args: search_books arguments (query, title, author, ...,
+            fields, compact)
+        
+    Yields:
+        Book dicts from Open Library search (BookRecord with compact=True)
+        
+    Example:
+        for book in iter_books(author="asimov", stop_when=lambda b: b.get("first_publish_year", 0) < 1950):
+            print(book["title"])
+    """
+    if max_results is not None and max_results <= 0:
+        return
+    page_size = max(1, min(page_size, SEARCH_PAGE_SIZE))
+    start = offset
+    yielded = 0
     
-    req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
-    with urllib.request.urlopen(req, timeout=10) as response:
-        return json.loads(response.read())
+    def fetch(page_offset: int) -> Dict[str, Any]:
+        # Don't ask for more than max_results still needs (yielded + pending)
+        limit = page_size if max_results is None else min(page_size, max_results - (page_offset - start))
+        return search_books(limit=limit, offset=page_offset, **search_args)
+    
+    pool = ThreadPoolExecutor(max_workers=1)
+    try:
+        future = pool.submit(fetch, offset)
+        while future is not None:
+            page = future.result()
+            docs = page.get("docs", [])
+            offset += len(docs)
+            
+            # Prefetch the next page while the caller works through this one
+            future = None
+            wanted_more = max_results is None or offset - start < max_results
+            if docs and offset < page.get("numFound", 0) and wanted_more:
+                future = pool.submit(fetch, offset)
+            
+            for doc in docs:
+                if stop_when and stop_when(doc):
+                    return
+                yield doc
+                yielded += 1
+                if max_results is not None and yielded >= max_results:
+                    return
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
 
 
 def get_book_details(identifier: str, id_type: str = "ISBN") -> Dict[str, Any]:
@@ -75,11 +782,87 @@ def get_book_details(identifier: str, id_type: str = "ISBN") -> Dict[str, Any]:
     }
     
     url = f"https://openlibrary.org/api/books?{urllib.parse.urlencode(params)}"
+    data = SESSION.get_json(url)
+    return data.get(bibkey, {})
+
+
+def _bibkey_chunks(bibkeys: List[str]) -> List[List[str]]:
+    """Split bibkeys into the largest batches that fit one request URL."""
+    base = len("https://openlibrary.org/api/books?bibkeys=&format=json&jscmd=data")
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    length = base
+    for key in bibkeys:
+        # Commas and colons are percent-encoded in the query string
+        key_length = len(urllib.parse.quote(key, safe="")) + 3
+        if current and (len(current) >= BIBKEYS_PER_REQUEST or length + key_length > MAX_URL_LENGTH):
+            chunks.append(current)
+            current, length = [], base
+        current.append(key)
+        length += key_length
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _fetch_bibkeys(bibkeys: List[str]) -> Dict[str, Any]:
+    params = {
+        "bibkeys": ",".join(bibkeys),
+        "format": "json",
+        "jscmd": "data"
+    }
+    url = f"https://openlibrary.org/api/books?{urllib.parse.urlencode(params)}"
+    return SESSION.get_json(url)
+
+
+def get_book_details_many(
+    identifiers: Iterable[str],
+    id_type: str = "ISBN",
+    max_workers: int = FORMAT_WORKERS
+) -> Dict[str, Any]:
+    """Get book details for many identifiers using batched bibkeys.
+    
+    The /api/books endpoint accepts many comma-separated bibkeys, so
+    identifiers are packed into as few requests as the URL length allows
+    and the batches are fetched concurrently.
+    
+    Args:
+        identifiers: Book identifiers (ISBNs, OLIDs, ...)
+        id_type: Type of identifier (ISBN, OCLC, LCCN, OLID, OL)
+        max_workers: Max concurrent requests
+        
+    Returns:
+        Dict with 'results' (identifier -> details), 'missing' (identifiers
+        Open Library doesn't know) and 'errors' (identifier -> error message
+        for batches that failed)
+        
+    Example:
+        found = get_book_details_many(isbns)
+        print(f"{len(found['results'])} found, {len(found['missing'])} missing")
+    """
+    unique = list(dict.fromkeys(str(i).strip() for i in identifiers if str(i).strip()))
+    results: Dict[str, Any] = {}
+    missing: List[str] = []
+    errors: Dict[str, str] = {}
+    
+    chunks = _bibkey_chunks([f"{id_type}:{identifier}" for identifier in unique])
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = [(chunk, pool.submit(_fetch_bibkeys, chunk)) for chunk in chunks]
+        for chunk, future in futures:
+            try:
+                data = future.result()
+            except Exception as e:
+                for bibkey in chunk:
+                    errors[bibkey.split(":", 1)[1]] = str(e)
+                continue
+            for bibkey in chunk:
+                identifier = bibkey.split(":", 1)[1]
+                if bibkey in data:
+                    results[identifier] = data[bibkey]
+                else:
+                    missing.append(identifier)
     
-    req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
-    with urllib.request.urlopen(req, timeout=10) as response:
-        data = json.loads(response.read())
-        return data.get(bibkey, {})
+    return {"results": results, "missing": missing, "errors": errors}
 
 
 def get_archive_metadata(ia_identifier: str) -> Dict[str, Any]:
@@ -92,10 +875,29 @@ def get_archive_metadata(ia_identifier: str) -> Dict[str, Any]:
         Dict with full metadata including download links
     """
     url = f"https://archive.org/metadata/{ia_identifier}"
+    return SESSION.get_json(url)
+
+
+# Async variants: run on worker threads over the shared keep-alive session,
+# bounded by the per-host connection limits
+
+async def asearch_books(**kwargs) -> Dict[str, Any]:
+    """Async version of search_books (same keyword arguments)."""
+    return await asyncio.to_thread(search_books, **kwargs)
+
+
+async def aget_book_details(identifier: str, id_type: str = "ISBN") -> Dict[str, Any]:
+    """Async version of get_book_details."""
+    return await asyncio.to_thread(get_book_details, identifier, id_type)
+
+
+async def aget_archive_metadata(ia_identifier: str) -> Dict[str, Any]:
+    """Async version of get_archive_metadata.
     
-    req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
-    with urllib.request.urlopen(req, timeout=10) as response:
-        return json.loads(response.read())
+    Example:
+        metadata = await asyncio.gather(*(aget_archive_metadata(i) for i in ids))
+    """
+    return await asyncio.to_thread(get_archive_metadata, ia_identifier)
 
 
 def get_download_links(ia_identifier: str) -> List[Dict[str, str]]:
@@ -127,12 +929,211 @@ def get_download_links(ia_identifier: str) -> List[Dict[str, str]]:
     return links
 
 
-def format_book_result(book: Dict[str, Any], include_downloads: bool = True) -> str:
+def _file_checksums(path: Path) -> Dict[str, str]:
+    md5 = hashlib.md5()
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), b""):
+            md5.update(chunk)
+            sha1.update(chunk)
+    return {"md5": md5.hexdigest(), "sha1": sha1.hexdigest()}
+
+
+class _RangeDownload:
+    """Segments of one ranged download and their on-disk resume state.
+    
+    The data goes to ``<dest>.part`` and the progress of each segment to
+    ``<dest>.part.json``, so an interrupted download picks up where every
+    segment stopped. State is only reused if the file's size and
+    checksums in the metadata still match.
+    """
+    
+    def __init__(self, url: str, dest: Path, size: int, checksums: Dict[str, str], segments: int):
+        self.url = url
+        self.dest = dest
+        self.size = size
+        self.checksums = checksums
+        self.part = dest.with_name(dest.name + ".part")
+        self.state_path = dest.with_name(dest.name + ".part.json")
+        self.lock = threading.Lock()
+        
+        state = None
+        if self.part.exists() and self.state_path.exists():
+            try:
+                state = json.loads(self.state_path.read_text())
+            except ValueError:
+                state = None
+        if state and state.get("size") == size and state.get("checksums") == checksums:
+            self.segments = [list(segment) for segment in state["segments"]]
+        else:
+            count = max(1, min(segments, size // MIN_SEGMENT_BYTES))
+            bounds = [size * i // count for i in range(count + 1)]
+            # [start, end (exclusive), next byte to fetch]
+            self.segments = [[bounds[i], bounds[i + 1], bounds[i]] for i in range(count)]
+            with open(self.part, "wb") as f:
+                f.truncate(size)
+        self.resumed = sum(pos - start for start, _, pos in self.segments)
+    
+    @property
+    def done(self) -> int:
+        return sum(pos - start for start, _, pos in self.segments)
+    
+    def save(self) -> None:
+        with self.lock:
+            state = {"size": self.size, "checksums": self.checksums, "segments": self.segments}
+            tmp = self.state_path.with_name(self.state_path.name + ".tmp")
+            tmp.write_text(json.dumps(state))
+            os.replace(tmp, self.state_path)
+    
+    def fetch(self, index: int, session: HTTPSession, progress: Optional[Callable[[int, int], None]]) -> None:
+        """Download the rest of one segment, reconnecting from the last byte on errors."""
+        segment = self.segments[index]
+        attempt = 0
+        # Unbuffered, so bytes recorded in the state file are really written
+        with open(self.part, "r+b", buffering=0) as f:
+            while segment[2] < segment[1]:
+                unsaved = 0
+                try:
+                    headers = {"Range": f"bytes={segment[2]}-{segment[1] - 1}"}
+                    with session.stream(self.url, headers=headers) as response:
+                        if response.status != 206 and not (response.status == 200 and segment[2] == 0
+                                                           and segment[1] == self.size):
+                            raise urllib.error.HTTPError(
+                                response.url, response.status, "Server ignored the Range header",
+                                response.headers, None
+                            )
+                        f.seek(segment[2])
+                        for chunk in response.iter_chunks():
+                            chunk = chunk[:segment[1] - segment[2]]
+                            f.write(chunk)
+                            segment[2] += len(chunk)
+                            unsaved += len(chunk)
+                            if progress:
+                                progress(self.done, self.size)
+                            if unsaved >= RESUME_SAVE_BYTES:
+                                self.save()
+                                unsaved = 0
+                            if segment[2] >= segment[1]:
+                                break
+                    if segment[2] < segment[1]:
+                        raise http.client.IncompleteRead(b"", segment[1] - segment[2])
+                except (OSError, http.client.HTTPException) as e:
+                    self.save()
+                    if isinstance(e, urllib.error.HTTPError) or attempt >= session.retries:
+                        raise
+                    time.sleep(session._retry_delay(attempt, None))
+                    attempt += 1
+        self.save()
+
+
+def download_file(
+    ia_identifier: str,
+    filename: str,
+    dest_dir: str = ".",
+    segments: int = DOWNLOAD_SEGMENTS,
+    verify: bool = True,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> Dict[str, Any]:
+    """Download a file from an Archive.org item with parallel Range requests.
+    
+    Large files are split into up to ``segments`` byte ranges fetched
+    concurrently (further limited per host by the shared session) and
+    written straight to disk, never held in memory. Progress is recorded
+    next to the file, so calling this again after an interruption resumes
+    each segment where it stopped. The result is checked against the
+    md5/sha1 listed in the item's metadata before it's moved into place.
+    
+    Args:
+        ia_identifier: Internet Archive identifier
+        filename: File name as listed by get_download_links
+        dest_dir: Directory to save the file in
+        segments: Max parallel ranges (files under MIN_SEGMENT_BYTES use one)
+        verify: Check md5/sha1 against the item metadata
+        progress: Called as progress(bytes_done, total_bytes) while downloading
+            (total_bytes is 0 if the size isn't known)
+        
+    Returns:
+        Dict with 'path', 'size', 'resumed_bytes' (already on disk from an
+        earlier attempt) and 'verified' keys
+        
+    Raises:
+        KeyError: If the item has no file of that name
+        ValueError: If the downloaded file doesn't match its checksums
+        
+    Example:
+        for link in get_download_links("neuromancer00gibs"):
+            if link["filename"].endswith(".pdf"):
+                download_file("neuromancer00gibs", link["filename"], dest_dir="books")
+    """
+    metadata = get_archive_metadata(ia_identifier)
+    entry = next((f for f in metadata.get("files", []) if f.get("name") == filename), None)
+    if entry is None:
+        raise KeyError(f"{ia_identifier} has no file named {filename!r}")
+    checksums = {k: entry[k] for k in ("md5", "sha1") if entry.get(k)}
+    size = int(entry["size"]) if str(entry.get("size", "")).isdigit() else None
+    
+    dest = Path(dest_dir) / Path(filename).name
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    url = f"https://archive.org/download/{ia_identifier}/{urllib.parse.quote(filename)}"
+    
+    if dest.exists() and (size is None or dest.stat().st_size == size):
+        existing = _file_checksums(dest) if verify and checksums else checksums
+        if all(existing[k] == v for k, v in checksums.items()):
+            return {"path": str(dest), "size": dest.stat().st_size, "resumed_bytes": dest.stat().st_size,
+                    "verified": verify and bool(checksums)}
+    
+    resumed = 0
+    if size:
+        download = _RangeDownload(url, dest, size, checksums, segments)
+        resumed = download.resumed
+        pending = [i for i, (_, end, pos) in enumerate(download.segments) if pos < end]
+        with ThreadPoolExecutor(max_workers=max(1, len(pending))) as pool:
+            futures = [pool.submit(download.fetch, i, SESSION, progress) for i in pending]
+            for future in futures:
+                future.result()
+        part = download.part
+    else:
+        # Size unknown: one plain streamed request, no resume
+        part = dest.with_name(dest.name + ".part")
+        done = 0
+        with SESSION.stream(url) as response, open(part, "wb") as f:
+            for chunk in response.iter_chunks():
+                f.write(chunk)
+                done += len(chunk)
+                if progress:
+                    progress(done, 0)
+    
+    verified = False
+    if verify and checksums:
+        actual = _file_checksums(part)
+        mismatched = [k for k, v in checksums.items() if actual[k] != v]
+        if mismatched:
+            part.unlink()
+            state = part.with_name(part.name + ".json")
+            if state.exists():
+                state.unlink()
+            raise ValueError(f"Checksum mismatch for {ia_identifier}/{filename} ({', '.join(mismatched)})")
+        verified = True
+    
+    os.replace(part, dest)
+    state = part.with_name(part.name + ".json")
+    if state.exists():
+        state.unlink()
+    return {"path": str(dest), "size": dest.stat().st_size, "resumed_bytes": resumed, "verified": verified}
+
+
+def format_book_result(
+    book: Dict[str, Any],
+    include_downloads: bool = True,
+    downloads: Union[List[Dict[str, str]], Exception, None] = None
+) -> str:
     """Format a book search result as markdown.
     
     Args:
         book: Book dict from Open Library search
         include_downloads: If True and book has Archive.org ID, fetch download links
+        downloads: Prefetched get_download_links result (or the exception it
+            raised); skips the fetch when given
         
     Returns:
         Formatted markdown string
@@ -163,7 +1164,10 @@ def format_book_result(book: Dict[str, Any], include_downloads: bool = True) ->
         md += f"  - Reader: https://archive.org/details/{ia_id}\n"
         
         try:
-            downloads = get_download_links(ia_id)
+            if downloads is None:
+                downloads = get_download_links(ia_id)
+            elif isinstance(downloads, Exception):
+                raise downloads
             if downloads:
                 md += "  - Downloads:\n"
                 for dl in downloads:
@@ -174,10 +1178,314 @@ def format_book_result(book: Dict[str, Any], include_downloads: bool = True) ->
     return md
 
 
+def _download_links_or_error(ia_identifier: str) -> Union[List[Dict[str, str]], Exception]:
+    try:
+        return get_download_links(ia_identifier)
+    except Exception as e:
+        return e
+
+
+def format_results(
+    books: Iterable[Dict[str, Any]],
+    include_downloads: bool = True,
+    max_workers: int = FORMAT_WORKERS
+) -> Iterator[str]:
+    """Format many search results, fetching download links concurrently.
+    
+    Archive.org metadata for every book is requested up front on a
+    bounded thread pool (further limited per host by the shared session).
+    Markdown blocks are yielded in input order as soon as each one is
+    ready, so total latency is roughly one round trip rather than one per
+    book.
+    
+    Args:
+        books: Book dicts from Open Library search
+        include_downloads: Fetch download links for books with an Archive.org ID
+        max_workers: Max concurrent metadata requests
+        
+    Yields:
+        Formatted markdown string per book
+        
+    Example:
+        results = search_books(query="dune", limit=100)
+        for block in format_results(results["docs"]):
+            print(block)
+    """
+    books = list(books)
+    if not include_downloads:
+        for book in books:
+            yield format_book_result(book, include_downloads=False)
+        return
+    
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures: Dict[str, Any] = {}
+        for book in books:
+            ia_ids = book.get("ia") or []
+            if ia_ids and ia_ids[0] not in futures:
+                futures[ia_ids[0]] = pool.submit(_download_links_or_error, ia_ids[0])
+        
+        try:
+            for book in books:
+                ia_ids = book.get("ia") or []
+                downloads = futures[ia_ids[0]].result() if ia_ids else None
+                yield format_book_result(book, downloads=downloads)
+        finally:
+            # Don't start queued fetches if the caller stops early
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+class TextIndex:
+    """SQLite FTS5 index of downloaded Archive.org texts.
+    
+    Each text file is split into passages of about PASSAGE_BYTES, cut at
+    line or word breaks, and every passage is indexed with its item
+    identifier, file name and byte offset in the file. Files are read
+    from disk in chunks, so memory use doesn't depend on the size of the
+    book. Re-adding an unchanged file is a no-op.
+    
+    Raises:
+        RuntimeError: If the local SQLite library was built without FTS5
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or str(Path(FULLTEXT_DIR) / "index.db")
+        self._lock = threading.Lock()
+        
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS documents (
+                identifier TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                title TEXT,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                passage_count INTEGER NOT NULL,
+                indexed REAL NOT NULL,
+                PRIMARY KEY (identifier, filename)
+            )"""
+        )
+        try:
+            self._db.execute(
+                """CREATE VIRTUAL TABLE IF NOT EXISTS passages USING fts5(
+                    body, identifier UNINDEXED, filename UNINDEXED, offset UNINDEXED,
+                    tokenize = 'porter unicode61'
+                )"""
+            )
+        except sqlite3.OperationalError as e:
+            raise RuntimeError(f"SQLite FTS5 is not available: {e}") from e
+        self._db.commit()
+    
+    @staticmethod
+    def iter_passages(path: str, passage_bytes: int = PASSAGE_BYTES) -> Iterator[Tuple[int, str]]:
+        """Yield (byte offset, text) passages of a file, reading it in chunks."""
+        offset = 0
+        buffer = b""
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(STREAM_CHUNK_SIZE)
+                buffer += chunk
+                while len(buffer) >= passage_bytes or (not chunk and buffer):
+                    cut = len(buffer)
+                    if len(buffer) >= passage_bytes:
+                        # Prefer a line break, then a space, in the second half of the window
+                        cut = buffer.rfind(b"\n", passage_bytes // 2, passage_bytes) + 1
+                        if not cut:
+                            cut = buffer.rfind(b" ", passage_bytes // 2, passage_bytes) + 1
+                        if not cut:
+                            cut = passage_bytes
+                    text = buffer[:cut].decode("utf-8", errors="replace").strip()
+                    if text:
+                        yield offset, text
+                    offset += cut
+                    buffer = buffer[cut:]
+                if not chunk:
+                    return
+    
+    def add_file(self, identifier: str, filename: str, path: str, title: Optional[str] = None) -> int:
+        """Index a text file; returns the number of passages added (0 if unchanged)."""
+        size = os.path.getsize(path)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT size FROM documents WHERE identifier = ? AND filename = ?", (identifier, filename)
+            ).fetchone()
+            if row and row[0] == size:
+                return 0
+            
+            self._db.execute(
+                "DELETE FROM passages WHERE identifier = ? AND filename = ?", (identifier, filename)
+            )
+            count = 0
+            batch = []
+            for offset, text in self.iter_passages(path):
+                batch.append((text, identifier, filename, offset))
+                if len(batch) >= 500:
+                    self._db.executemany(
+                        "INSERT INTO passages (body, identifier, filename, offset) VALUES (?, ?, ?, ?)", batch
+                    )
+                    count += len(batch)
+                    batch = []
+            if batch:
+                self._db.executemany(
+                    "INSERT INTO passages (body, identifier, filename, offset) VALUES (?, ?, ?, ?)", batch
+                )
+                count += len(batch)
+            self._db.execute(
+                """INSERT OR REPLACE INTO documents
+                (identifier, filename, title, path, size, passage_count, indexed) VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (identifier, filename, title, str(path), size, count, time.time())
+            )
+            self._db.commit()
+        return count
+    
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Best-matching passages for an FTS5 query, most relevant first.
+        
+        Plain words match all of them in any order; FTS5 syntax such as
+        "exact phrase", OR, NOT and prefix* is supported. A query that isn't
+        valid FTS5 syntax is retried as a list of quoted words.
+        """
+        sql = """SELECT passages.identifier, passages.filename, passages.offset, d.title, d.path,
+                        snippet(passages, 0, '[', ']', '...', 24), bm25(passages)
+                 FROM passages JOIN documents d
+                     ON d.identifier = passages.identifier AND d.filename = passages.filename
+                 WHERE passages MATCH ? ORDER BY bm25(passages) LIMIT ?"""
+        with self._lock:
+            try:
+                rows = self._db.execute(sql, (query, limit)).fetchall()
+            except sqlite3.OperationalError:
+                quoted = " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+                rows = self._db.execute(sql, (quoted, limit)).fetchall() if quoted else []
+        return [
+            {
+                "identifier": identifier,
+                "filename": filename,
+                "offset": offset,
+                "title": title,
+                "path": path,
+                "snippet": snippet,
+                "score": -score,
+                "url": f"https://archive.org/details/{identifier}",
+            }
+            for identifier, filename, offset, title, path, snippet, score in rows
+        ]
+    
+    def documents(self) -> List[Dict[str, Any]]:
+        """Indexed files with their size and passage count."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT identifier, filename, title, path, size, passage_count FROM documents ORDER BY identifier"
+            ).fetchall()
+        keys = ("identifier", "filename", "title", "path", "size", "passages")
+        return [dict(zip(keys, row)) for row in rows]
+    
+    def remove(self, identifier: str) -> None:
+        """Drop all passages of an item from the index (files stay on disk)."""
+        with self._lock:
+            self._db.execute("DELETE FROM passages WHERE identifier = ?", (identifier,))
+            self._db.execute("DELETE FROM documents WHERE identifier = ?", (identifier,))
+            self._db.commit()
+    
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+_TEXT_INDEX: Optional[TextIndex] = None
+_TEXT_INDEX_LOCK = threading.Lock()
+
+
+def get_text_index() -> TextIndex:
+    """Shared TextIndex under FULLTEXT_DIR, opened on first use."""
+    global _TEXT_INDEX
+    with _TEXT_INDEX_LOCK:
+        if _TEXT_INDEX is None:
+            _TEXT_INDEX = TextIndex()
+        return _TEXT_INDEX
+
+
+def download_texts(ia_identifier: str, dest_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Download the plain-text files of an Archive.org item to disk.
+    
+    The OCR text (``*_djvu.txt``) is preferred; other ``.txt`` files are
+    used if there is none. Files are streamed to disk in chunks and
+    renamed into place when complete; files already present with the
+    expected size are not downloaded again.
+    
+    Args:
+        ia_identifier: Internet Archive identifier
+        dest_dir: Directory for the files (default: FULLTEXT_DIR/texts/<identifier>)
+        
+    Returns:
+        List of dicts with 'filename', 'path' and 'size' keys, plus the
+        item's 'title'
+    """
+    metadata = get_archive_metadata(ia_identifier)
+    title = metadata.get("metadata", {}).get("title")
+    files = [f for f in metadata.get("files", []) if f.get("name", "").endswith(".txt")]
+    djvu = [f for f in files if f["name"].endswith("_djvu.txt")]
+    
+    target = Path(dest_dir or Path(FULLTEXT_DIR) / "texts" / ia_identifier)
+    target.mkdir(parents=True, exist_ok=True)
+    
+    texts = []
+    for file in djvu or files:
+        name = file["name"]
+        path = target / name.replace("/", "_")
+        expected = file.get("size")
+        if not (path.exists() and expected and str(path.stat().st_size) == str(expected)):
+            url = f"https://archive.org/download/{ia_identifier}/{urllib.parse.quote(name)}"
+            partial = path.with_name(path.name + ".part")
+            with SESSION.stream(url) as response, open(partial, "wb") as f:
+                for chunk in response.iter_chunks():
+                    f.write(chunk)
+            os.replace(partial, path)
+        texts.append({"filename": name, "path": str(path), "size": path.stat().st_size, "title": title})
+    return texts
+
+
+def index_archive_text(ia_identifier: str, index: Optional[TextIndex] = None) -> int:
+    """Download an item's text files and add them to the local full-text index.
+    
+    Args:
+        ia_identifier: Internet Archive identifier
+        index: TextIndex to use (default: the shared one under FULLTEXT_DIR)
+        
+    Returns:
+        Number of passages indexed (0 if the item was already up to date)
+    """
+    index = index or get_text_index()
+    count = 0
+    for text in download_texts(ia_identifier):
+        count += index.add_file(ia_identifier, text["filename"], text["path"], title=text["title"])
+    return count
+
+
+def search_local(query: str, limit: int = 20, index: Optional[TextIndex] = None) -> List[Dict[str, Any]]:
+    """Search the texts indexed with index_archive_text, without network access.
+    
+    Args:
+        query: Words to find (FTS5 syntax such as "exact phrase" is supported)
+        limit: Max passages to return
+        index: TextIndex to use (default: the shared one under FULLTEXT_DIR)
+        
+    Returns:
+        List of dicts with 'identifier', 'title', 'filename', 'offset'
+        (byte offset of the passage in the file), 'path', 'snippet'
+        (match marked with [brackets]), 'score' and 'url' keys
+        
+    Example:
+        index_archive_text("originofspecies00darwuoft")
+        for hit in search_local("natural selection"):
+            print(hit["title"], hit["offset"], hit["snippet"])
+    """
+    return (index or get_text_index()).search(query, limit=limit)
+
+
 if __name__ == "__main__":
     # Example usage
-    import sys
-    
     if len(sys.argv) < 2:
         print("Usage: python skill.py <search query>")
         sys.exit(1)
@@ -189,6 +1497,6 @@ if __name__ == "__main__":
     
     print(f"Found {results['numFound']} results. Showing top 3:\n")
     
-    for book in results.get("docs", [])[:3]:
-        print(format_book_result(book))
+    for block in format_results(results.get("docs", [])[:3]):
+        print(block)
         print()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Throughput benchmark for download_batch against a stub yt-dlp binary.
+
+The stub sleeps for a fixed "download" time and writes a file of a fixed
+size, so the numbers reflect scheduling overhead and parallelism rather
+than network conditions.
+
+Usage:
+    python scripts/bench_batch.py [--urls 200] [--hosts 4] [--delay 0.2] [--workers 8] [--per-host 2]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import stat
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import skill  # noqa: E402
+
+STUB = '''#!/usr/bin/env python3
+import sys, time
+args = sys.argv[1:]
+url = args[-1]
+template = args[args.index("-o") + 1]
+video_id = url.rsplit("=", 1)[-1]
+path = template.replace("%(title)s", video_id).replace("%(ext)s", "mp4")
+time.sleep({delay})
+with open(path, "wb") as f:
+    f.write(b"\\0" * {size})
+if "--print" in args:
+    print(path)
+'''
+
+
+def make_stub(directory: Path, delay: float, size: int) -> str:
+    path = directory / "yt-dlp"
+    path.write_text(STUB.format(delay=delay, size=size))
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+def run(label: str, urls: list[str], out_dir: Path, workers: int, per_host: int) -> None:
+    start = time.monotonic()
+    results = skill.run_batch(urls, output_dir=str(out_dir), max_workers=workers, per_host_limit=per_host)
+    elapsed = time.monotonic() - start
+    ok = sum(r.success for r in results)
+    total_bytes = sum(r.bytes for r in results)
+    print(
+        f"{label:<12} {len(urls)} urls  {ok} ok  {elapsed:7.2f}s  "
+        f"{len(urls) / elapsed:7.1f} urls/s  {total_bytes / elapsed / 1e6:7.2f} MB/s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--urls", type=int, default=200)
+    parser.add_argument("--hosts", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=0.2, help="Simulated seconds per download")
+    parser.add_argument("--size", type=int, default=1_000_000, help="Bytes written per download")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--per-host", type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        skill.YT_DLP = make_stub(tmp_path, args.delay, args.size)
+        urls = [f"https://host{i % args.hosts}.example/watch?v=vid{i}" for i in range(args.urls)]
+
+        for label, workers, per_host in (
+            ("serial", 1, 1),
+            ("concurrent", args.workers, args.per_host),
+        ):
+            out_dir = tmp_path / label
+            out_dir.mkdir()
+            run(label, urls, out_dir, workers, per_host)
+            for f in out_dir.iterdir():
+                os.unlink(f)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Per-call overhead benchmark: subprocess engine vs in-process library engine.
+
+Serves a small media file from a local HTTP server and calls
+get_video_info on it repeatedly with each engine, so the numbers are
+dominated by process startup and extractor setup rather than the network.
+Requires the yt-dlp package (pip install yt-dlp) for the library engine.
+
+Usage:
+    python scripts/bench_engines.py [--calls 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import http.server
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import skill  # noqa: E402
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(directory: str) -> http.server.ThreadingHTTPServer:
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bench(engine: str, url: str, calls: int) -> None:
+    skill.set_engine(engine)
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        skill.get_video_info(url)
+        timings.append(time.perf_counter() - start)
+    print(
+        f"{engine:<11} first {timings[0] * 1000:8.1f} ms   "
+        f"median {statistics.median(timings[1:] or timings) * 1000:8.1f} ms   "
+        f"total {sum(timings):6.2f}s for {calls} calls"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20)
+    args = parser.parse_args()
+
+    if not Path(skill.YT_DLP).exists():
+        skill.YT_DLP = shutil.which("yt-dlp") or skill.YT_DLP
+    skill.METADATA_CACHE = None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "clip.mp4").write_bytes(b"\0" * 100_000)
+        server = serve(tmp)
+        url = f"http://127.0.0.1:{server.server_address[1]}/clip.mp4"
+        try:
+            for engine in ("subprocess", "library"):
+                bench(engine, url, args.calls)
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,773 @@
 #!/usr/bin/env python3
 """Video download helper using yt-dlp."""
 
+import asyncio
+import hashlib
+import hmac
+import http.server
+import os
+import sqlite3
 import subprocess
 import json
+import queue
+import secrets
+import shutil
+import signal
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Callable, Iterator, Tuple
 
 
 YT_DLP = "/usr/local/bin/yt-dlp"
 
+# Metadata cache defaults. Format URLs inside info JSON expire after a few
+# hours on most sites, so keep the TTL short enough for --load-info-json.
+CACHE_PATH = os.environ.get(
+    "VIDEO_DOWNLOAD_CACHE", str(Path.home() / ".cache" / "video-download" / "metadata.db")
+)
+CACHE_TTL = 3600
+CACHE_MAX_ENTRIES = 5000
 
-def download_video(
+# Content-addressed store root; disabled unless set or passed explicitly
+STORE_PATH = os.environ.get("VIDEO_DOWNLOAD_STORE")
+
+# Execution engine: "subprocess" forks yt-dlp per call, "library" runs it
+# in-process through the yt_dlp package (see set_engine)
+ENGINE = os.environ.get("VIDEO_DOWNLOAD_ENGINE", "subprocess")
+
+# Max idle YoutubeDL instances kept warm by the library engine
+LIBRARY_POOL_SIZE = 8
+
+# Default limits for concurrent batch downloads
+MAX_WORKERS = 4
+PER_HOST_LIMIT = 2
+
+# Download queue daemon defaults
+QUEUE_PATH = os.environ.get(
+    "VIDEO_DOWNLOAD_QUEUE", str(Path.home() / ".cache" / "video-download" / "queue.db")
+)
+QUEUE_HOST = "127.0.0.1"
+QUEUE_PORT = 8431
+QUEUE_URL = f"http://{QUEUE_HOST}:{QUEUE_PORT}"
+# Shared secret for the HTTP API, sent as the X-Queue-Token header. Unless
+# VIDEO_DOWNLOAD_QUEUE_TOKEN is set, serve_queue writes a random one to
+# QUEUE_TOKEN_PATH (mode 0600) and the client functions read it from there.
+QUEUE_TOKEN = os.environ.get("VIDEO_DOWNLOAD_QUEUE_TOKEN")
+QUEUE_TOKEN_PATH = str(Path(QUEUE_PATH).with_suffix(".token"))
+# Directory that jobs submitted over HTTP must write under (default: the
+# daemon's working directory)
+QUEUE_OUTPUT_ROOT = os.environ.get("VIDEO_DOWNLOAD_QUEUE_ROOT", ".")
+# Options that jobs submitted over HTTP may set, per kind. Anything else
+# (--exec, --paths, -o, ...) could run commands or write anywhere.
+QUEUE_OPTIONS = {
+    "video": {"format", "limit_rate", "write_subs", "write_auto_subs", "sub_langs", "embed_subs", "embed_thumbnail"},
+    "audio": {"audio_format", "audio_quality", "embed_thumbnail"},
+}
+
+# Default number of yt-dlp processes for batched metadata extraction
+INFO_BATCH_PROCESSES = 2
+
+
+@dataclass
+class DownloadResult:
+    """Outcome of a single download in a batch."""
+    url: str
+    success: bool
+    returncode: int
+    elapsed: float
+    bytes: int = 0
+    files: List[str] = field(default_factory=list)
+    stdout: str = ""
+    stderr: str = ""
+
+    def to_process(self) -> subprocess.CompletedProcess:
+        """Return the result as a subprocess.CompletedProcess."""
+        return subprocess.CompletedProcess(
+            args=[YT_DLP, self.url],
+            returncode=self.returncode,
+            stdout=self.stdout,
+            stderr=self.stderr,
+        )
+
+
+def _extra_args(options: Dict[str, Any]) -> List[str]:
+    """Convert keyword options into yt-dlp command line flags."""
+    args = []
+    for key, value in options.items():
+        key_arg = f"--{key.replace('_', '-')}"
+        if isinstance(value, bool):
+            if value:
+                args.append(key_arg)
+        elif isinstance(value, list):
+            for item in value:
+                args.extend([key_arg, str(item)])
+        else:
+            args.extend([key_arg, str(value)])
+    return args
+
+
+def _with_print(options: Dict[str, Any], template: str) -> Dict[str, Any]:
+    """``options`` with ``template`` added to any --print templates already in them."""
+    printed = options.get("print")
+    printed = [] if printed is None else list(printed) if isinstance(printed, list) else [printed]
+    if template not in printed:
+        printed.append(template)
+    return {**options, "print": printed}
+
+
+def _host_key(url: str) -> str:
+    """Host used for per-site concurrency limits."""
+    host = (urllib.parse.urlparse(url).hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return host
+
+
+# Query parameters that never change which video a URL points to
+_TRACKING_PARAMS = {"feature", "si", "pp", "ab_channel", "fbclid", "gclid"}
+
+_YOUTUBE_HOSTS = {"youtube.com", "m.youtube.com", "music.youtube.com", "youtube-nocookie.com"}
+
+
+def normalize_video_id(url: str) -> str:
+    """Return a stable cache key for a video URL.
+    
+    YouTube URLs in any of their forms (watch, youtu.be, shorts, embed,
+    live) map to ``youtube:<id>``. Other URLs are normalized by dropping
+    the fragment, tracking parameters and trailing slashes.
+    
+    Example:
+        normalize_video_id("https://youtu.be/dQw4w9WgXcQ?si=x")  # "youtube:dQw4w9WgXcQ"
+    """
+    parsed = urllib.parse.urlparse(url.strip())
+    host = _host_key(url)
+    query = urllib.parse.parse_qs(parsed.query)
+    
+    if host in _YOUTUBE_HOSTS:
+        if "v" in query:
+            return f"youtube:{query['v'][0]}"
+        parts = [p for p in parsed.path.split("/") if p]
+        if len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v"):
+            return f"youtube:{parts[1]}"
+    elif host == "youtu.be":
+        video_id = parsed.path.strip("/").split("/")[0]
+        if video_id:
+            return f"youtube:{video_id}"
+    
+    params = sorted(
+        (k, v) for k, values in query.items()
+        if k not in _TRACKING_PARAMS and not k.startswith("utm_")
+        for v in values
+    )
+    path = parsed.path.rstrip("/") or "/"
+    normalized = f"{host}{path}"
+    if params:
+        normalized += "?" + urllib.parse.urlencode(params)
+    return f"url:{normalized}"
+
+
+class MetadataCache:
+    """On-disk SQLite cache for yt-dlp metadata with TTL and LRU eviction.
+    
+    Entries are keyed by normalize_video_id(url) and a kind ("info" for
+    --dump-json output, "formats" for -F output). Reads refresh an entry's
+    LRU position; once more than ``max_entries`` are stored, the least
+    recently used ones are dropped.
+    """
+    
+    def __init__(
+        self,
+        path: str = CACHE_PATH,
+        ttl: float = CACHE_TTL,
+        max_entries: int = CACHE_MAX_ENTRIES
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS metadata (
+                key TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL,
+                PRIMARY KEY (key, kind)
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS metadata_accessed ON metadata (accessed)")
+        self._db.commit()
+    
+    def get(self, url: str, kind: str = "info", count: bool = True) -> Optional[str]:
+        """Return the cached value for a URL, or None on miss or expiry.
+        
+        ``count=False`` leaves the hit/miss counters alone, for secondary
+        lookups made on behalf of a call that was already counted.
+        """
+        key = normalize_video_id(url)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, created FROM metadata WHERE key = ? AND kind = ?", (key, kind)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self._db.execute("DELETE FROM metadata WHERE key = ? AND kind = ?", (key, kind))
+                    self._db.commit()
+                self.misses += count
+                return None
+            self._db.execute(
+                "UPDATE metadata SET accessed = ? WHERE key = ? AND kind = ?", (now, key, kind)
+            )
+            self._db.commit()
+            self.hits += count
+            return row[0]
+    
+    def put(self, url: str, value: str, kind: str = "info") -> None:
+        """Store a value for a URL and evict least recently used entries."""
+        key = normalize_video_id(url)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO metadata (key, kind, value, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, value, now, now)
+            )
+            self._db.execute(
+                """DELETE FROM metadata WHERE rowid IN (
+                    SELECT rowid FROM metadata ORDER BY accessed DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,)
+            )
+            self._db.commit()
+    
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._db.execute("DELETE FROM metadata")
+            self._db.commit()
+            self.hits = 0
+            self.misses = 0
+    
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the number of stored entries."""
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+
+# Cache used by get_video_info/list_formats when no cache is passed.
+# Disabled unless enable_metadata_cache() is called or VIDEO_DOWNLOAD_CACHE is set.
+METADATA_CACHE: Optional[MetadataCache] = (
+    MetadataCache(CACHE_PATH) if os.environ.get("VIDEO_DOWNLOAD_CACHE") else None
+)
+
+
+def enable_metadata_cache(
+    path: str = CACHE_PATH,
+    ttl: float = CACHE_TTL,
+    max_entries: int = CACHE_MAX_ENTRIES
+) -> MetadataCache:
+    """Turn on the module-wide metadata cache and return it."""
+    global METADATA_CACHE
+    METADATA_CACHE = MetadataCache(path, ttl=ttl, max_entries=max_entries)
+    return METADATA_CACHE
+
+
+def _load_cached_info(
+    cmd: List[str], url: str, cache: Optional[MetadataCache], count: bool = True
+) -> Optional[str]:
+    """Swap ``url`` in ``cmd`` for --load-info-json using cached metadata.
+    
+    ``count`` is passed to MetadataCache.get. Returns the temporary info
+    file path (caller removes it), or None if there is no cached info for
+    the URL.
+    """
+    info = cache.get(url, count=count) if cache else None
+    if info is None:
+        return None
+    fd, info_path = tempfile.mkstemp(suffix=".info.json")
+    with os.fdopen(fd, "w") as f:
+        f.write(info)
+    cmd[cmd.index(url):cmd.index(url) + 1] = ["--load-info-json", info_path]
+    return info_path
+
+
+def _sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ioctl request number for FICLONE (reflink) on Linux
+_FICLONE = 0x40049409
+
+
+def _clone_file(src: str, dest: str) -> str:
+    """Create ``dest`` sharing data with ``src``: hardlink, reflink, then copy.
+    
+    Returns the method used ("hardlink", "reflink" or "copy").
+    """
+    try:
+        os.link(src, dest)
+        return "hardlink"
+    except OSError:
+        pass
+    try:
+        import fcntl
+        with open(src, "rb") as fsrc, open(dest, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        return "reflink"
+    except (ImportError, OSError):
+        if os.path.exists(dest):
+            os.unlink(dest)
+    shutil.copy2(src, dest)
+    return "copy"
+
+
+class ContentStore:
+    """Content-addressed media store with hardlinked output paths.
+    
+    Each distinct file is kept once under ``root/objects`` by SHA-256.
+    Requested output paths are hardlinks (or reflinks, or copies across
+    filesystems) to the stored object. An SQLite index maps objects to
+    the video and variant they came from, and tracks every linked path.
+    
+    Hardlinks share one inode: editing a linked file in place changes it
+    for every project that links it.
+    """
+    
+    def __init__(self, root: str):
+        self.root = Path(root)
+        (self.root / "objects").mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.root / "index.db"), check_same_thread=False)
+        self._db.executescript(
+            """CREATE TABLE IF NOT EXISTS objects (
+                sha256 TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                filename TEXT NOT NULL,
+                video_key TEXT,
+                variant TEXT,
+                source_url TEXT,
+                created REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS objects_video ON objects (video_key, variant);
+            CREATE TABLE IF NOT EXISTS links (
+                path TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL REFERENCES objects (sha256)
+            );
+            CREATE INDEX IF NOT EXISTS links_sha256 ON links (sha256);"""
+        )
+        self._db.commit()
+    
+    def object_path(self, sha256: str) -> Path:
+        """Path of a stored object."""
+        return self.root / "objects" / sha256[:2] / sha256[2:]
+    
+    def add(self, path: str, url: Optional[str] = None, variant: Optional[str] = None) -> str:
+        """Move a downloaded file into the store and link it back in place.
+        
+        If identical content is already stored, the file is replaced by a
+        link to the existing object and its disk space is freed.
+        
+        Args:
+            path: Downloaded file
+            url: Source URL, used to find the object again by video ID
+            variant: What was downloaded (e.g. format string)
+            
+        Returns:
+            SHA-256 of the content
+        """
+        sha256 = _sha256(path)
+        obj = self.object_path(sha256)
+        obj.parent.mkdir(exist_ok=True)
+        
+        with self._lock:
+            if not obj.exists():
+                _clone_file(path, str(obj))
+            elif not os.path.samefile(path, obj):
+                # Duplicate content: replace the new file with a link
+                tmp = f"{path}.cas-tmp"
+                _clone_file(str(obj), tmp)
+                os.replace(tmp, path)
+            self._db.execute(
+                """INSERT OR IGNORE INTO objects
+                (sha256, size, filename, video_key, variant, source_url, created)
+                VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (sha256, obj.stat().st_size, Path(path).name,
+                 normalize_video_id(url) if url else None, variant, url, time.time())
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO links (path, sha256) VALUES (?, ?)",
+                (str(Path(path).resolve()), sha256)
+            )
+            self._db.commit()
+        return sha256
+    
+    def find(self, url: str, variant: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Find a stored object for a video URL (and variant, if given)."""
+        sql = "SELECT sha256, size, filename, variant, source_url FROM objects WHERE video_key = ?"
+        params: List[Any] = [normalize_video_id(url)]
+        if variant is not None:
+            sql += " AND variant = ?"
+            params.append(variant)
+        with self._lock:
+            row = self._db.execute(sql + " ORDER BY created DESC LIMIT 1", params).fetchone()
+        if row is None or not self.object_path(row[0]).exists():
+            return None
+        return dict(zip(("sha256", "size", "filename", "variant", "source_url"), row))
+    
+    def link(self, sha256: str, dest: str) -> str:
+        """Materialize a stored object at ``dest`` and record the link."""
+        dest_path = Path(dest)
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = f"{dest}.cas-tmp"
+        _clone_file(str(self.object_path(sha256)), tmp)
+        os.replace(tmp, dest)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO links (path, sha256) VALUES (?, ?)",
+                (str(dest_path.resolve()), sha256)
+            )
+            self._db.commit()
+        return str(dest_path)
+    
+    def query(self, url: Optional[str] = None) -> List[Dict[str, Any]]:
+        """List stored objects with their linked paths.
+        
+        Args:
+            url: Only return objects for this video
+        """
+        sql = "SELECT sha256, size, filename, video_key, variant, source_url, created FROM objects"
+        params: List[Any] = []
+        if url:
+            sql += " WHERE video_key = ?"
+            params.append(normalize_video_id(url))
+        with self._lock:
+            rows = self._db.execute(sql + " ORDER BY created", params).fetchall()
+            objects = []
+            for row in rows:
+                obj = dict(zip(("sha256", "size", "filename", "video_key", "variant", "source_url", "created"), row))
+                obj["paths"] = [p for (p,) in self._db.execute(
+                    "SELECT path FROM links WHERE sha256 = ?", (obj["sha256"],)
+                )]
+                objects.append(obj)
+        return objects
+    
+    def gc(self, dry_run: bool = False) -> Dict[str, int]:
+        """Drop stale links and delete objects nothing links to anymore.
+        
+        A link is stale when its path is gone or no longer points at the
+        stored content. Copies made across filesystems keep their objects
+        alive as long as the copy exists.
+        
+        Returns:
+            Dict with 'links_removed', 'objects_removed' and 'bytes_freed'
+        """
+        stats = {"links_removed": 0, "objects_removed": 0, "bytes_freed": 0}
+        with self._lock:
+            live = set()
+            for path, sha256 in self._db.execute("SELECT path, sha256 FROM links").fetchall():
+                obj = self.object_path(sha256)
+                try:
+                    alive = obj.exists() and (
+                        os.path.samefile(path, obj) or os.path.getsize(path) == obj.stat().st_size
+                    )
+                except OSError:
+                    alive = False
+                if alive:
+                    live.add(sha256)
+                else:
+                    stats["links_removed"] += 1
+                    if not dry_run:
+                        self._db.execute("DELETE FROM links WHERE path = ?", (path,))
+            
+            for sha256, size in self._db.execute("SELECT sha256, size FROM objects").fetchall():
+                if sha256 in live:
+                    continue
+                stats["objects_removed"] += 1
+                stats["bytes_freed"] += size
+                if not dry_run:
+                    self.object_path(sha256).unlink(missing_ok=True)
+                    self._db.execute("DELETE FROM objects WHERE sha256 = ?", (sha256,))
+            if not dry_run:
+                self._db.commit()
+        return stats
+
+
+# Store used by download_video/download_audio when no store is passed
+CONTENT_STORE: Optional[ContentStore] = ContentStore(STORE_PATH) if STORE_PATH else None
+
+
+# download_video options that don't change the file produced; every other
+# option is part of the content-store variant key
+_STORE_NEUTRAL_OPTIONS = {
+    "print", "quiet", "no_warnings", "verbose", "newline", "progress", "no_progress",
+    "limit_rate", "retries", "fragment_retries", "socket_timeout", "concurrent_fragments",
+    "force_overwrites", "no_part",
+}
+
+# download_video's default output template; the store only keeps file names,
+# so downloads with any other template bypass it
+DEFAULT_OUTPUT_TEMPLATE = "%(title)s.%(ext)s"
+
+
+def _video_variant(format: str, options: Dict[str, Any]) -> str:
+    """Content-store variant key for a download_video call."""
+    variant = f"video:{format}"
+    relevant = {k: v for k, v in options.items() if k not in _STORE_NEUTRAL_OPTIONS}
+    return f"{variant}:{json.dumps(relevant, sort_keys=True)}" if relevant else variant
+
+
+def _from_store(
+    store: Optional[ContentStore], url: str, variant: str, output_dir: str
+) -> Optional[subprocess.CompletedProcess]:
+    """Link an already stored download into ``output_dir`` instead of fetching it."""
+    found = store.find(url, variant) if store else None
+    if found is None:
+        return None
+    path = store.link(found["sha256"], str(Path(output_dir) / found["filename"]))
+    return subprocess.CompletedProcess(args=[YT_DLP, url], returncode=0, stdout=path + "\n", stderr="")
+
+
+def _into_store(
+    store: ContentStore, result: subprocess.CompletedProcess, url: str, variant: str
+) -> None:
+    """Move the files a download produced into the store."""
+    if result.returncode != 0:
+        return
+    for line in result.stdout.splitlines():
+        if line and Path(line).is_file():
+            store.add(line, url=url, variant=variant)
+
+
+class SubprocessEngine:
+    """Run every yt-dlp operation as a separate process."""
+    
+    name = "subprocess"
+    
+    def run(self, cmd: List[str], progress_hook: Optional[Callable] = None) -> subprocess.CompletedProcess:
+        """Run a yt-dlp command line. ``progress_hook`` is not supported here."""
+        return subprocess.run(cmd, capture_output=True, text=True)
+    
+    def info_json(self, url: str) -> str:
+        """Return the --dump-json output for a URL."""
+        cmd = [YT_DLP, "--dump-json", "--no-download", url]
+        return subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+
+
+class _CaptureLogger:
+    """YoutubeDL logger that collects output for one call at a time."""
+    
+    def __init__(self, quiet: bool = False):
+        self.quiet = quiet
+        self.stdout: List[str] = []
+        self.stderr: List[str] = []
+    
+    def reset(self) -> None:
+        self.stdout, self.stderr = [], []
+    
+    def debug(self, msg: str) -> None:
+        # YoutubeDL routes to_screen here; honour --quiet like the CLI does
+        if not self.quiet and not msg.startswith("[debug] "):
+            self.stdout.append(msg)
+    
+    def info(self, msg: str) -> None:
+        if not self.quiet:
+            self.stdout.append(msg)
+    
+    def warning(self, msg: str) -> None:
+        self.stderr.append(msg)
+    
+    def error(self, msg: str) -> None:
+        self.stderr.append(msg)
+    
+    def print(self, msg: str) -> None:
+        # --print and --dump-json output goes to stdout even under --quiet
+        self.stdout.append(msg)
+
+
+class LibraryEngine:
+    """Run yt-dlp in-process, keeping warm YoutubeDL instances per option set.
+    
+    Command lines are parsed with yt_dlp.parse_options, so every function
+    in this module behaves the same under both engines. Instances are
+    pooled by their option arguments and reused across calls, which skips
+    interpreter startup and extractor imports, and keeps cookies and
+    extractor caches warm. A YoutubeDL instance is used by one call at a
+    time; concurrent calls with the same options get separate instances.
+    """
+    
+    name = "library"
+    
+    def __init__(self, pool_size: int = LIBRARY_POOL_SIZE):
+        try:
+            import yt_dlp
+        except ImportError as e:
+            raise ImportError("The library engine requires the yt-dlp package: pip install yt-dlp") from e
+        self._yt_dlp = yt_dlp
+        
+        class CapturingYoutubeDL(yt_dlp.YoutubeDL):
+            # to_stdout (--print, --dump-json, format tables) bypasses the logger
+            def to_stdout(self, message, *args, **kwargs):
+                self.params["logger"].print(message)
+        
+        self._ydl_class = CapturingYoutubeDL
+        self.pool_size = pool_size
+        self._idle: "OrderedDict[tuple, List[tuple]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def _acquire(self, args: tuple, ydl_opts: Dict[str, Any]) -> tuple:
+        with self._lock:
+            idle = self._idle.get(args)
+            if idle:
+                self._idle.move_to_end(args)
+                return idle.pop()
+        
+        logger = _CaptureLogger(quiet=bool(ydl_opts.get("quiet")))
+        state: Dict[str, Optional[Callable]] = {"hook": None}
+        
+        def dispatch(progress: Dict[str, Any]) -> None:
+            if state["hook"]:
+                state["hook"](progress)
+        
+        ydl = self._ydl_class({**ydl_opts, "logger": logger, "progress_hooks": [dispatch]})
+        return ydl, logger, state
+    
+    def _release(self, args: tuple, entry: tuple) -> None:
+        with self._lock:
+            self._idle.setdefault(args, []).append(entry)
+            self._idle.move_to_end(args)
+            # Drop the least recently used instances beyond the pool size
+            while sum(len(v) for v in self._idle.values()) > self.pool_size:
+                oldest = next(iter(self._idle))
+                self._idle[oldest].pop(0)
+                if not self._idle[oldest]:
+                    del self._idle[oldest]
+    
+    def run(self, cmd: List[str], progress_hook: Optional[Callable] = None) -> subprocess.CompletedProcess:
+        """Run a yt-dlp command line in-process.
+        
+        Args:
+            cmd: Command line as built for the subprocess engine
+            progress_hook: Called directly with yt-dlp progress dicts
+            
+        Returns:
+            subprocess.CompletedProcess with captured output
+        """
+        parsed = self._yt_dlp.parse_options(cmd[1:])
+        urls = list(parsed.urls)
+        args = tuple(a for a in cmd[1:] if a not in urls)
+        ydl, logger, state = self._acquire(args, parsed.ydl_opts)
+        logger.reset()
+        state["hook"] = progress_hook
+        try:
+            if parsed.options.load_info_filename is not None:
+                returncode = ydl.download_with_info_file(parsed.options.load_info_filename)
+            else:
+                returncode = ydl.download(urls)
+        except Exception as e:
+            logger.error(f"ERROR: {e}")
+            returncode = 1
+        finally:
+            state["hook"] = None
+        stdout = "".join(line + "\n" for line in logger.stdout)
+        stderr = "\n".join(logger.stderr) + ("\n" if logger.stderr else "")
+        # YoutubeDL keeps an error return code for the rest of its life,
+        # so an instance that failed once is not reused
+        if returncode == 0:
+            self._release(args, (ydl, logger, state))
+        return subprocess.CompletedProcess(args=cmd, returncode=returncode, stdout=stdout, stderr=stderr)
+    
+    def info_json(self, url: str) -> str:
+        """Return the same JSON that --dump-json would print for a URL."""
+        cmd = [YT_DLP, "--no-download", "--quiet", "--no-warnings", url]
+        parsed = self._yt_dlp.parse_options(cmd[1:])
+        args = tuple(cmd[1:-1])
+        ydl, logger, state = self._acquire(args, parsed.ydl_opts)
+        logger.reset()
+        try:
+            info = ydl.extract_info(url, download=False)
+        except self._yt_dlp.utils.DownloadError as e:
+            raise subprocess.CalledProcessError(1, cmd, stderr=str(e)) from e
+        self._release(args, (ydl, logger, state))
+        return json.dumps(ydl.sanitize_info(info))
+
+
+_ENGINES: Dict[str, Any] = {}
+
+
+def get_engine(name: Optional[str] = None) -> Any:
+    """Return the engine instance for ``name`` (defaults to ENGINE)."""
+    name = name or ENGINE
+    if name not in _ENGINES:
+        if name == "subprocess":
+            _ENGINES[name] = SubprocessEngine()
+        elif name == "library":
+            _ENGINES[name] = LibraryEngine()
+        else:
+            raise ValueError(f"Unknown engine: {name!r} (expected 'subprocess' or 'library')")
+    return _ENGINES[name]
+
+
+def set_engine(name: str) -> None:
+    """Select the engine used by the download and info functions.
+    
+    Args:
+        name: "subprocess" (default) or "library"
+    """
+    global ENGINE
+    get_engine(name)
+    ENGINE = name
+
+
+def _video_cmd(
     url: str,
     output_dir: str = ".",
     output_template: str = "%(title)s.%(ext)s",
     format: str = "bestvideo+bestaudio",
     **kwargs
+) -> List[str]:
+    """Build the yt-dlp command line for download_video."""
+    output_path = str(Path(output_dir) / output_template)
+    
+    cmd = [
+        YT_DLP,
+        "-f", format,
+        "-o", output_path,
+        url
+    ]
+    
+    # Add extra options
+    cmd.extend(_extra_args(kwargs))
+    return cmd
+
+
+def download_video(
+    url: str,
+    output_dir: str = ".",
+    output_template: str = DEFAULT_OUTPUT_TEMPLATE,
+    format: str = "bestvideo+bestaudio",
+    use_cached_info: bool = False,
+    cache: Optional[MetadataCache] = None,
+    progress_hook: Optional[Callable[[Dict[str, Any]], None]] = None,
+    store: Optional[ContentStore] = None,
+    **kwargs
 ) -> subprocess.CompletedProcess:
     """Download a video with yt-dlp.
     
@@ -24,6 +776,14 @@ def download_video(
         output_dir: Download directory
         output_template: Output filename template
         format: Quality format string
+        use_cached_info: Reuse cached info JSON via --load-info-json so the
+            extractor does not run again
+        cache: Metadata cache (defaults to METADATA_CACHE)
+        progress_hook: Callback for yt-dlp progress dicts (library engine only)
+        store: Content store (defaults to CONTENT_STORE); media already in
+            the store with the same format and options is linked into
+            output_dir instead of downloaded. Not used with a custom
+            output_template.
         **kwargs: Additional yt-dlp options
         
     Returns:
@@ -36,28 +796,52 @@ def download_video(
             format="bestvideo[height<=1080]+bestaudio"
         )
     """
-    output_path = str(Path(output_dir) / output_template)
+    store = store or CONTENT_STORE
+    if output_template != DEFAULT_OUTPUT_TEMPLATE:
+        store = None
+    variant = _video_variant(format, kwargs)
+    if store:
+        stored = _from_store(store, url, variant, output_dir)
+        if stored:
+            return stored
+        # Final file paths are needed to move the result into the store
+        kwargs = _with_print(kwargs, "after_move:filepath")
+    
+    cmd = _video_cmd(url, output_dir, output_template, format, **kwargs)
+    info_path = _load_cached_info(cmd, url, cache or METADATA_CACHE) if use_cached_info else None
+    try:
+        result = get_engine().run(cmd, progress_hook=progress_hook)
+    finally:
+        if info_path:
+            os.unlink(info_path)
+    
+    if store:
+        _into_store(store, result, url, variant)
+    return result
+
+
+def _audio_cmd(
+    url: str,
+    output_dir: str = ".",
+    audio_format: str = "mp3",
+    audio_quality: int = 0,
+    embed_thumbnail: bool = True
+) -> List[str]:
+    """Build the yt-dlp command line for download_audio."""
+    output_path = str(Path(output_dir) / f"%(title)s.{audio_format}")
     
     cmd = [
         YT_DLP,
-        "-f", format,
+        "-x",
+        "--audio-format", audio_format,
+        "--audio-quality", str(audio_quality),
         "-o", output_path,
         url
     ]
     
-    # Add extra options
-    for key, value in kwargs.items():
-        key_arg = f"--{key.replace('_', '-')}"
-        if isinstance(value, bool):
-            if value:
-                cmd.append(key_arg)
-        elif isinstance(value, list):
-            for item in value:
-                cmd.extend([key_arg, str(item)])
-        else:
-            cmd.extend([key_arg, str(value)])
-    
-    return subprocess.run(cmd, capture_output=True, text=True)
+    if embed_thumbnail:
+        cmd.append("--embed-thumbnail")
+    return cmd
 
 
 def download_audio(
@@ -65,7 +849,9 @@ def download_audio(
     output_dir: str = ".",
     audio_format: str = "mp3",
     audio_quality: int = 0,
-    embed_thumbnail: bool = True
+    embed_thumbnail: bool = True,
+    progress_hook: Optional[Callable[[Dict[str, Any]], None]] = None,
+    store: Optional[ContentStore] = None
 ) -> subprocess.CompletedProcess:
     """Download and extract audio from a video.
     
@@ -75,25 +861,26 @@ def download_audio(
         audio_format: Output format (mp3, m4a, opus, etc.)
         audio_quality: Quality (0=best, 9=worst)
         embed_thumbnail: Embed thumbnail in audio file
+        progress_hook: Callback for yt-dlp progress dicts (library engine only)
+        store: Content store (defaults to CONTENT_STORE)
         
     Returns:
         subprocess.CompletedProcess
     """
-    output_path = str(Path(output_dir) / f"%(title)s.{audio_format}")
+    store = store or CONTENT_STORE
+    variant = f"audio:{audio_format}:{audio_quality}" + ("" if embed_thumbnail else ":no-thumbnail")
+    stored = _from_store(store, url, variant, output_dir)
+    if stored:
+        return stored
     
-    cmd = [
-        YT_DLP,
-        "-x",
-        "--audio-format", audio_format,
-        "--audio-quality", str(audio_quality),
-        "-o", output_path,
-        url
-    ]
+    cmd = _audio_cmd(url, output_dir, audio_format, audio_quality, embed_thumbnail)
+    if store:
+        cmd.extend(["--print", "after_move:filepath"])
     
-    if embed_thumbnail:
-        cmd.append("--embed-thumbnail")
-    
-    return subprocess.run(cmd, capture_output=True, text=True)
+    result = get_engine().run(cmd, progress_hook=progress_hook)
+    if store:
+        _into_store(store, result, url, variant)
+    return result
 
 
 def download_playlist(
@@ -101,7 +888,8 @@ def download_playlist(
     output_dir: str = ".",
     playlist_items: Optional[str] = None,
     format: str = "bestvideo+bestaudio",
-    archive_file: Optional[str] = None
+    archive_file: Optional[str] = None,
+    progress_hook: Optional[Callable[[Dict[str, Any]], None]] = None
 ) -> subprocess.CompletedProcess:
     """Download playlist with optional filtering.
     
@@ -111,6 +899,7 @@ def download_playlist(
         playlist_items: Item range (e.g., "1-10", "1,3,5")
         format: Quality format string
         archive_file: Archive file to skip already downloaded videos
+        progress_hook: Callback for yt-dlp progress dicts (library engine only)
         
     Returns:
         subprocess.CompletedProcess
@@ -130,14 +919,15 @@ def download_playlist(
     if archive_file:
         cmd.extend(["--download-archive", archive_file])
     
-    return subprocess.run(cmd, capture_output=True, text=True)
+    return get_engine().run(cmd, progress_hook=progress_hook)
 
 
-def get_video_info(url: str) -> Dict[str, Any]:
+def get_video_info(url: str, cache: Optional[MetadataCache] = None) -> Dict[str, Any]:
     """Get video metadata without downloading.
     
     Args:
         url: Video URL
+        cache: Metadata cache (defaults to METADATA_CACHE)
         
     Returns:
         Dict with video metadata
@@ -148,45 +938,306 @@ def get_video_info(url: str) -> Dict[str, Any]:
         print(f"Duration: {info['duration']}s")
         print(f"Uploader: {info['uploader']}")
     """
-    cmd = [YT_DLP, "--dump-json", "--no-download", url]
-    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-    return json.loads(result.stdout)
+    cache = cache or METADATA_CACHE
+    cached = cache.get(url) if cache else None
+    if cached is not None:
+        return json.loads(cached)
+    
+    info = get_engine().info_json(url)
+    if cache:
+        cache.put(url, info)
+    return json.loads(info)
 
 
-def list_formats(url: str) -> str:
+def list_formats(url: str, cache: Optional[MetadataCache] = None) -> str:
     """List available formats for a video.
     
     Args:
         url: Video URL
+        cache: Metadata cache (defaults to METADATA_CACHE)
         
     Returns:
         Formatted list of available formats
     """
+    cache = cache or METADATA_CACHE
+    cached = cache.get(url, kind="formats") if cache else None
+    if cached is not None:
+        return cached
+    
     cmd = [YT_DLP, "-F", url]
-    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    # Reuse cached info JSON so listing formats needs no extractor run;
+    # the "formats" lookup above already counted this call
+    info_path = _load_cached_info(cmd, url, cache, count=False)
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    finally:
+        if info_path:
+            os.unlink(info_path)
+    if cache:
+        cache.put(url, result.stdout, kind="formats")
     return result.stdout
 
 
+@dataclass
+class InfoResult:
+    """Metadata lookup result for one URL of a batch."""
+    url: str
+    info: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    
+    @property
+    def ok(self) -> bool:
+        return self.info is not None
+
+
+def _info_error(url: str, errors: List[str]) -> Optional[str]:
+    """The ERROR line yt-dlp printed for ``url``, if one names it.
+    
+    YouTube errors are matched by the "[youtube] <id>:" prefix, other URLs
+    only by the URL itself, since their extractor ids vary.
+    """
+    key = normalize_video_id(url)
+    if key.startswith("youtube:"):
+        video_id = key.split(":", 1)[1]
+        return next((e for e in errors if f"] {video_id}:" in e or url in e), None)
+    return next((e for e in errors if url in e), None)
+
+
+def _run_info_batch(urls: List[str], results: "queue.Queue[Optional[InfoResult]]") -> None:
+    """Extract metadata for ``urls`` with a single yt-dlp process.
+    
+    Puts one InfoResult per input URL on ``results``, followed by None.
+    """
+    fd, batch_path = tempfile.mkstemp(suffix=".urls.txt")
+    with os.fdopen(fd, "w") as f:
+        f.write("\n".join(urls) + "\n")
+    
+    unmatched = list(urls)
+    errors: List[str] = []
+    failure: Optional[str] = None
+    proc: Optional[subprocess.Popen] = None
+    stderr_thread: Optional[threading.Thread] = None
+    try:
+        cmd = [YT_DLP, "--dump-json", "--no-download", "--ignore-errors", "--batch-file", batch_path]
+        proc = subprocess.Popen(
+            cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
+        
+        def drain_stderr() -> None:
+            for line in proc.stderr:
+                if line.startswith("ERROR:"):
+                    errors.append(line.strip())
+        
+        stderr_thread = threading.Thread(target=drain_stderr, daemon=True)
+        stderr_thread.start()
+        
+        for line in proc.stdout:
+            if not line.strip():
+                continue
+            info = json.loads(line)
+            # yt-dlp keeps the input URL in original_url; fall back to input
+            # order, which --ignore-errors preserves for successful items
+            original = info.get("original_url") or info.get("webpage_url") or ""
+            key = normalize_video_id(original) if original else None
+            url = next((u for u in unmatched if u == original), None)
+            if url is None and key:
+                url = next((u for u in unmatched if normalize_video_id(u) == key), None)
+            if url is None and unmatched:
+                url = unmatched[0]
+            if url is None:
+                continue
+            unmatched.remove(url)
+            results.put(InfoResult(url=url, info=info))
+        proc.wait()
+    except Exception as e:
+        failure = str(e)
+    finally:
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        if stderr_thread is not None:
+            stderr_thread.join()
+        os.unlink(batch_path)
+    
+    for url in unmatched:
+        results.put(InfoResult(url=url, error=_info_error(url, errors) or failure or "No metadata returned"))
+    results.put(None)
+
+
+def get_video_info_batch(
+    urls: List[str],
+    processes: int = INFO_BATCH_PROCESSES,
+    cache: Optional[MetadataCache] = None
+) -> Iterator[InfoResult]:
+    """Get metadata for many URLs using a few long-lived yt-dlp processes.
+    
+    URLs are split across ``processes`` yt-dlp runs, each fed a batch file
+    with --dump-json, so interpreter startup and extractor imports are
+    paid once per process instead of once per URL. Results are yielded as
+    soon as each JSON line arrives, so their order may differ from
+    ``urls``. Cache hits are yielded first without running yt-dlp.
+    
+    Args:
+        urls: List of video URLs (single videos, not playlists)
+        processes: Number of yt-dlp processes to run in parallel
+        cache: Metadata cache (defaults to METADATA_CACHE)
+        
+    Yields:
+        InfoResult per input URL, with either ``info`` or ``error`` set
+        
+    Example:
+        for r in get_video_info_batch(urls, processes=4):
+            if r.ok:
+                print(r.url, r.info["title"])
+            else:
+                print(r.url, "failed:", r.error)
+    """
+    cache = cache or METADATA_CACHE
+    misses = []
+    for url in urls:
+        cached = cache.get(url) if cache else None
+        if cached is not None:
+            yield InfoResult(url=url, info=json.loads(cached))
+        else:
+            misses.append(url)
+    if not misses:
+        return
+    
+    processes = max(1, min(processes, len(misses)))
+    chunk_size = -(-len(misses) // processes)
+    chunks = [misses[i:i + chunk_size] for i in range(0, len(misses), chunk_size)]
+    
+    results: "queue.Queue[Optional[InfoResult]]" = queue.Queue()
+    for chunk in chunks:
+        threading.Thread(target=_run_info_batch, args=(chunk, results), daemon=True).start()
+    
+    remaining = len(chunks)
+    while remaining:
+        result = results.get()
+        if result is None:
+            remaining -= 1
+            continue
+        if cache and result.ok:
+            cache.put(result.url, json.dumps(result.info))
+        yield result
+
+
+def _download_one(url: str, output_dir: str, format: str, options: Dict[str, Any]) -> DownloadResult:
+    """Download one URL and measure what it produced."""
+    start = time.monotonic()
+    result = download_video(url, output_dir=output_dir, format=format, **_with_print(options, "after_move:filepath"))
+    elapsed = time.monotonic() - start
+    
+    # --print after_move:filepath emits one final path per downloaded file
+    files = [line for line in result.stdout.splitlines() if line and Path(line).is_file()]
+    return DownloadResult(
+        url=url,
+        success=result.returncode == 0,
+        returncode=result.returncode,
+        elapsed=elapsed,
+        bytes=sum(Path(f).stat().st_size for f in files),
+        files=files,
+        stdout=result.stdout,
+        stderr=result.stderr,
+    )
+
+
+def run_batch(
+    urls: List[str],
+    output_dir: str = ".",
+    format: str = "bestvideo+bestaudio",
+    max_workers: int = MAX_WORKERS,
+    per_host_limit: int = PER_HOST_LIMIT,
+    on_result: Optional[Callable[[DownloadResult], None]] = None,
+    **kwargs
+) -> List[DownloadResult]:
+    """Download many videos concurrently with per-host limits.
+    
+    At most ``max_workers`` downloads run at once, and at most
+    ``per_host_limit`` of them target the same site. URLs for a busy host
+    wait without blocking URLs for other hosts.
+    
+    Args:
+        urls: List of video URLs
+        output_dir: Download directory
+        format: Quality format string
+        max_workers: Global parallelism limit
+        per_host_limit: Max simultaneous downloads per host
+        on_result: Called with each DownloadResult as soon as it finishes
+        **kwargs: Additional yt-dlp options
+        
+    Returns:
+        List of DownloadResult, in the same order as ``urls``
+        
+    Example:
+        results = run_batch(urls, output_dir="/downloads", max_workers=8)
+        failed = [r.url for r in results if not r.success]
+    """
+    max_workers = max(1, max_workers)
+    per_host_limit = max(1, per_host_limit)
+    
+    results: List[Optional[DownloadResult]] = [None] * len(urls)
+    pending = list(enumerate(urls))
+    active_per_host: Dict[str, int] = {}
+    running = {}
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            # Start every pending URL whose host still has a free slot
+            waiting = []
+            for index, url in pending:
+                host = _host_key(url)
+                if len(running) < max_workers and active_per_host.get(host, 0) < per_host_limit:
+                    active_per_host[host] = active_per_host.get(host, 0) + 1
+                    future = pool.submit(_download_one, url, output_dir, format, kwargs)
+                    running[future] = (index, url, host)
+                else:
+                    waiting.append((index, url))
+            pending = waiting
+            
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, url, host = running.pop(future)
+                active_per_host[host] -= 1
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    results[index] = DownloadResult(
+                        url=url, success=False, returncode=-1, elapsed=0.0, stderr=str(e)
+                    )
+                if on_result:
+                    on_result(results[index])
+    
+    return results
+
+
 def download_batch(
     urls: List[str],
     output_dir: str = ".",
-    format: str = "bestvideo+bestaudio"
+    format: str = "bestvideo+bestaudio",
+    max_workers: int = MAX_WORKERS,
+    per_host_limit: int = PER_HOST_LIMIT
 ) -> List[subprocess.CompletedProcess]:
-    """Download multiple videos.
+    """Download multiple videos concurrently.
     
     Args:
         urls: List of video URLs
         output_dir: Download directory
         format: Quality format string
+        max_workers: Global parallelism limit
+        per_host_limit: Max simultaneous downloads per host
         
     Returns:
-        List of subprocess results
+        List of subprocess results, in the same order as ``urls``
     """
-    results = []
-    for url in urls:
-        result = download_video(url, output_dir=output_dir, format=format)
-        results.append(result)
-    return results
+    results = run_batch(
+        urls,
+        output_dir=output_dir,
+        format=format,
+        max_workers=max_workers,
+        per_host_limit=per_host_limit
+    )
+    return [r.to_process() for r in results]
 
 
 def download_with_subtitles(
@@ -222,6 +1273,1020 @@ def download_with_subtitles(
     return subprocess.run(cmd, capture_output=True, text=True)
 
 
+# Playlist sync backed by an indexed archive
+
+SYNC_OUTPUT_TEMPLATE = "%(title)s [%(id)s].%(ext)s"
+
+
+class PlaylistArchive:
+    """SQLite download archive indexed by (extractor, video ID).
+    
+    Replaces yt-dlp's flat --download-archive text file. Each entry records
+    where the file was written, its size and SHA-256, and a status:
+    "pending" (seen, not yet downloaded), "downloading", "done" or "failed".
+    Anything not "done" is picked up again by the next sync; yt-dlp's
+    .part files let interrupted downloads continue where they stopped.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS archive (
+                extractor TEXT NOT NULL,
+                video_id TEXT NOT NULL,
+                url TEXT,
+                path TEXT,
+                size INTEGER,
+                sha256 TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated REAL NOT NULL,
+                PRIMARY KEY (extractor, video_id)
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS archive_status ON archive (status)")
+        self._db.commit()
+    
+    def done(self) -> Dict[tuple, Optional[str]]:
+        """Map (extractor, video_id) to file path for completed entries."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT extractor, video_id, path FROM archive WHERE status = 'done'"
+            ).fetchall()
+        return {(extractor, video_id): path for extractor, video_id, path in rows}
+    
+    def mark(self, entries: List[tuple], status: str) -> None:
+        """Set the status of many (extractor, video_id, url) entries."""
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                """INSERT INTO archive (extractor, video_id, url, status, updated) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (extractor, video_id) DO UPDATE SET
+                    url = excluded.url, status = excluded.status, updated = excluded.updated""",
+                [(extractor, video_id, url, status, now) for extractor, video_id, url in entries]
+            )
+            self._db.commit()
+    
+    def record(
+        self,
+        extractor: str,
+        video_id: str,
+        status: str,
+        path: Optional[str] = None,
+        size: Optional[int] = None,
+        sha256: Optional[str] = None,
+        error: Optional[str] = None
+    ) -> None:
+        """Record the outcome of a download attempt."""
+        with self._lock:
+            self._db.execute(
+                """UPDATE archive SET status = ?, path = ?, size = ?, sha256 = ?, error = ?,
+                    attempts = attempts + 1, updated = ?
+                WHERE extractor = ? AND video_id = ?""",
+                (status, path, size, sha256, error, time.time(), extractor, video_id)
+            )
+            self._db.commit()
+    
+    def import_text_archive(self, archive_file: str) -> int:
+        """Import a yt-dlp --download-archive file ("<extractor> <id>" lines).
+        
+        Imported entries are marked done without a path, so they are never
+        re-downloaded. Returns the number of lines imported.
+        """
+        entries = []
+        with open(archive_file) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2:
+                    entries.append((parts[0].lower(), parts[1], None))
+        self.mark(entries, "done")
+        return len(entries)
+    
+    def stats(self) -> Dict[str, int]:
+        """Count entries per status."""
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM archive GROUP BY status").fetchall()
+        return dict(rows)
+
+
+def list_playlist_entries(url: str) -> List[Dict[str, Any]]:
+    """List a playlist's entries without resolving each video.
+    
+    Uses --flat-playlist, so a whole channel is enumerated from its
+    listing pages in one yt-dlp run.
+    
+    Returns:
+        List of flat entry dicts (``id``, ``url``, ``ie_key``, ``title``, ...)
+    """
+    cmd = [YT_DLP, "--flat-playlist", "--dump-json", url]
+    result = get_engine().run(cmd)
+    if result.returncode != 0:
+        raise subprocess.CalledProcessError(result.returncode, cmd, result.stdout, result.stderr)
+    return [json.loads(line) for line in result.stdout.splitlines() if line.startswith("{")]
+
+
+def sync_playlist(
+    url: str,
+    output_dir: str,
+    archive_db: str,
+    format: str = "bestvideo+bestaudio",
+    max_workers: int = MAX_WORKERS,
+    per_host_limit: int = PER_HOST_LIMIT,
+    **kwargs
+) -> Dict[str, Any]:
+    """Download only the new or missing entries of a playlist.
+    
+    The playlist is listed with --flat-playlist and diffed against a
+    PlaylistArchive; entries already done whose file still exists are
+    skipped without contacting the site again. The rest are downloaded in
+    parallel with run_batch and recorded (path, size, SHA-256) as each one
+    finishes, so an interrupted sync resumes with whatever is left.
+    
+    Args:
+        url: Playlist or channel URL
+        output_dir: Download directory
+        archive_db: Path to the SQLite archive
+        format: Quality format string
+        max_workers: Global parallelism limit
+        per_host_limit: Max simultaneous downloads per host
+        **kwargs: Additional yt-dlp options
+        
+    Returns:
+        Dict with 'total', 'skipped', 'downloaded' and 'failed' (list of URLs)
+        
+    Example:
+        summary = sync_playlist(
+            "https://www.youtube.com/@CHANNEL/videos",
+            output_dir="/downloads/channel",
+            archive_db="/downloads/channel/.archive.db"
+        )
+    """
+    archive = PlaylistArchive(archive_db)
+    done = archive.done()
+    
+    todo: Dict[str, tuple] = {}
+    skipped = 0
+    for entry in list_playlist_entries(url):
+        extractor = (entry.get("ie_key") or entry.get("extractor_key") or "generic").lower()
+        key = (extractor, str(entry["id"]))
+        if key in done and (done[key] is None or os.path.exists(done[key])):
+            skipped += 1
+            continue
+        entry_url = entry.get("url") or entry.get("webpage_url")
+        todo[entry_url] = (extractor, str(entry["id"]), entry_url)
+    
+    archive.mark(list(todo.values()), "downloading")
+    
+    def record(result: DownloadResult) -> None:
+        extractor, video_id, _ = todo[result.url]
+        if result.success and result.files:
+            path = result.files[-1]
+            archive.record(
+                extractor, video_id, "done",
+                path=path, size=os.path.getsize(path), sha256=_sha256(path)
+            )
+        else:
+            archive.record(extractor, video_id, "failed", error=result.stderr[-500:])
+    
+    kwargs.setdefault("output_template", SYNC_OUTPUT_TEMPLATE)
+    results = run_batch(
+        list(todo),
+        output_dir=output_dir,
+        format=format,
+        max_workers=max_workers,
+        per_host_limit=per_host_limit,
+        on_result=record,
+        **kwargs
+    )
+    
+    return {
+        "total": skipped + len(todo),
+        "skipped": skipped,
+        "downloaded": sum(1 for r in results if r.success),
+        "failed": [r.url for r in results if not r.success],
+    }
+
+
+# Streaming progress (asyncio)
+
+PROGRESS_PREFIX = "[progress]"
+
+# Machine-readable progress line; unavailable fields are rendered as "NA"
+PROGRESS_TEMPLATE = "download:" + PROGRESS_PREFIX + " " + " ".join([
+    "%(progress.status)s",
+    "%(progress.downloaded_bytes)s",
+    "%(progress.total_bytes)s",
+    "%(progress.total_bytes_estimate)s",
+    "%(progress.speed)s",
+    "%(progress.eta)s",
+    "%(progress.fragment_index)s",
+    "%(progress.fragment_count)s",
+])
+
+# Number of stderr lines kept for error reporting
+STDERR_TAIL_LINES = 50
+
+
+@dataclass
+class ProgressEvent:
+    """A single progress update parsed from yt-dlp output."""
+    url: str
+    status: str
+    downloaded_bytes: Optional[int] = None
+    total_bytes: Optional[int] = None
+    speed: Optional[float] = None
+    eta: Optional[int] = None
+    fragment_index: Optional[int] = None
+    fragment_count: Optional[int] = None
+    
+    @property
+    def percent(self) -> Optional[float]:
+        """Completion percentage, if the total size is known."""
+        if self.downloaded_bytes is None or not self.total_bytes:
+            return None
+        return 100.0 * self.downloaded_bytes / self.total_bytes
+
+
+def _parse_number(value: str, kind: Callable = int) -> Optional[Any]:
+    if value in ("NA", "None", ""):
+        return None
+    try:
+        return kind(float(value)) if kind is int else kind(value)
+    except ValueError:
+        return None
+
+
+def parse_progress_line(url: str, line: str) -> Optional[ProgressEvent]:
+    """Parse one line printed with PROGRESS_TEMPLATE.
+    
+    Args:
+        url: URL the line belongs to
+        line: Output line from yt-dlp
+        
+    Returns:
+        ProgressEvent, or None if the line is not a progress line
+    """
+    if not line.startswith(PROGRESS_PREFIX):
+        return None
+    parts = line[len(PROGRESS_PREFIX):].split()
+    if len(parts) != 8:
+        return None
+    status, downloaded, total, estimate, speed, eta, frag_index, frag_count = parts
+    return ProgressEvent(
+        url=url,
+        status=status,
+        downloaded_bytes=_parse_number(downloaded),
+        total_bytes=_parse_number(total) or _parse_number(estimate),
+        speed=_parse_number(speed, float),
+        eta=_parse_number(eta),
+        fragment_index=_parse_number(frag_index),
+        fragment_count=_parse_number(frag_count),
+    )
+
+
+async def stream_progress(
+    cmd: List[str],
+    url: str,
+    timeout: Optional[float] = None
+) -> AsyncIterator[ProgressEvent]:
+    """Run a yt-dlp command and yield progress events as they arrive.
+    
+    Output is consumed line by line, so memory use stays flat no matter
+    how long the download runs. Only the last STDERR_TAIL_LINES lines of
+    stderr are kept for the error report.
+    
+    Closing the generator, cancelling the task that consumes it, or
+    exceeding ``timeout`` kills the yt-dlp process.
+    
+    Args:
+        cmd: Full yt-dlp command line
+        url: URL attached to emitted events
+        timeout: Overall time limit in seconds (None for no limit)
+        
+    Yields:
+        ProgressEvent for each progress line
+        
+    Raises:
+        asyncio.TimeoutError: If the download exceeds ``timeout``
+        subprocess.CalledProcessError: If yt-dlp exits with an error
+    """
+    cmd = cmd + ["--newline", "--progress-template", PROGRESS_TEMPLATE]
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stderr_tail: deque = deque(maxlen=STDERR_TAIL_LINES)
+    
+    async def drain_stderr() -> None:
+        async for raw in proc.stderr:
+            stderr_tail.append(raw.decode(errors="replace").rstrip())
+    
+    stderr_task = asyncio.ensure_future(drain_stderr())
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout if timeout is not None else None
+    
+    try:
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - loop.time())
+            try:
+                raw = await asyncio.wait_for(proc.stdout.readline(), remaining)
+            except asyncio.TimeoutError:
+                raise asyncio.TimeoutError(f"Download timed out after {timeout}s: {url}") from None
+            if not raw:
+                break
+            event = parse_progress_line(url, raw.decode(errors="replace").strip())
+            if event is not None:
+                yield event
+        
+        returncode = await proc.wait()
+        await stderr_task
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd, stderr="\n".join(stderr_tail))
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        stderr_task.cancel()
+
+
+def stream_download(
+    url: str,
+    output_dir: str = ".",
+    output_template: str = "%(title)s.%(ext)s",
+    format: str = "bestvideo+bestaudio",
+    timeout: Optional[float] = None,
+    **kwargs
+) -> AsyncIterator[ProgressEvent]:
+    """Download a video and yield progress events (async generator).
+    
+    Takes the same arguments as download_video, plus ``timeout``.
+    
+    Example:
+        async for event in stream_download(url, output_dir="/downloads"):
+            print(f"{event.percent or 0:.1f}% at {event.speed} B/s, ETA {event.eta}s")
+    """
+    cmd = _video_cmd(url, output_dir, output_template, format, **kwargs)
+    return stream_progress(cmd, url, timeout=timeout)
+
+
+def start_download_batch(
+    urls: List[str],
+    output_dir: str = ".",
+    format: str = "bestvideo+bestaudio",
+    max_workers: int = MAX_WORKERS,
+    per_host_limit: int = PER_HOST_LIMIT,
+    timeout: Optional[float] = None,
+    on_progress: Optional[Callable[[ProgressEvent], None]] = None,
+    **kwargs
+) -> Dict[str, "asyncio.Task[DownloadResult]"]:
+    """Start concurrent downloads and return one asyncio task per URL.
+    
+    Must be called from a running event loop. Cancelling a URL's task
+    kills that download only; the others keep their slots. Each task
+    resolves to a DownloadResult (a duplicate URL shares one task).
+    
+    Arguments are as for adownload_batch().
+    
+    Example:
+        tasks = start_download_batch(urls, output_dir="/downloads")
+        tasks[urls[0]].cancel()
+        results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+    """
+    slots = asyncio.Semaphore(max(1, max_workers))
+    host_slots: Dict[str, asyncio.Semaphore] = {}
+    
+    async def run_one(url: str) -> DownloadResult:
+        host = host_slots.setdefault(_host_key(url), asyncio.Semaphore(max(1, per_host_limit)))
+        async with host, slots:
+            start = time.monotonic()
+            downloaded = 0
+            try:
+                async for event in stream_download(
+                    url, output_dir=output_dir, format=format, timeout=timeout, **kwargs
+                ):
+                    # Merged formats finish one file per stream
+                    if event.status == "finished":
+                        downloaded += event.downloaded_bytes or 0
+                    if on_progress:
+                        on_progress(event)
+            except subprocess.CalledProcessError as e:
+                return DownloadResult(
+                    url=url, success=False, returncode=e.returncode,
+                    elapsed=time.monotonic() - start, stderr=e.stderr or ""
+                )
+            except asyncio.TimeoutError as e:
+                return DownloadResult(
+                    url=url, success=False, returncode=-1,
+                    elapsed=time.monotonic() - start, stderr=str(e)
+                )
+            return DownloadResult(
+                url=url, success=True, returncode=0,
+                elapsed=time.monotonic() - start,
+                bytes=downloaded,
+            )
+    
+    tasks: Dict[str, asyncio.Task] = {}
+    for url in urls:
+        if url not in tasks:
+            tasks[url] = asyncio.ensure_future(run_one(url))
+    return tasks
+
+
+async def adownload_batch(
+    urls: List[str],
+    output_dir: str = ".",
+    format: str = "bestvideo+bestaudio",
+    max_workers: int = MAX_WORKERS,
+    per_host_limit: int = PER_HOST_LIMIT,
+    timeout: Optional[float] = None,
+    on_progress: Optional[Callable[[ProgressEvent], None]] = None,
+    on_start: Optional[Callable[[Dict[str, "asyncio.Task[DownloadResult]"]], None]] = None,
+    **kwargs
+) -> List[DownloadResult]:
+    """Download many videos concurrently with asyncio and streaming progress.
+    
+    Each download has its own ``timeout``; a download that fails, times
+    out or is cancelled is reported in its DownloadResult and does not
+    affect the rest of the batch. To cancel single downloads, take the
+    per-URL tasks from ``on_start`` (or use start_download_batch()).
+    
+    Args:
+        urls: List of video URLs
+        output_dir: Download directory
+        format: Quality format string
+        max_workers: Global parallelism limit
+        per_host_limit: Max simultaneous downloads per host
+        timeout: Per-download time limit in seconds
+        on_progress: Callback invoked with every ProgressEvent
+        on_start: Callback invoked once with the dict of URL to task;
+            cancelling a task cancels that download
+        **kwargs: Additional yt-dlp options
+        
+    Returns:
+        List of DownloadResult, in the same order as ``urls``
+    """
+    tasks = start_download_batch(
+        urls, output_dir=output_dir, format=format, max_workers=max_workers,
+        per_host_limit=per_host_limit, timeout=timeout, on_progress=on_progress, **kwargs
+    )
+    if on_start:
+        on_start(tasks)
+    await asyncio.gather(*tasks.values(), return_exceptions=True)
+    
+    results = []
+    for url in urls:
+        task = tasks[url]
+        if task.cancelled():
+            outcome = DownloadResult(url=url, success=False, returncode=-1, elapsed=0.0, stderr="cancelled")
+        elif task.exception() is not None:
+            outcome = DownloadResult(url=url, success=False, returncode=-1, elapsed=0.0, stderr=str(task.exception()))
+        else:
+            outcome = task.result()
+        results.append(outcome)
+    return results
+
+
+# Download queue daemon
+
+class DownloadQueue:
+    """Persistent SQLite job queue for downloads.
+    
+    Jobs move through "queued" -> "running" -> "done" / "failed" /
+    "cancelled". Higher ``priority`` runs first, then oldest first.
+    """
+    
+    def __init__(self, path: str = QUEUE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                kind TEXT NOT NULL DEFAULT 'video',
+                output_dir TEXT NOT NULL,
+                options TEXT NOT NULL DEFAULT '{}',
+                priority INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'queued',
+                created REAL NOT NULL,
+                started REAL,
+                finished REAL,
+                returncode INTEGER,
+                error TEXT,
+                attempt INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if "attempt" not in columns:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN attempt INTEGER NOT NULL DEFAULT 0")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_next ON jobs (status, priority DESC, id)")
+        self._db.commit()
+    
+    @staticmethod
+    def _row(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["options"] = json.loads(job["options"])
+        return job
+    
+    def enqueue(
+        self,
+        url: str,
+        output_dir: str = ".",
+        kind: str = "video",
+        priority: int = 0,
+        **options
+    ) -> int:
+        """Add a job and return its ID.
+        
+        Args:
+            url: Video URL
+            output_dir: Download directory
+            kind: "video" (download_video options) or "audio" (download_audio options)
+            priority: Higher runs first
+            **options: Keyword arguments for the download command
+        """
+        if kind not in ("video", "audio"):
+            raise ValueError(f"Unknown job kind: {kind!r}")
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO jobs (url, kind, output_dir, options, priority, created) VALUES (?, ?, ?, ?, ?, ?)",
+                (url, kind, output_dir, json.dumps(options), priority, time.time())
+            )
+            self._db.commit()
+            return cursor.lastrowid
+    
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row) if row else None
+    
+    def list(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """List jobs in run order, optionally filtered by status."""
+        sql = "SELECT * FROM jobs"
+        params: tuple = ()
+        if status:
+            sql += " WHERE status = ?"
+            params = (status,)
+        with self._lock:
+            rows = self._db.execute(sql + " ORDER BY priority DESC, id", params).fetchall()
+        return [self._row(row) for row in rows]
+    
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Mark the next queued job as running and return it.
+        
+        Each claim bumps the job's ``attempt``, which identifies this run
+        of it to finish().
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY priority DESC, id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE jobs SET status = 'running', started = ?, attempt = attempt + 1 WHERE id = ?",
+                (time.time(), row["id"])
+            )
+            self._db.commit()
+        job = self._row(row)
+        job["status"] = "running"
+        job["attempt"] += 1
+        return job
+    
+    def finish(
+        self,
+        job_id: int,
+        status: str,
+        returncode: Optional[int] = None,
+        error: Optional[str] = None,
+        attempt: Optional[int] = None
+    ) -> bool:
+        """Record how a job ended. Returns False if nothing was updated.
+        
+        With ``attempt``, only that claim of the job is finished, and only
+        while it is still running; a run that was cancelled or requeued
+        (and maybe claimed again) is left alone.
+        """
+        sql = "UPDATE jobs SET status = ?, finished = ?, returncode = ?, error = ? WHERE id = ?"
+        params: List[Any] = [status, time.time(), returncode, error, job_id]
+        if attempt is not None:
+            sql += " AND attempt = ? AND status = 'running'"
+            params.append(attempt)
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+            self._db.commit()
+            return cursor.rowcount > 0
+    
+    def requeue(self, job_id: Optional[int] = None) -> None:
+        """Put a running job (or all running jobs) back in the queue."""
+        with self._lock:
+            if job_id is None:
+                self._db.execute("UPDATE jobs SET status = 'queued', started = NULL WHERE status = 'running'")
+            else:
+                self._db.execute("UPDATE jobs SET status = 'queued', started = NULL WHERE id = ?", (job_id,))
+            self._db.commit()
+    
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a queued or running job. Returns False if it already ended."""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = 'cancelled', finished = ? WHERE id = ? AND status IN ('queued', 'running')",
+                (time.time(), job_id)
+            )
+            self._db.commit()
+            return cursor.rowcount > 0
+
+
+class QueueDaemon:
+    """Run jobs from a DownloadQueue with shared bandwidth and disk limits.
+    
+    ``max_workers`` jobs run at a time. ``bandwidth_limit`` (bytes/s) is
+    split evenly between worker slots and passed to each yt-dlp as
+    --limit-rate, so total throughput stays under it. When free space in
+    a job's output directory drops below ``min_free_gb``, running jobs are
+    stopped and requeued (yt-dlp resumes their .part files later) and no
+    new jobs start until space is available again.
+    """
+    
+    def __init__(
+        self,
+        queue: DownloadQueue,
+        max_workers: int = 2,
+        bandwidth_limit: Optional[int] = None,
+        min_free_gb: float = 5.0,
+        poll_interval: float = 2.0
+    ):
+        self.queue = queue
+        self.max_workers = max(1, max_workers)
+        self.bandwidth_limit = bandwidth_limit
+        self.min_free_gb = min_free_gb
+        self.poll_interval = poll_interval
+        self.paused = False
+        # Keyed by (job id, attempt), so a requeued job's old run can't
+        # clobber the entry of its next one; None while a slot is reserved
+        self._procs: Dict[Tuple[int, int], Optional[subprocess.Popen]] = {}
+        self._procs_lock = threading.Lock()
+        self._stop = threading.Event()
+    
+    def _disk_ok(self, path: str) -> bool:
+        target = Path(path)
+        while not target.exists() and target != target.parent:
+            target = target.parent
+        return shutil.disk_usage(target).free >= self.min_free_gb * 1024 ** 3
+    
+    def _command(self, job: Dict[str, Any]) -> List[str]:
+        options = dict(job["options"])
+        if job["kind"] == "audio":
+            cmd = _audio_cmd(job["url"], job["output_dir"], **options)
+        else:
+            cmd = _video_cmd(job["url"], job["output_dir"], **options)
+        if self.bandwidth_limit:
+            cmd.extend(["--limit-rate", str(self.bandwidth_limit // self.max_workers)])
+        return cmd
+    
+    def _run_job(self, job: Dict[str, Any]) -> None:
+        job_id, attempt = job["id"], job["attempt"]
+        key = (job_id, attempt)
+        # Check and start under the lock: cancel() updates the queue first
+        # and then looks for the process, so it either sees this job not
+        # running here or finds its process to terminate.
+        with self._procs_lock:
+            current = self.queue.get(job_id)
+            if current is None or current["status"] != "running" or current["attempt"] != attempt:
+                self._procs.pop(key, None)
+                return  # cancelled or requeued before it started
+            try:
+                proc = subprocess.Popen(
+                    self._command(job),
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                    text=True
+                )
+            except (OSError, TypeError) as e:
+                self._procs.pop(key, None)
+                error = str(e)
+            else:
+                self._procs[key] = proc
+                error = None
+        if error is not None:
+            self.queue.finish(job_id, "failed", error=error, attempt=attempt)
+            return
+        
+        stderr_tail: deque = deque(proc.stderr, maxlen=STDERR_TAIL_LINES)
+        returncode = proc.wait()
+        with self._procs_lock:
+            self._procs.pop(key, None)
+        
+        # No-op if this run was cancelled or requeued while running
+        if returncode == 0:
+            self.queue.finish(job_id, "done", returncode, attempt=attempt)
+        else:
+            self.queue.finish(job_id, "failed", returncode, "".join(stderr_tail)[-2000:], attempt=attempt)
+    
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a job, killing its yt-dlp process if it is running."""
+        cancelled = self.queue.cancel(job_id)
+        with self._procs_lock:
+            procs = [proc for (running_id, _), proc in self._procs.items() if running_id == job_id and proc]
+        for proc in procs:
+            proc.terminate()
+        return cancelled
+    
+    def status(self) -> Dict[str, Any]:
+        with self._procs_lock:
+            running = sorted({job_id for job_id, _ in self._procs})
+        return {
+            "paused": self.paused,
+            "running": running,
+            "max_workers": self.max_workers,
+            "bandwidth_limit": self.bandwidth_limit,
+        }
+    
+    def _check_disk(self) -> None:
+        with self._procs_lock:
+            running = [(job_id, proc) for (job_id, _), proc in self._procs.items() if proc]
+        for job_id, proc in running:
+            job = self.queue.get(job_id)
+            if job and not self._disk_ok(job["output_dir"]):
+                self.paused = True
+                self.queue.requeue(job_id)
+                proc.terminate()
+    
+    def run(self) -> None:
+        """Process jobs until stop() is called. Blocks the calling thread.
+        
+        On the way out (stop() or an exception), running jobs are requeued
+        and their yt-dlp processes terminated before the worker threads are
+        joined, so shutdown doesn't wait for downloads to finish.
+        """
+        # Jobs left running by a previous daemon are resumed
+        self.queue.requeue()
+        
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while not self._stop.is_set():
+                self._check_disk()
+                with self._procs_lock:
+                    free_slots = self.max_workers - len(self._procs)
+                started = 0
+                while free_slots > started:
+                    job = self.queue.claim()
+                    if job is None:
+                        break
+                    if not self._disk_ok(job["output_dir"]):
+                        self.paused = True
+                        self.queue.requeue(job["id"])
+                        break
+                    self.paused = False
+                    with self._procs_lock:
+                        # Reserve the slot until the worker registers its process
+                        self._procs.setdefault((job["id"], job["attempt"]), None)
+                    pool.submit(self._run_job, job)
+                    started += 1
+                self._stop.wait(self.poll_interval)
+        finally:
+            self._stop.set()
+            # Requeue first so workers don't record the kills as failures
+            self.queue.requeue()
+            with self._procs_lock:
+                procs = [p for p in self._procs.values() if p]
+            for proc in procs:
+                proc.terminate()
+            pool.shutdown(wait=True)
+    
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def _queue_token(create: bool = False) -> str:
+    """QUEUE_TOKEN, or the token in QUEUE_TOKEN_PATH (written first if ``create``)."""
+    if QUEUE_TOKEN:
+        return QUEUE_TOKEN
+    path = Path(QUEUE_TOKEN_PATH)
+    if path.exists():
+        return path.read_text().strip()
+    if not create:
+        raise RuntimeError(
+            f"No queue token in {path}; start serve_queue or set VIDEO_DOWNLOAD_QUEUE_TOKEN"
+        )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    token = secrets.token_urlsafe(32)
+    with os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "w") as f:
+        f.write(token)
+    return token
+
+
+def _queue_job(body: Dict[str, Any], output_root: str) -> Dict[str, Any]:
+    """Validate a POST /jobs body into DownloadQueue.enqueue arguments.
+    
+    Raises:
+        ValueError: On an unknown kind or option, an option value that is
+            not a scalar or list of scalars, or an output_dir outside
+            ``output_root``
+    """
+    kind = body.get("kind", "video")
+    if kind not in QUEUE_OPTIONS:
+        raise ValueError(f"kind must be one of {sorted(QUEUE_OPTIONS)}")
+    options = body.get("options", {})
+    if not isinstance(options, dict):
+        raise ValueError("options must be an object")
+    rejected = sorted(set(options) - QUEUE_OPTIONS[kind])
+    if rejected:
+        raise ValueError(f"options not allowed for {kind} jobs: {', '.join(rejected)}")
+    for key, value in options.items():
+        values = value if isinstance(value, list) else [value]
+        if not all(isinstance(v, (str, int, float, bool)) for v in values):
+            raise ValueError(f"option {key} must be a string, number, boolean or list of those")
+    root = Path(output_root).resolve()
+    output_dir = (root / str(body.get("output_dir", "."))).resolve()
+    if output_dir != root and root not in output_dir.parents:
+        raise ValueError(f"output_dir must be inside {root}")
+    return {
+        "url": str(body["url"]),
+        "output_dir": str(output_dir),
+        "kind": kind,
+        "priority": int(body.get("priority", 0)),
+        **options,
+    }
+
+
+def _queue_handler(daemon: QueueDaemon, token: str, output_root: str) -> type:
+    """Build the HTTP request handler for a daemon's JSON API."""
+    
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+        
+        def _authorized(self) -> bool:
+            sent = self.headers.get("X-Queue-Token", "")
+            if hmac.compare_digest(sent.encode(), token.encode()):
+                return True
+            self._send(401, {"error": "missing or wrong X-Queue-Token"})
+            return False
+        
+        def _send(self, status: int, body: Any) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        
+        def _job_id(self) -> Optional[int]:
+            parts = self.path.split("?")[0].strip("/").split("/")
+            if len(parts) == 2 and parts[0] == "jobs" and parts[1].isdigit():
+                return int(parts[1])
+            return None
+        
+        def do_GET(self):
+            if not self._authorized():
+                return
+            parsed = urllib.parse.urlparse(self.path)
+            if parsed.path == "/jobs":
+                status = urllib.parse.parse_qs(parsed.query).get("status", [None])[0]
+                self._send(200, daemon.queue.list(status))
+            elif parsed.path == "/status":
+                self._send(200, daemon.status())
+            elif self._job_id() is not None:
+                job = daemon.queue.get(self._job_id())
+                self._send(200 if job else 404, job or {"error": "job not found"})
+            else:
+                self._send(404, {"error": "not found"})
+        
+        def do_POST(self):
+            if not self._authorized():
+                return
+            if self.path != "/jobs":
+                self._send(404, {"error": "not found"})
+                return
+            # Browsers can send text/plain cross-site without a preflight
+            if self.headers.get("Content-Type", "").split(";")[0].strip() != "application/json":
+                self._send(415, {"error": "Content-Type must be application/json"})
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                job_id = daemon.queue.enqueue(**_queue_job(body, output_root))
+            except (KeyError, ValueError, TypeError) as e:
+                self._send(400, {"error": str(e)})
+                return
+            self._send(201, {"id": job_id})
+        
+        def do_DELETE(self):
+            if not self._authorized():
+                return
+            job_id = self._job_id()
+            if job_id is None:
+                self._send(404, {"error": "not found"})
+                return
+            self._send(200, {"cancelled": daemon.cancel(job_id)})
+    
+    return Handler
+
+
+def serve_queue(
+    queue_path: str = QUEUE_PATH,
+    host: str = QUEUE_HOST,
+    port: int = QUEUE_PORT,
+    token: Optional[str] = None,
+    output_root: str = QUEUE_OUTPUT_ROOT,
+    **daemon_options
+) -> None:
+    """Run the queue daemon with its HTTP API until interrupted.
+    
+    API (every request needs the X-Queue-Token header):
+        POST   /jobs         {"url", "output_dir", "kind", "priority", "options"} -> {"id"}
+        GET    /jobs         list jobs (optional ?status=queued|running|...)
+        GET    /jobs/<id>    job details
+        DELETE /jobs/<id>    cancel a job
+        GET    /status       daemon state
+    
+    POST bodies must be sent as application/json. ``options`` may only
+    hold the keys in QUEUE_OPTIONS for the job's kind, and ``output_dir``
+    is resolved under ``output_root``.
+    
+    Args:
+        queue_path: SQLite queue database
+        host: Bind address
+        port: Bind port
+        token: Shared secret for X-Queue-Token (default: QUEUE_TOKEN, or
+            one generated into QUEUE_TOKEN_PATH)
+        output_root: Directory that jobs' output_dir must be inside
+        **daemon_options: QueueDaemon options (max_workers, bandwidth_limit, ...)
+    """
+    token = token or _queue_token(create=True)
+    daemon = QueueDaemon(DownloadQueue(queue_path), **daemon_options)
+    server = http.server.ThreadingHTTPServer((host, port), _queue_handler(daemon, token, output_root))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # Ctrl-C and SIGTERM only ask the daemon to stop; run() then requeues
+    # and terminates the running downloads itself
+    previous = {}
+    if threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            previous[signum] = signal.signal(signum, lambda *_: daemon.stop())
+    try:
+        daemon.run()
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+        server.shutdown()
+
+
+def _queue_request(
+    method: str,
+    path: str,
+    body: Optional[Dict[str, Any]] = None,
+    api: str = QUEUE_URL,
+    token: Optional[str] = None
+) -> Any:
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(
+        f"{api.rstrip('/')}{path}", data=data, method=method,
+        headers={"Content-Type": "application/json", "X-Queue-Token": token or _queue_token()}
+    )
+    with urllib.request.urlopen(req, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def enqueue_job(
+    url: str,
+    output_dir: str = ".",
+    kind: str = "video",
+    priority: int = 0,
+    api: str = QUEUE_URL,
+    token: Optional[str] = None,
+    **options
+) -> int:
+    """Submit a download to a running queue daemon and return the job ID.
+    
+    ``output_dir`` is taken relative to the daemon's output root, and
+    ``options`` are limited to QUEUE_OPTIONS for the kind.
+    """
+    body = {"url": url, "output_dir": output_dir, "kind": kind, "priority": priority, "options": options}
+    return _queue_request("POST", "/jobs", body, api=api, token=token)["id"]
+
+
+def list_jobs(status: Optional[str] = None, api: str = QUEUE_URL, token: Optional[str] = None) -> List[Dict[str, Any]]:
+    """List jobs on a running queue daemon."""
+    query = f"?{urllib.parse.urlencode({'status': status})}" if status else ""
+    return _queue_request("GET", f"/jobs{query}", api=api, token=token)
+
+
+def cancel_job(job_id: int, api: str = QUEUE_URL, token: Optional[str] = None) -> bool:
+    """Cancel a job on a running queue daemon."""
+    return _queue_request("DELETE", f"/jobs/{job_id}", api=api, token=token)["cancelled"]
+
+
 if __name__ == "__main__":
     import sys
     
@@ -231,6 +2296,9 @@ if __name__ == "__main__":
         print("  python skill.py --audio <url>            # Download audio")
         print("  python skill.py --info <url>             # Get video info")
         print("  python skill.py --formats <url>          # List formats")
+        print("  python skill.py --sync <url> <dir>       # Sync playlist into dir")
+        print("  python skill.py --gc <store_root>        # Garbage-collect content store")
+        print("  python skill.py --serve [port]           # Run the download queue daemon")
         sys.exit(1)
     
     if sys.argv[1] == "--audio":
@@ -251,6 +2319,23 @@ if __name__ == "__main__":
         url = sys.argv[2]
         print(list_formats(url))
         
+    elif sys.argv[1] == "--serve":
+        port = int(sys.argv[2]) if len(sys.argv) > 2 else QUEUE_PORT
+        print(f"Download queue listening on http://{QUEUE_HOST}:{port}")
+        if not QUEUE_TOKEN:
+            print(f"API token: {QUEUE_TOKEN_PATH}")
+        serve_queue(port=port)
+        
+    elif sys.argv[1] == "--gc":
+        print(json.dumps(ContentStore(sys.argv[2]).gc(), indent=2))
+        
+    elif sys.argv[1] == "--sync":
+        url, output_dir = sys.argv[2], sys.argv[3]
+        summary = sync_playlist(url, output_dir, str(Path(output_dir) / ".archive.db"))
+        print(json.dumps(summary, indent=2))
+        if summary["failed"]:
+            sys.exit(1)
+        
     else:
         url = sys.argv[1]
         print(f"Downloading video from: {url}")